@@ -70,7 +70,7 @@ def main():
     parser.add_argument("--port", type=int, default=8000, help="Server listening port")
     parser.add_argument("--reload", action="store_true", help="Enable hot reload (development mode)")
     parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Log level")
-    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes (recommend using --threads)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes (each holds its own ONNX session)")
     parser.add_argument("--threads", type=int, default=4, help="Number of threads per process (recommend 4-8)")
     parser.add_argument("--use-gunicorn", action="store_true", help="Use Gunicorn multi-threaded deployment (recommended for production)")
     
@@ -93,15 +93,12 @@ def main():
     print("🔄 Hot Reload: {}".format('Enabled' if args.reload else 'Disabled'))
     
     if args.use_gunicorn and not args.reload:
-        # Check worker configuration
-        if args.workers > 1:
-            print("⚠️  Warning: Detected multi-worker configuration (workers={})".format(args.workers))
-            print("⚠️  Multi-process mode may cause face database data race issues")
-            print("⚠️  Recommended: --workers 1 --threads {} for optimal performance and data consistency".format(args.threads * args.workers))
-            print("-" * 60)
-        
         print("🚀 Architecture: Gunicorn + {} workers + {} threads (production optimized)".format(args.workers, args.threads))
-        print("💡 Features: Multi-threaded shared model memory, 5-8x performance improvement")
+        if args.workers > 1:
+            print("💡 Multi-process: one ONNX session per worker, gallery index shared via memory-mapped snapshot")
+            print("🔄 Gallery changes propagate to all workers through the gallery_state version")
+        else:
+            print("💡 Features: Multi-threaded shared model memory, 5-8x performance improvement")
         print("🔒 Thread Safety: SQLAlchemy scoped_session + RLock protection")
         print("=" * 60)
         
@@ -158,6 +155,16 @@ def create_app_factory():
     """Factory function for Gunicorn deployment"""
     setup_logging()
     ensure_directories()
+    
+    # Build the shared gallery snapshot once in the master (--preload), workers map it on startup
+    try:
+        from src.services.gallery_sync import prepare_gallery_snapshot
+        version = prepare_gallery_snapshot()
+        if version is not None:
+            logging.getLogger(__name__).info(f"Gallery snapshot v{version} prepared for workers")
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Gallery snapshot preparation skipped: {e}")
+    
     return create_app()
 
 
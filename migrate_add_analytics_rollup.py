@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Migration: Add analytics_daily_rollup table (event counts per day, region and event type)
+and backfill it from analytics_log
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def migrate():
+    conn = psycopg2.connect(
+        dbname=os.getenv('DB_NAME', 'face_recognition'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'postgres'),
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=os.getenv('DB_PORT', '5432')
+    )
+
+    try:
+        cur = conn.cursor()
+
+        print("Creating analytics_daily_rollup table...")
+
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS analytics_daily_rollup (
+                date DATE NOT NULL,
+                region VARCHAR(50) NOT NULL DEFAULT '',
+                event_type VARCHAR(50) NOT NULL,
+                count BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (date, region, event_type)
+            );
+        """)
+
+        # Rebuild the counts from the event log (safe to re-run)
+        # SHARE mode waits for in-flight log_event transactions and blocks new ones until commit,
+        # so no rollup increment can land between the count and its overwrite
+        print("Backfilling daily rollup from analytics_log...")
+        cur.execute("LOCK TABLE analytics_log IN SHARE MODE;")
+        cur.execute("""
+            INSERT INTO analytics_daily_rollup (date, region, event_type, count)
+            SELECT date, COALESCE(region, ''), event_type, COUNT(*)
+            FROM analytics_log
+            GROUP BY date, COALESCE(region, ''), event_type
+            ON CONFLICT (date, region, event_type)
+            DO UPDATE SET count = EXCLUDED.count;
+        """)
+        rows = cur.rowcount
+
+        conn.commit()
+        print(f"✅ Successfully created analytics_daily_rollup ({rows} rollup rows)")
+
+        cur.execute("SELECT MIN(date), MAX(date) FROM analytics_daily_rollup;")
+        first_day, last_day = cur.fetchone()
+        print(f"\nRollup covers: {first_day} .. {last_day}")
+
+        cur.close()
+
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    migrate()
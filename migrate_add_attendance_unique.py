@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Migration: Merge duplicate attendance records and add a unique (person_id, date) constraint
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def migrate():
+    conn = psycopg2.connect(
+        dbname=os.getenv('DB_NAME', 'face_recognition'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'postgres'),
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=os.getenv('DB_PORT', '5432')
+    )
+
+    try:
+        cur = conn.cursor()
+
+        # Block concurrent check-ins while duplicates are merged
+        cur.execute("LOCK TABLE attendance IN SHARE ROW EXCLUSIVE MODE;")
+
+        # Keep the oldest record of each person and day, with the earliest check-in
+        # and latest check-out of all its duplicates
+        print("Merging duplicate attendance records...")
+        cur.execute("""
+            UPDATE attendance a
+            SET check_in_time = COALESCE(a.check_in_time, d.first_check_in),
+                check_out_time = COALESCE(a.check_out_time, d.last_check_out)
+            FROM (
+                SELECT person_id, date, MIN(id) AS keep_id,
+                       MIN(check_in_time) AS first_check_in,
+                       MAX(check_out_time) AS last_check_out
+                FROM attendance
+                GROUP BY person_id, date
+                HAVING COUNT(*) > 1
+            ) d
+            WHERE a.id = d.keep_id;
+        """)
+        merged = cur.rowcount
+
+        cur.execute("""
+            DELETE FROM attendance a
+            USING attendance b
+            WHERE a.person_id = b.person_id
+              AND a.date = b.date
+              AND a.id > b.id;
+        """)
+        deleted = cur.rowcount
+
+        print("Adding unique constraint uq_attendance_person_date...")
+        cur.execute("""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_constraint WHERE conname = 'uq_attendance_person_date'
+                ) THEN
+                    ALTER TABLE attendance
+                    ADD CONSTRAINT uq_attendance_person_date UNIQUE (person_id, date);
+                END IF;
+            END
+            $$;
+        """)
+
+        conn.commit()
+        print(f"✅ Successfully added uq_attendance_person_date ({merged} days merged, {deleted} duplicate records removed)")
+
+        cur.close()
+
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Migration: Add profile_encoding_id to persons (representative face encoding per person)
+"""
+
+import psycopg2
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def migrate():
+    conn = psycopg2.connect(
+        dbname=os.getenv('DB_NAME', 'face_recognition'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'postgres'),
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=os.getenv('DB_PORT', '5432')
+    )
+
+    try:
+        cur = conn.cursor()
+
+        print("Adding profile_encoding_id column to persons...")
+
+        cur.execute("""
+            ALTER TABLE persons
+            ADD COLUMN IF NOT EXISTS profile_encoding_id INTEGER;
+        """)
+
+        # Backfill with each person's oldest face encoding
+        print("Backfilling profile encodings...")
+        cur.execute("""
+            UPDATE persons p
+            SET profile_encoding_id = fe.first_id
+            FROM (
+                SELECT person_id, MIN(id) AS first_id
+                FROM face_encodings
+                GROUP BY person_id
+            ) fe
+            WHERE fe.person_id = p.id
+              AND p.profile_encoding_id IS DISTINCT FROM fe.first_id;
+        """)
+        updated = cur.rowcount
+
+        conn.commit()
+        print(f"✅ Successfully added profile_encoding_id ({updated} persons backfilled)")
+
+        # Show persons without any face encoding
+        cur.execute("SELECT COUNT(*) FROM persons WHERE profile_encoding_id IS NULL;")
+        print(f"\nPersons without face encodings: {cur.fetchone()[0]}")
+
+        cur.close()
+
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Migration: Move face_encodings.image_data into the content-addressed blob store
+(adds face_encodings.image_hash, writes thumbnails, clears the inline blobs)
+"""
+
+import argparse
+import psycopg2
+import os
+from dotenv import load_dotenv
+
+from src.models.blob_store import BlobStore
+from src.utils.config import config
+
+load_dotenv()
+
+# First key of the blob advisory locks（_BLOB_LOCK_NAMESPACE in src/models/database.py）
+BLOB_LOCK_NAMESPACE = 0x426C6F62
+
+def connect():
+    return psycopg2.connect(
+        dbname=os.getenv('DB_NAME', 'face_recognition'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', 'postgres'),
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=os.getenv('DB_PORT', '5432')
+    )
+
+def get_blob_store():
+    return BlobStore(
+        config.get('storage.blob_dir', 'data/face_images'),
+        thumbnail_sizes=config.get('storage.thumbnail_sizes', [128, 256]),
+        thumbnail_quality=config.get('storage.thumbnail_quality', 85)
+    )
+
+def migrate(batch_size=200):
+    conn = connect()
+    store = get_blob_store()
+
+    try:
+        cur = conn.cursor()
+
+        print("Adding image_hash column to face_encodings...")
+
+        cur.execute("""
+            ALTER TABLE face_encodings
+            ADD COLUMN IF NOT EXISTS image_hash VARCHAR(64);
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS ix_face_encodings_image_hash
+            ON face_encodings (image_hash);
+        """)
+        conn.commit()
+
+        # Move the images in batches, each batch in its own transaction
+        print(f"Moving images to {store.root}...")
+        moved = 0
+        last_id = 0
+        while True:
+            cur.execute("""
+                SELECT id, image_data FROM face_encodings
+                WHERE id > %s AND image_hash IS NULL AND image_data IS NOT NULL
+                ORDER BY id
+                LIMIT %s;
+            """, (last_id, batch_size))
+            rows = cur.fetchall()
+            if not rows:
+                break
+
+            for encoding_id, image_data in rows:
+                digest = store.put(bytes(image_data))
+                cur.execute(
+                    "UPDATE face_encodings SET image_hash = %s, image_data = NULL WHERE id = %s;",
+                    (digest, encoding_id)
+                )
+            conn.commit()
+            moved += len(rows)
+            last_id = rows[-1][0]
+            print(f"  {moved} images moved")
+
+        print(f"✅ Successfully moved {moved} face images to the blob store")
+        print("\nRun VACUUM FULL face_encodings (or pg_repack) during a quiet period to return the space to the OS")
+
+        cur.close()
+
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Migration failed: {e}")
+        raise
+    finally:
+        conn.close()
+
+def prune():
+    """Delete blobs that no face encoding refers to"""
+    conn = connect()
+    store = get_blob_store()
+
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT DISTINCT image_hash FROM face_encodings WHERE image_hash IS NOT NULL;")
+        referenced = {row[0] for row in cur.fetchall()}
+        cur.close()
+
+        removed = 0
+        for digest in list(store.iter_digests()):
+            if digest in referenced:
+                continue
+            # Same lock as DatabaseManager.add_face_encoding: a blob written by the running app
+            # but not committed yet is referenced by the time the lock is granted
+            cur = conn.cursor()
+            cur.execute("SELECT pg_advisory_xact_lock(%s, hashtext(%s));", (BLOB_LOCK_NAMESPACE, digest))
+            cur.execute("SELECT 1 FROM face_encodings WHERE image_hash = %s LIMIT 1;", (digest,))
+            if cur.fetchone() is None:
+                store.delete(digest)
+                removed += 1
+            conn.commit()
+            cur.close()
+        print(f"✅ Removed {removed} unreferenced blobs")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Move face images into the blob store")
+    parser.add_argument("--batch-size", type=int, default=200, help="Images per transaction")
+    parser.add_argument("--prune", action="store_true", help="Only delete unreferenced blobs")
+    args = parser.parse_args()
+
+    if args.prune:
+        prune()
+    else:
+        migrate(args.batch_size)
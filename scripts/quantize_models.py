@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+INT8 model quantization CLI
+Builds the <model>_int8 InsightFace model pack with ONNX Runtime quantization, calibrated on
+stored face images, and checks the quantized embeddings against the fp32 models on the gallery
+"""
+
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# Add the project root directory to the Python path
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.model_manager import setup_model_environment
+
+model_manager = setup_model_environment()
+
+import cv2
+import numpy as np
+import insightface
+
+from src.utils.config import config
+from src.models.database import DatabaseManager
+from src.services.gallery_index import GalleryIndex
+
+logger = logging.getLogger(__name__)
+
+
+def setup_logging(verbose: bool = False):
+    """Set up logging"""
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(
+        level=level,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+
+def load_app(model_name: str):
+    """Prepare an InsightFace FaceAnalysis for the given model pack"""
+    providers = config.get('face_recognition.providers', ['CPUExecutionProvider'])
+    det_size = tuple(config.get('face_recognition.det_size', [640, 640]))
+    app = insightface.app.FaceAnalysis(
+        name=model_name,
+        root=model_manager.configure_insightface(model_name),
+        providers=providers
+    )
+    app.prepare(ctx_id=0, det_size=det_size)
+    return app
+
+
+def load_samples(db_manager: DatabaseManager, limit: int):
+    """Decode a random sample of stored face images"""
+    samples = []
+    for encoding_id, image_data in db_manager.get_face_image_samples(limit):
+        image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+        if image is not None:
+            samples.append((encoding_id, image))
+    return samples
+
+
+def best_face(app, image):
+    """Highest-confidence face of an image, or None"""
+    faces = app.get(image)
+    if not faces:
+        return None
+    return max(faces, key=lambda face: face.det_score)
+
+
+def check_accuracy(fp32_app, int8_app, samples, gallery: GalleryIndex):
+    """
+    Compare fp32 and INT8 models on stored face images
+
+    Returns:
+        Accuracy report dictionary
+    """
+    similarities = []
+    top1_agree = 0
+    compared = 0
+    detection_misses = 0
+
+    for encoding_id, image in samples:
+        fp32_face = best_face(fp32_app, image)
+        int8_face = best_face(int8_app, image)
+        if fp32_face is None:
+            continue
+        if int8_face is None:
+            detection_misses += 1
+            continue
+
+        fp32_embedding = fp32_face.normed_embedding
+        int8_embedding = int8_face.normed_embedding
+        similarities.append(float(np.dot(fp32_embedding, int8_embedding)))
+
+        # Queries from the INT8 model are matched against the fp32 gallery in production
+        fp32_match, int8_match = gallery.search_batch(
+            np.stack([fp32_embedding, int8_embedding]), threshold=-1.0, limit=1
+        )
+        if fp32_match and int8_match:
+            compared += 1
+            top1_agree += int(fp32_match[0]['person_id'] == int8_match[0]['person_id'])
+
+    similarities = np.array(similarities) if similarities else np.zeros(1)
+    return {
+        'images': len(samples),
+        'embedding_pairs': int(len(similarities)),
+        'detection_misses': detection_misses,
+        'mean_similarity': float(similarities.mean()),
+        'min_similarity': float(similarities.min()),
+        'p5_similarity': float(np.percentile(similarities, 5)),
+        'top1_agreement': top1_agree / compared if compared else 1.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and verify INT8 InsightFace models")
+    parser.add_argument("--model", default=config.get('face_recognition.model', 'buffalo_l'), help="Source model pack")
+    parser.add_argument("--method", default=config.get('face_recognition.quantization.method', 'static'),
+                        choices=["static", "dynamic"], help="Quantization method")
+    parser.add_argument("--samples", type=int, default=config.get('face_recognition.quantization.calibration_samples', 200),
+                        help="Number of stored face images used for calibration")
+    parser.add_argument("--eval-samples", type=int, default=200, help="Number of stored face images used for the accuracy check")
+    parser.add_argument("--min-similarity", type=float, default=0.98, help="Minimum mean fp32/INT8 embedding similarity")
+    parser.add_argument("--min-agreement", type=float, default=0.99, help="Minimum top-1 identity agreement on the gallery")
+    parser.add_argument("--check-only", action="store_true", help="Only run the accuracy check on an existing INT8 pack")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Verbose logging")
+    args = parser.parse_args()
+
+    setup_logging(args.verbose)
+    db_manager = DatabaseManager()
+    fp32_app = load_app(args.model)
+
+    if not args.check_only:
+        calibration = load_samples(db_manager, args.samples) if args.method == 'static' else []
+        print(f"🔧 Quantizing {args.model} ({args.method}, {len(calibration)} calibration images)")
+        result = model_manager.quantize_insightface(
+            fp32_app,
+            model_name=args.model,
+            calibration_images=[image for _, image in calibration],
+            method=args.method,
+            tasks=config.get('face_recognition.quantization.tasks', ['detection', 'recognition']),
+            det_size=config.get('face_recognition.det_size', [640, 640])
+        )
+        if not result['success']:
+            print(f"❌ Quantization failed: {result['error']}")
+            sys.exit(1)
+        for file_name, info in result['models'].items():
+            print(f"  {file_name}: {info['method']} ({info.get('source_size_mb', '-')}MB -> {info.get('size_mb', '-')}MB)")
+
+    if not model_manager.has_quantized_model(args.model):
+        print(f"❌ INT8 model pack for {args.model} not found")
+        sys.exit(1)
+
+    print("🔍 Checking INT8 accuracy against fp32 on stored faces")
+    int8_app = load_app(model_manager.get_quantized_model_name(args.model))
+    gallery = GalleryIndex()
+    gallery.load(db_manager.get_gallery_rows())
+    report = check_accuracy(fp32_app, int8_app, load_samples(db_manager, args.eval_samples), gallery)
+
+    print(f"  images: {report['images']}, compared: {report['embedding_pairs']}, detection misses: {report['detection_misses']}")
+    print(f"  embedding similarity: mean {report['mean_similarity']:.4f}, p5 {report['p5_similarity']:.4f}, min {report['min_similarity']:.4f}")
+    print(f"  top-1 identity agreement: {report['top1_agreement'] * 100:.2f}%")
+
+    if report['mean_similarity'] < args.min_similarity or report['top1_agreement'] < args.min_agreement:
+        print("❌ Accuracy regression: keep face_recognition.quantization.enabled = false")
+        sys.exit(1)
+    print("✅ INT8 models within tolerance: set face_recognition.quantization.enabled = true to use them")
+
+
+if __name__ == "__main__":
+    main()
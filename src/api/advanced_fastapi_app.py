@@ -3,21 +3,24 @@ based on FastAPI advanced facial recognition API interface
 support InsightFace and DeepFace Wait for the latest technology
 """
 from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Request, Query
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Request, Query, WebSocket
 from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 import os
 import cv2
 import numpy as np
 import uuid
+import hashlib
 import logging
 import asyncio
 import base64
+import json
+import time
 import pickle
 from pathlib import Path
-import tempfile
 import shutil
 from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
@@ -27,7 +30,10 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from ..services.advanced_face_service import get_advanced_face_service
+from .inference_executor import get_inference_executor, InferenceQueueFull
+from .frame_stream import LatestFrameSlot
 from ..utils.config import config, get_upload_config
+from ..utils.image_utils import decode_upload
 from src.utils.enhanced_visualization import EnhancedFaceVisualizer
 from src.utils.font_manager import get_font_manager
 
@@ -48,6 +54,7 @@ class PersonUpdate(BaseModel):
     description: Optional[str] = Field(None, description="Personnel description", max_length=500)
 
 class FaceMatch(BaseModel):
+    person_id: Optional[int] = Field(None, description="Matched person ID (None for unknown faces)")
     emp_id: str
     name: str
     match_score: float = Field(description="match percentage (0-100%)")
@@ -144,6 +151,20 @@ def create_app() -> FastAPI:
     def get_face_service_instance():
         return get_advanced_face_service()
     
+    # Bounded pool for blocking inference work（responds 429 when saturated）
+    inference = get_inference_executor()
+    
+    # Pick up config.json changes made by other worker processes
+    config.start_watcher(config.get('api.config_watch_interval', 2.0))
+    
+    @app.on_event("shutdown")
+    def flush_analytics_events():
+        """Write queued analytics events before the worker exits（leftovers go to the spool）"""
+        from ..services import advanced_face_service as face_service_module
+        face_service = face_service_module.advanced_face_service
+        if face_service is not None and face_service.analytics_sink is not None:
+            face_service.analytics_sink.close()
+    
     # Create a global visualizer instance
     visualizer = EnhancedFaceVisualizer()
 
@@ -194,7 +215,7 @@ def create_app() -> FastAPI:
             if file.content_type and not file.content_type.startswith('image/'):
                 raise HTTPException(status_code=400, detail="Only supports image files")
 
-            # Save temporary files
+            # Upload limits
             upload_config = get_upload_config()
             
             # Check file size
@@ -214,69 +235,68 @@ def create_app() -> FastAPI:
                 if file_size > 10 * 1024 * 1024:
                     raise HTTPException(status_code=400, detail="File too large")
 
-            # Save temporary files
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            temp_file.write(content)
-            temp_file.close()
+            # Decode in memory（no temporary file），shared by enrollment and visualization
+            image = await inference.run(decode_upload, content)
+            if image is None:
+                return EnrollmentResponse(success=False, error='Unable to read image file')
 
-            try:
-                # Call the service for storage
-                import time
-                start_time = time.time()
-                result = service.enroll_person(name, temp_file.name, region, emp_id, emp_rank, description, file.filename)
-                processing_time = time.time() - start_time
-                
-                if result['success']:
-                    # Log registration event
-                    try:
-                        person_id = result.get('person_id')
-                        service.db_manager.log_event(
-                            event_type='registration',
-                            person_id=person_id,
-                            emp_id=emp_id,
-                            name=name,
-                            region=region,
-                            metadata={'face_encoding_id': result.get('face_encoding_id')}
-                        )
-                        logger.info(f"✅ Logged registration event for {name}")
-                    except Exception as log_error:
-                        logger.error(f"Failed to log registration event: {log_error}")
-                    
-                    # Generate face detection visualization images
-                    visualized_image = None
-                    face_details = None
-                    
-                    try:
-                        # Call the visualization interface to generate detection images
-                        visual_result = service.visualize_face_detection(temp_file.name)
-                        if visual_result['success'] and 'image_base64' in visual_result:
-                            visualized_image = visual_result['image_base64']
-                            face_details = visual_result.get('faces', [])
-                    except Exception as e:
-                        print(f"Failed to generate visualization image: {e}")
-                    
-                    return EnrollmentResponse(
-                        success=True,
-                        emp_id=result['emp_id'],
-                        face_encoding_id=int(result.get('face_encoding_id', 0)) if result.get('face_encoding_id') else None,
-                        person_name=name,
-                        description=description,
-                        faces_detected=int(result.get('faces_detected', 1)),
-                        face_quality=float(result.get('quality_score', 0.0)) if result.get('quality_score') else None,
-                        processing_time=float(processing_time),
-                        feature_dim=int(result.get('feature_dim', 0)) if result.get('feature_dim') else None,
-                        embeddings_count=1,
-                        visualized_image=visualized_image,
-                        face_details=face_details
-                    )
-                else:
-                    return EnrollmentResponse(
-                        success=False,
-                        error=result['error']
+            # Call the service for storage
+            import time
+            start_time = time.time()
+            result = await inference.run(service.enroll_person, name, image, region, emp_id, emp_rank, description, file.filename)
+            processing_time = time.time() - start_time
+            
+            if result['success']:
+                # Log registration event
+                try:
+                    person_id = result.get('person_id')
+                    await run_in_threadpool(
+                        service.log_event,
+                        event_type='registration',
+                        person_id=person_id,
+                        emp_id=emp_id,
+                        name=name,
+                        region=region,
+                        metadata={'face_encoding_id': result.get('face_encoding_id')}
                     )
-            finally:
-                # Clean temporary files
-                os.unlink(temp_file.name)
+                    logger.info(f"✅ Logged registration event for {name}")
+                except Exception as log_error:
+                    logger.error(f"Failed to log registration event: {log_error}")
+                
+                # Generate face detection visualization images
+                visualized_image = None
+                face_details = None
+                
+                try:
+                    # Call the visualization interface to generate detection images
+                    visual_result = await inference.run(service.visualize_face_detection, image)
+                    if visual_result['success'] and 'image_base64' in visual_result:
+                        visualized_image = visual_result['image_base64']
+                        face_details = visual_result.get('faces', [])
+                except HTTPException:
+                    raise
+                except Exception as e:
+                    print(f"Failed to generate visualization image: {e}")
+                
+                return EnrollmentResponse(
+                    success=True,
+                    emp_id=result['emp_id'],
+                    face_encoding_id=int(result.get('face_encoding_id', 0)) if result.get('face_encoding_id') else None,
+                    person_name=name,
+                    description=description,
+                    faces_detected=int(result.get('faces_detected', 1)),
+                    face_quality=float(result.get('quality_score', 0.0)) if result.get('quality_score') else None,
+                    processing_time=float(processing_time),
+                    feature_dim=int(result.get('feature_dim', 0)) if result.get('feature_dim') else None,
+                    embeddings_count=1,
+                    visualized_image=visualized_image,
+                    face_details=face_details
+                )
+            else:
+                return EnrollmentResponse(
+                    success=False,
+                    error=result['error']
+                )
 
         except HTTPException:
             raise
@@ -307,7 +327,7 @@ def create_app() -> FastAPI:
             if file.content_type and not file.content_type.startswith('image/'):
                 raise HTTPException(status_code=400, detail="Only supports image files")
 
-            # Save temporary files
+            # Upload limits
             upload_config = get_upload_config()
             
             # Check file size
@@ -327,57 +347,54 @@ def create_app() -> FastAPI:
                 if file_size > 10 * 1024 * 1024:
                     raise HTTPException(status_code=400, detail="File too large")
 
-            # Save temporary files
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            temp_file.write(content)
-            temp_file.close()
+            # Decode in memory（no temporary file）
+            image = await inference.run(decode_upload, content)
+            if image is None:
+                return EnrollmentResponse(success=False, error='Unable to read image file')
 
-            try:
-                # Call the service for storage
-                import time
-                start_time = time.time()
-                result = service.enroll_person(name, temp_file.name, region, emp_id, emp_rank, description, file.filename)
-                processing_time = time.time() - start_time
+            # Call the service for storage
+            import time
+            start_time = time.time()
+            result = await inference.run(service.enroll_person, name, image, region, emp_id, emp_rank, description, file.filename)
+            processing_time = time.time() - start_time
+            
+            if result['success']:
+                # Log registration event
+                await run_in_threadpool(
+                    service.log_event,
+                    event_type='registration',
+                    person_id=result.get('person_id'),
+                    emp_id=emp_id,
+                    name=name,
+                    region=region,
+                    metadata={
+                        'face_encoding_id': result.get('face_encoding_id'),
+                        'quality_score': result.get('quality_score'),
+                        'processing_time': processing_time
+                    }
+                )
                 
-                if result['success']:
-                    # Log registration event
-                    service.db_manager.log_event(
-                        event_type='registration',
-                        person_id=result.get('person_id'),
-                        emp_id=emp_id,
-                        name=name,
-                        region=region,
-                        metadata={
-                            'face_encoding_id': result.get('face_encoding_id'),
-                            'quality_score': result.get('quality_score'),
-                            'processing_time': processing_time
-                        }
-                    )
-                    
-                    return EnrollmentResponse(
-                        success=True,
-                        emp_id=result['emp_id'],
-                        face_encoding_id=int(result.get('face_encoding_id', 0)) if result.get('face_encoding_id') else None,
-                        person_name=name,
-                        description=description,
-                        faces_detected=int(result.get('faces_detected', 1)),
-                        face_quality=float(result.get('quality_score', 0.0)) if result.get('quality_score') else None,
-                        processing_time=float(processing_time),
-                        feature_dim=int(result.get('feature_dim', 0)) if result.get('feature_dim') else None,
-                        embeddings_count=1,
-                        # face_encoding=result.get('face_encoding'),  # Returns the face encoding vector
-                        # The simplified version does not return image data
-                        visualized_image=None,
-                        face_details=None
-                    )
-                else:
-                    return EnrollmentResponse(
-                        success=False,
-                        error=result['error']
-                    )
-            finally:
-                # Clean temporary files
-                os.unlink(temp_file.name)
+                return EnrollmentResponse(
+                    success=True,
+                    emp_id=result['emp_id'],
+                    face_encoding_id=int(result.get('face_encoding_id', 0)) if result.get('face_encoding_id') else None,
+                    person_name=name,
+                    description=description,
+                    faces_detected=int(result.get('faces_detected', 1)),
+                    face_quality=float(result.get('quality_score', 0.0)) if result.get('quality_score') else None,
+                    processing_time=float(processing_time),
+                    feature_dim=int(result.get('feature_dim', 0)) if result.get('feature_dim') else None,
+                    embeddings_count=1,
+                    # face_encoding=result.get('face_encoding'),  # Returns the face encoding vector
+                    # The simplified version does not return image data
+                    visualized_image=None,
+                    face_details=None
+                )
+            else:
+                return EnrollmentResponse(
+                    success=False,
+                    error=result['error']
+                )
 
         except HTTPException:
             raise
@@ -405,7 +422,7 @@ def create_app() -> FastAPI:
             if file.content_type and not file.content_type.startswith('image/'):
                 raise HTTPException(status_code=400, detail="Only supports image files")
 
-            # Save temporary files
+            # Upload limits
             upload_config = get_upload_config()
             
             # Check file size
@@ -425,35 +442,31 @@ def create_app() -> FastAPI:
                 if file_size > 10 * 1024 * 1024:
                     raise HTTPException(status_code=400, detail="File too large")
 
-            # Save temporary files
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            temp_file.write(content)
-            temp_file.close()
+            # Decode in memory（no temporary file）
+            image = await inference.run(decode_upload, content)
+            if image is None:
+                return EmbeddingExtractionResponse(success=False, error='Unable to read image file')
 
-            try:
-                # Call the service for feature extraction
-                import time
-                start_time = time.time()
-                result = service.extract_face_embeddings(temp_file.name)
-                processing_time = time.time() - start_time
-                
-                if result['success']:
-                    return EmbeddingExtractionResponse(
-                        success=True,
-                        faces=result.get('faces', []),
-                        total_faces=result.get('total_faces', 0),
-                        processing_time=float(processing_time),
-                        model_info=result.get('model_info'),
-                        image_size=result.get('image_size')
-                    )
-                else:
-                    return EmbeddingExtractionResponse(
-                        success=False,
-                        error=result.get('error', 'unknown error')
-                    )
-            finally:
-                # Clean temporary files
-                os.unlink(temp_file.name)
+            # Call the service for feature extraction
+            import time
+            start_time = time.time()
+            result = await inference.run(service.extract_face_embeddings, image)
+            processing_time = time.time() - start_time
+            
+            if result['success']:
+                return EmbeddingExtractionResponse(
+                    success=True,
+                    faces=result.get('faces', []),
+                    total_faces=result.get('total_faces', 0),
+                    processing_time=float(processing_time),
+                    model_info=result.get('model_info'),
+                    image_size=result.get('image_size')
+                )
+            else:
+                return EmbeddingExtractionResponse(
+                    success=False,
+                    error=result.get('error', 'unknown error')
+                )
 
         except HTTPException:
             raise
@@ -517,47 +530,36 @@ def create_app() -> FastAPI:
             file_contents = {}  # Store file content，Avoid repeated reads
             logger.info(f"Video registration mode：right {len(file_items)} frame pre-check")
             
-            # First save all files as temporary files
-            temp_files = []
-            try:
-                for i, item in enumerate(file_items):
-                    file = item['file']
-                    content = await file.read()
-                    file_contents[i] = content  # Store content for later use
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-                    temp_file.write(content)
-                    temp_file.close()
-                    temp_files.append(temp_file.name)
-                
-                # Perform pre-check
-                pre_check_result = service.pre_check_duplicate_for_batch(temp_files, target_name)
-                
-                if not pre_check_result['success']:
-                    # Precheck failed，Return error immediately，No registration required
-                    logger.warning(f"Video registration pre-check failed: {pre_check_result['error']}")
-                    return {
+            # Read every upload once and decode it in memory；the decoded frames are shared by
+            # the pre-check and the enrollment below
+            for i, item in enumerate(file_items):
+                file_contents[i] = await item['file'].read()  # Store content for later use
+            contents = [file_contents[i] for i in range(len(file_items))]
+            decoded_frames = await inference.run(lambda: [decode_upload(content) for content in contents])
+            
+            # Perform pre-check（admission point for the whole batch on the inference executor）
+            pre_check_result = await inference.run(service.pre_check_duplicate_for_batch, decoded_frames, target_name)
+            
+            if not pre_check_result['success']:
+                # Precheck failed，Return error immediately，No registration required
+                logger.warning(f"Video registration pre-check failed: {pre_check_result['error']}")
+                return {
+                    'success': False,
+                    'total_files': len(files),
+                    'success_count': 0,
+                    'error_count': len(files),
+                    'results': [{
+                        'file_name': file_items[pre_check_result.get('frame_index', 1) - 1]['filename'] if 'frame_index' in pre_check_result else file_items[0]['filename'],
+                        'name': target_name,
                         'success': False,
-                        'total_files': len(files),
-                        'success_count': 0,
-                        'error_count': len(files),
-                        'results': [{
-                            'file_name': file_items[pre_check_result.get('frame_index', 1) - 1]['filename'] if 'frame_index' in pre_check_result else file_items[0]['filename'],
-                            'name': target_name,
-                            'success': False,
-                            'error': pre_check_result['error']
-                        }],
-                        'message': f'Video registration failed: {pre_check_result["error"]}',
-                        'duplicate_detected': True,
-                        'is_video_registration': True
-                    }
-                
-                logger.info(f"Video registration pre-check passed，It's safe to register")
-                
-            finally:
-                # Clean temporary files
-                for temp_file_path in temp_files:
-                    if os.path.exists(temp_file_path):
-                        os.unlink(temp_file_path)
+                        'error': pre_check_result['error']
+                    }],
+                    'message': f'Video registration failed: {pre_check_result["error"]}',
+                    'duplicate_detected': True,
+                    'is_video_registration': True
+                }
+            
+            logger.info(f"Video registration pre-check passed，It's safe to register")
             
             for i, item in enumerate(file_items):
                 file = item['file']
@@ -603,104 +605,107 @@ def create_app() -> FastAPI:
                         error_count += 1
                         continue
 
-                    # Save temporary files
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-                    temp_file.write(content)
-                    temp_file.close()
+                    # Frame decoded in memory during the pre-check
+                    image = decoded_frames[i] if i < len(decoded_frames) else None
+                    if image is None:
+                        results.append({
+                            'file_name': original_filename,
+                            'name': person_name,
+                            'success': False,
+                            'error': 'Unable to read image file'
+                        })
+                        error_count += 1
+                        continue
 
-                    try:
-                        # Validate required fields
-                        if not region or not emp_id or not emp_rank:
-                            results.append({
-                                'file_name': original_filename,
-                                'name': person_name,
-                                'success': False,
-                                'error': 'Missing required fields: region, emp_id, or emp_rank'
-                            })
-                            error_count += 1
-                            continue
+                    # Validate required fields
+                    if not region or not emp_id or not emp_rank:
+                        results.append({
+                            'file_name': original_filename,
+                            'name': person_name,
+                            'success': False,
+                            'error': 'Missing required fields: region, emp_id, or emp_rank'
+                        })
+                        error_count += 1
+                        continue
+                    
+                    # Call the service for storage，Pass in the original file name for correct storage
+                    # If it is a video registration that has been pre-checked，Use a duplicate-free version
+                    # The batch was already admitted by the pre-check，so frames are not rejected halfway through
+                    if is_single_person_batch and target_name:
+                        result = await run_in_threadpool(service.enroll_person_no_duplicate_check, person_name, image, region, emp_id, emp_rank, person_description, original_filename)
+                    else:
+                        result = await run_in_threadpool(service.enroll_person, person_name, image, region, emp_id, emp_rank, person_description, original_filename)
+                    
+                    if result['success']:
+                        # successfully processed，Add features to session list（If it is single-player batch mode）
+                        if is_single_person_batch:
+                            if 'face_encoding' in result and result['face_encoding']:
+                                session_features.append(np.array(result['face_encoding']))
                         
-                        # Call the service for storage，Pass in the original file name for correct storage
-                        # If it is a video registration that has been pre-checked，Use a duplicate-free version
-                        if is_single_person_batch and target_name:
-                            result = service.enroll_person_no_duplicate_check(person_name, temp_file.name, region, emp_id, emp_rank, person_description, original_filename)
-                        else:
-                            result = service.enroll_person(person_name, temp_file.name, region, emp_id, emp_rank, person_description, original_filename)
+                        results.append({
+                            'file_name': original_filename,
+                            'name': person_name,
+                            'emp_id': result.get('emp_id'),
+                            'face_encoding_id': result.get('face_encoding_id'),  # Add facial featuresID
+                            'success': True,
+                            'quality_score': result.get('quality_score', 0)
+                        })
+                        success_count += 1
+                    else:
+                        # Failure handling - Strict duplication testing will immediately stop all registrations
+                        error_msg = result.get('error', 'Storage failed')
                         
-                        if result['success']:
-                            # successfully processed，Add features to session list（If it is single-player batch mode）
-                            if is_single_person_batch:
-                                if 'face_encoding' in result and result['face_encoding']:
-                                    session_features.append(np.array(result['face_encoding']))
+                        # Check if it is a duplicate face error
+                        if ('Similar faces' in error_msg or 'Already exists' in error_msg or 
+                            'Already registered' in error_msg or 'Cannot register as a different person' in error_msg):
                             
-                            results.append({
-                                'file_name': original_filename,
-                                'name': person_name,
-                                'emp_id': result.get('emp_id'),
-                                'face_encoding_id': result.get('face_encoding_id'),  # Add facial featuresID
-                                'success': True,
-                                'quality_score': result.get('quality_score', 0)
-                            })
-                            success_count += 1
-                        else:
-                            # Failure handling - Strict duplication testing will immediately stop all registrations
-                            error_msg = result.get('error', 'Storage failed')
+                            # Duplicate faces detected，Stop the entire batch immediately
+                            logger.warning(f"Duplicate faces detected，Stop all registrations immediately: {error_msg}")
                             
-                            # Check if it is a duplicate face error
-                            if ('Similar faces' in error_msg or 'Already exists' in error_msg or 
-                                'Already registered' in error_msg or 'Cannot register as a different person' in error_msg):
-                                
-                                # Duplicate faces detected，Stop the entire batch immediately
-                                logger.warning(f"Duplicate faces detected，Stop all registrations immediately: {error_msg}")
-                                
-                                if is_single_person_batch:
-                                    # Error message in video registration mode
-                                    return {
-                                        'success': False,
-                                        'total_files': len(files),
-                                        'success_count': success_count,
-                                        'error_count': 1,
-                                        'results': [{
-                                            'file_name': original_filename,
-                                            'name': person_name,
-                                            'success': False,
-                                            'error': error_msg
-                                        }],
-                                        'message': f'Video registration failed: {error_msg}',
-                                        'duplicate_detected': True,
-                                        'is_video_registration': True
-                                    }
-                                else:
-                                    # General batch registration error message
-                                    return {
+                            if is_single_person_batch:
+                                # Error message in video registration mode
+                                return {
+                                    'success': False,
+                                    'total_files': len(files),
+                                    'success_count': success_count,
+                                    'error_count': 1,
+                                    'results': [{
+                                        'file_name': original_filename,
+                                        'name': person_name,
                                         'success': False,
-                                        'total_files': len(files),
-                                        'success_count': success_count,
-                                        'error_count': 1,
-                                        'results': [{
-                                            'file_name': original_filename,
-                                            'name': person_name,
-                                            'success': False,
-                                            'error': error_msg
-                                        }],
-                                        'message': f'Registration failed: {error_msg}',
-                                        'duplicate_detected': True
-                                    }
+                                        'error': error_msg
+                                    }],
+                                    'message': f'Video registration failed: {error_msg}',
+                                    'duplicate_detected': True,
+                                    'is_video_registration': True
+                                }
                             else:
-                                # Other errors，Log but continue processing
-                                results.append({
-                                    'file_name': original_filename,
-                                    'name': person_name,
+                                # General batch registration error message
+                                return {
                                     'success': False,
-                                    'error': error_msg
-                                })
-                                error_count += 1
-                            
-                    finally:
-                        # Delete temporary files
-                        if os.path.exists(temp_file.name):
-                            os.unlink(temp_file.name)
-                            
+                                    'total_files': len(files),
+                                    'success_count': success_count,
+                                    'error_count': 1,
+                                    'results': [{
+                                        'file_name': original_filename,
+                                        'name': person_name,
+                                        'success': False,
+                                        'error': error_msg
+                                    }],
+                                    'message': f'Registration failed: {error_msg}',
+                                    'duplicate_detected': True
+                                }
+                        else:
+                            # Other errors，Log but continue processing
+                            results.append({
+                                'file_name': original_filename,
+                                'name': person_name,
+                                'success': False,
+                                'error': error_msg
+                            })
+                            error_count += 1
+                        
+
                 except Exception as file_error:
                     results.append({
                         'file_name': original_filename,
@@ -718,7 +723,8 @@ def create_app() -> FastAPI:
             # Log registration event for successful batch enrollment
             if success_count > 0:
                 try:
-                    service.db_manager.log_event(
+                    await run_in_threadpool(
+                        service.log_event,
                         event_type='registration',
                         person_id=None,  # Batch enrollment may have multiple person IDs
                         emp_id=emp_id,
@@ -746,6 +752,8 @@ def create_app() -> FastAPI:
                 'is_video_registration': is_single_person_batch  # Whether the logo is a video registration
             }
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Batch warehousing interface error: {str(e)}")
             return {
@@ -772,64 +780,53 @@ def create_app() -> FastAPI:
         - emp_id: Optional - if provided, only searches this specific employee's faces
         """
         try:
-            # Read recognition thresholds from configuration file
-            import json
-            try:
-                with open('config.json', 'r') as f:
-                    config_data = json.load(f)
-                    threshold = config_data.get('face_recognition', {}).get('recognition_threshold', 0.3)
-            except:
-                threshold = 0.3  # default value
+            # Recognition threshold from the configuration snapshot（no file I/O）
+            threshold = config.snapshot().get('face_recognition.recognition_threshold', 0.3)
             
             # Verify file type
             if not file.content_type or not file.content_type.startswith('image/'):
                 raise HTTPException(status_code=400, detail="Only supports image files")
 
-            # Save temporary files
+            # Decode in memory at detector scale（no temporary file）
             content = await file.read()
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            temp_file.write(content)
-            temp_file.close()
-
-            try:
-                # read image
-                image = cv2.imread(temp_file.name)
-                if image is None:
-                    raise HTTPException(status_code=400, detail="Unable to parse image")
-                
-                # Call service for identification（Use dynamic thresholds and region/emp_id filtering）
-                result = service.recognize_face_with_threshold(image, region=region, emp_id=emp_id, threshold=threshold)
-                
-                if result['success']:
-                    matches = [
-                        FaceMatch(
-                            emp_id=match['emp_id'],
-                            name=match['name'],
-                            match_score=match['match_score'],
-                            distance=match['distance'],
-                            bbox=match['bbox'],
-                            quality=match['quality'],
-                            face_encoding_id=match.get('face_encoding_id')  # Add faceIDField
-                        )
-                        for match in result['matches']
-                    ]
-                    
-                    return RecognitionResponse(
-                        success=True,
-                        matches=matches,
-                        total_faces=result['total_faces'],
-                        message=result.get('message')
-                    )
-                else:
-                    return RecognitionResponse(
-                        success=False,
-                        matches=[],
-                        total_faces=0,
-                        error=result['error']
+            image = await inference.run(decode_upload, content)
+            if image is None:
+                raise HTTPException(status_code=400, detail="Unable to parse image")
+            
+            # Call service for identification（Use dynamic thresholds and region/emp_id filtering）
+            # Runs off the event loop so concurrent requests can share micro-batches
+            result = await inference.run(
+                service.recognize_face_with_threshold, image, region=region, emp_id=emp_id, threshold=threshold
+            )
+            
+            if result['success']:
+                matches = [
+                    FaceMatch(
+                        person_id=match.get('person_id'),
+                        emp_id=match['emp_id'],
+                        name=match['name'],
+                        match_score=match['match_score'],
+                        distance=match['distance'],
+                        bbox=match['bbox'],
+                        quality=match['quality'],
+                        face_encoding_id=match.get('face_encoding_id')  # Add faceIDField
                     )
-            finally:
-                # Clean temporary files
-                os.unlink(temp_file.name)
+                    for match in result['matches']
+                ]
+                
+                return RecognitionResponse(
+                    success=True,
+                    matches=matches,
+                    total_faces=result['total_faces'],
+                    message=result.get('message')
+                )
+            else:
+                return RecognitionResponse(
+                    success=False,
+                    matches=[],
+                    total_faces=0,
+                    error=result['error']
+                )
 
         except HTTPException:
             raise
@@ -859,56 +856,42 @@ def create_app() -> FastAPI:
         If no threshold parameter is provided，The recognition threshold in the configuration file will be used
         """
         try:
-            # If no threshold is provided，Read from configuration file
+            # If no threshold is provided，use the configuration snapshot
             if threshold is None:
-                import json
-                try:
-                    with open('config.json', 'r') as f:
-                        config_data = json.load(f)
-                        threshold = config_data.get('face_recognition', {}).get('recognition_threshold', 0.25)
-                except:
-                    threshold = 0.25  # default value，Consistent with configuration file
+                threshold = config.snapshot().get('face_recognition.recognition_threshold', 0.25)
             # Verify file type
             if not file.content_type or not file.content_type.startswith('image/'):
                 raise HTTPException(status_code=400, detail="Only supports image files")
 
-            # read image
+            # read image（at detector scale）
             content = await file.read()
-            nparr = np.frombuffer(content, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            image = await inference.run(decode_upload, content)
             
             if image is None:
                 raise HTTPException(status_code=400, detail="Unable to parse image")
 
             # Call service for identification（Use dynamic thresholds and region/emp_id filtering）
-            result = service.recognize_face_with_threshold(image, region=region, emp_id=emp_id, threshold=threshold)
+            result = await inference.run(service.recognize_face_with_threshold, image, region=region, emp_id=emp_id, threshold=threshold)
             
             if result['success']:
                 # make surethresholdNot forNone（has been assigned a value at this time）
                 assert threshold is not None, "threshold should not be None at this point"
                 
-                # Generate visualization images using augmented visualizer
-                visual_result = visualizer.visualize_recognition_results(
-                    image, result['matches'], threshold
+                # Draw on the full-resolution image（boxes are reported in original pixels）
+                visual_result = await inference.run(
+                    visualizer.visualize_recognition_results, image.full, result['matches'], threshold
                 )
                 
                 if visual_result['success']:
-                    # Willbase64Convert image to temporary file
-                    import base64
+                    # Return the JPEG straight from memory
+                    import pytz
                     image_data = base64.b64decode(visual_result['image_base64'])
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-                    temp_file.write(image_data)
-                    temp_file.close()
-                    
-                    try:
-                        return FileResponse(
-                            temp_file.name, 
-                            media_type="image/jpeg",
-                            filename=f"recognition_result_{datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%Y%m%d_%H%M%S')}.jpg"
-                        )
-                    finally:
-                        # Clean temporary files（delayed deletion）
-                        asyncio.create_task(cleanup_temp_file(temp_file.name))
+                    filename = f"recognition_result_{datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%Y%m%d_%H%M%S')}.jpg"
+                    return Response(
+                        content=image_data,
+                        media_type="image/jpeg",
+                        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+                    )
                 else:
                     raise HTTPException(status_code=500, detail="Visualization generation failed")
             else:
@@ -920,13 +903,142 @@ def create_app() -> FastAPI:
             logger.error(f"Visually identify interface errors: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Server internal error: {str(e)}")
 
-    async def cleanup_temp_file(file_path: str):
-        """Delay cleaning of temporary files"""
-        await asyncio.sleep(1)  # wait1Seconds to ensure the file has been downloaded
+    @app.websocket("/ws/recognize")
+    async def recognize_stream(websocket: WebSocket):
+        """
+        🎥 Live recognition stream
+        
+        Persistent alternative to posting every camera frame to /api/recognize
+        - Connection context from the query string: region (required), client_id, emp_id
+        - Binary messages: JPEG/PNG frames
+        - Text messages: JSON {"region": ..., "client_id": ..., "emp_id": ...} updates the context
+        - Replies: {"type": "result", "frame": n, ...same fields as /api/recognize...},
+          {"type": "context", ...}, {"type": "busy"} or {"type": "error"}
+        Latest frame wins: frames that arrive while a frame is being recognized replace
+        each other, so only the newest one is processed
+        """
+        params = websocket.query_params
+        context = {
+            'region': params.get('region') or None,
+            'client_id': params.get('client_id') or None,
+            'emp_id': params.get('emp_id') or None
+        }
+        await websocket.accept()
+        
+        service = get_face_service()
+        max_frame_bytes = config.get('api.live_stream.max_frame_bytes', 4194304)
+        slot = LatestFrameSlot()
+        # Consecutive frames of this stream share identities through the face tracker
+        tracker = service.create_face_tracker()
+        send_lock = asyncio.Lock()
+        
+        async def send(message: Dict[str, Any]):
+            async with send_lock:
+                await websocket.send_text(json.dumps(message))
+        
+        def recognize_frame(data: bytes, frame_context: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+            image = decode_upload(data)
+            if image is None:
+                return {'success': False, 'matches': [], 'total_faces': 0, 'error': 'Unable to parse image'}
+            if tracker is not None:
+                return service.recognize_tracked_frame(
+                    image, tracker, region=frame_context['region'], threshold=threshold,
+                    emp_id=frame_context['emp_id'], client_id=frame_context['client_id']
+                )
+            return service.recognize_face_with_threshold(
+                image, region=frame_context['region'], threshold=threshold,
+                emp_id=frame_context['emp_id'], client_id=frame_context['client_id']
+            )
+        
+        async def receive_frames():
+            try:
+                while True:
+                    message = await websocket.receive()
+                    if message['type'] == 'websocket.disconnect':
+                        return
+                    if message.get('bytes') is not None:
+                        if len(message['bytes']) > max_frame_bytes:
+                            await send({'type': 'error', 'error': f"Frame larger than {max_frame_bytes} bytes"})
+                            continue
+                        slot.put(message['bytes'])
+                    elif message.get('text'):
+                        try:
+                            update = json.loads(message['text'])
+                        except ValueError:
+                            await send({'type': 'error', 'error': 'Invalid JSON message'})
+                            continue
+                        if not isinstance(update, dict):
+                            await send({'type': 'error', 'error': 'Context update must be a JSON object'})
+                            continue
+                        invalid = [key for key in ('region', 'client_id', 'emp_id')
+                                   if update.get(key) is not None and not isinstance(update[key], str)]
+                        if invalid:
+                            await send({'type': 'error', 'error': f"Context values must be strings or null: {', '.join(invalid)}"})
+                            continue
+                        for key in ('region', 'client_id', 'emp_id'):
+                            if key in update:
+                                context[key] = update[key] or None
+                        await send({'type': 'context', **context})
+            finally:
+                slot.close()
+        
+        async def process_frames():
+            while True:
+                frame = await slot.get()
+                if frame is None:
+                    return
+                if not context['region']:
+                    await send({'type': 'error', 'frame': frame.seq, 'error': 'Region is not set'})
+                    continue
+                
+                threshold = config.snapshot().get('face_recognition.recognition_threshold', 0.3)
+                try:
+                    result = await inference.run(recognize_frame, frame.data, dict(context), threshold)
+                except InferenceQueueFull:
+                    # Server saturated: skip this frame, the client keeps streaming
+                    await send({'type': 'busy', 'frame': frame.seq, 'retry_after': 1})
+                    continue
+                except Exception as e:
+                    logger.error(f"Stream recognition failed: {e}")
+                    result = {'success': False, 'matches': [], 'total_faces': 0, 'error': str(e)}
+                
+                await send({
+                    'type': 'result',
+                    'frame': frame.seq,
+                    'success': result['success'],
+                    'matches': [
+                        {
+                            'person_id': match.get('person_id'),
+                            'emp_id': match['emp_id'],
+                            'name': match['name'],
+                            'match_score': float(match['match_score']),
+                            'distance': float(match['distance']),
+                            'bbox': [int(v) for v in match['bbox']],
+                            'quality': float(match['quality']),
+                            'face_encoding_id': match.get('face_encoding_id'),
+                            'track_id': match.get('track_id'),
+                            'reused': match.get('reused', False)
+                        }
+                        for match in result.get('matches', [])
+                    ],
+                    'total_faces': result.get('total_faces', 0),
+                    'message': result.get('message'),
+                    'error': result.get('error'),
+                    'embedded_faces': result.get('embedded_faces', result.get('total_faces', 0)),
+                    'latency_ms': round((time.monotonic() - frame.received_at) * 1000, 1),
+                    'dropped_frames': slot.dropped
+                })
+        
+        receiver = asyncio.create_task(receive_frames())
         try:
-            os.unlink(file_path)
-        except:
-            pass
+            await process_frames()
+        except Exception as e:
+            # Client went away while a result was being sent
+            logger.debug(f"Recognition stream closed: {e}")
+        finally:
+            receiver.cancel()
+            logger.info(f"Recognition stream ended: {slot.received} frames received，{slot.dropped} dropped as stale"
+                        + (f"，tracker {tracker.get_metrics()}" if tracker is not None else ""))
 
     # DISABLED: Analyze API not needed
     # @app.post("/api/analyze", response_model=AttributeAnalysisResponse)
@@ -942,7 +1054,7 @@ def create_app() -> FastAPI:
     #     pass
 
     @app.get("/api/statistics")
-    async def get_statistics(service = Depends(get_face_service)):
+    def get_statistics(service = Depends(get_face_service)):
         """
         📊 Get system statistics
         
@@ -993,7 +1105,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Failed to obtain statistics")
 
     @app.post("/api/config/threshold")
-    async def update_threshold(threshold: float = Form(...)):
+    def update_threshold(threshold: float = Form(...)):
         """
         🔧 Update recognition threshold configuration
         
@@ -1018,7 +1130,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Update threshold failed")
 
     @app.post("/api/config/duplicate_threshold")
-    async def update_duplicate_threshold(threshold: float = Form(...)):
+    def update_duplicate_threshold(threshold: float = Form(...)):
         """
         🔧 Update duplicate warehousing threshold configuration
         
@@ -1043,82 +1155,93 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Failed to update duplicate warehousing threshold")
 
     @app.get("/api/persons")
-    async def get_persons(include_image_info: bool = Query(False, description="Whether to include picture information"), service = Depends(get_face_service)):
+    def get_persons(request: Request,
+                    include_image_info: bool = Query(False, description="Whether to include picture information"),
+                    region: Optional[str] = Query(None, description="Only persons of this region"),
+                    client_id: Optional[str] = Query(None, description="Only persons of this client"),
+                    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size（omit to return all persons）"),
+                    cursor: Optional[int] = Query(None, ge=0, description="next_cursor of the previous page"),
+                    service = Depends(get_face_service)):
         """
         👥 Get a list of all people
         
         Return all entered personnel information in the system，Optionally include image information such as original file name
+        
+        characteristic:
+        - One aggregate query per page（face counts and profile picture id），image blobs are never read
+        - Keyset pagination：pass limit，then the returned next_cursor as cursor
+        - ETag from the gallery version：send If-None-Match to get 304 when nothing changed
         """
         try:
-            with service.db_manager.get_session() as session:
-                from ..models import Person
-                persons = session.query(Person).all()
-                
-                persons_data = []
-                for person in persons:
-                    # Get the number of codes for this person
-                    from ..models import FaceEncoding
-                    encodings = session.query(FaceEncoding).filter(
-                        FaceEncoding.person_id == person.id
-                    ).order_by(FaceEncoding.id.asc()).all()
-                    
-                    encoding_count = len(encodings)
-                    
-                    # Get the first (oldest) face encoding as profile picture for consistency
-                    first_encoding = encodings[0] if encodings else None
-                    
-                    face_image_url = None
-                    if first_encoding:
-                        face_image_url = f"/api/face/{first_encoding.id}/image"
-                    
-                    person_data = {
-                        "id": person.id,
-                        "name": person.name,
-                        "emp_id": person.emp_id,
-                        "emp_rank": person.emp_rank,
-                        "region": person.region,
-                        "description": person.description,
-                        "created_at": person.created_at.isoformat() if person.created_at else None,
-                        "encodings_count": encoding_count,
-                        "face_count": encoding_count,  # Compatible fields
-                        "face_image_url": face_image_url
-                    }
-                    
-                    # If the request contains image information，Add detailed image file name information
-                    if include_image_info and encodings:
-                        person_data["image_files"] = []
-                        for encoding in encodings:
-                            person_data["image_files"].append({
-                                "encoding_id": encoding.id,
-                                "original_filename": encoding.image_path,  # Now the original file name is stored
-                                "quality_score": encoding.quality_score,
-                                "created_at": encoding.created_at.isoformat() if encoding.created_at else None,
-                                "image_size": len(encoding.image_data) if encoding.image_data else 0
-                            })
-                    
-                    persons_data.append(person_data)
+            gallery_version = service.db_manager.get_gallery_version()
+            query_key = f"{include_image_info}|{region}|{client_id}|{limit}|{cursor}"
+            etag = f'W/"persons-{gallery_version}-{hashlib.blake2b(query_key.encode("utf-8"), digest_size=8).hexdigest()}"'
+            cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            
+            if etag in request.headers.get("if-none-match", ""):
+                return Response(status_code=304, headers=cache_headers)
+            
+            persons, next_cursor = service.db_manager.get_person_summaries(
+                region=region, client_id=client_id, after_id=cursor, limit=limit,
+                include_images=include_image_info
+            )
+            
+            persons_data = []
+            for person in persons:
+                face_image_url = None
+                if person['first_encoding_id'] is not None:
+                    # The first (oldest) face encoding is the profile picture
+                    face_image_url = f"/api/face/{person['first_encoding_id']}/image"
                 
-                response_data = {
-                    "success": True,
-                    "persons": persons_data,
-                    "total": len(persons_data)
+                person_data = {
+                    "id": person['id'],
+                    "name": person['name'],
+                    "emp_id": person['emp_id'],
+                    "emp_rank": person['emp_rank'],
+                    "region": person['region'],
+                    "client_id": person['client_id'],
+                    "description": person['description'],
+                    "created_at": person['created_at'].isoformat() if person['created_at'] else None,
+                    "encodings_count": person['face_count'],
+                    "face_count": person['face_count'],  # Compatible fields
+                    "face_image_url": face_image_url
                 }
                 
-                # If image information is included，Add statistical summary
-                if include_image_info:
-                    total_images = sum(len(p.get("image_files", [])) for p in persons_data)
-                    response_data["image_summary"] = {
-                        "total_images": total_images,
-                        "persons_with_multiple_images": len([p for p in persons_data if len(p.get("image_files", [])) > 1])
-                    }
+                # If the request contains image information，Add detailed image file name information
+                if include_image_info and person['images']:
+                    person_data["image_files"] = [{
+                        "encoding_id": image['encoding_id'],
+                        "original_filename": image['image_path'],  # Now the original file name is stored
+                        "quality_score": image['quality_score'],
+                        "created_at": image['created_at'].isoformat() if image['created_at'] else None,
+                        "image_size": image['image_size']
+                    } for image in person['images']]
                 
-                return JSONResponse(content=response_data)
+                persons_data.append(person_data)
+            
+            response_data = {
+                "success": True,
+                "persons": persons_data,
+                "total": len(persons_data),
+                "next_cursor": next_cursor,
+                "gallery_version": gallery_version
+            }
+            
+            # If image information is included，Add statistical summary
+            if include_image_info:
+                total_images = sum(len(p.get("image_files", [])) for p in persons_data)
+                response_data["image_summary"] = {
+                    "total_images": total_images,
+                    "persons_with_multiple_images": len([p for p in persons_data if len(p.get("image_files", [])) > 1])
+                }
+            
+            return JSONResponse(content=response_data, headers=cache_headers)
         except Exception as e:
             logger.error(f"Failed to get personnel list: {str(e)}")
             raise HTTPException(status_code=500, detail="Failed to get personnel list")
 
     @app.get("/api/person/{emp_id}")
-    async def get_person(emp_id: str, service = Depends(get_face_service)):
+    def get_person(emp_id: str, service = Depends(get_face_service)):
         """
         👤 Get designated person details by Employee ID
         
@@ -1153,7 +1276,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Failed to obtain person details")
 
     @app.get("/api/person/{emp_id}/faces")
-    async def get_person_faces(emp_id: str, service = Depends(get_face_service)):
+    def get_person_faces(emp_id: str, service = Depends(get_face_service)):
         """
         👤 Get all face codes of the specified person by Employee ID
         
@@ -1188,39 +1311,60 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Failed to obtain the person's face list")
 
     @app.api_route("/api/face/{face_encoding_id}/image", methods=["GET", "HEAD"])
-    async def get_face_image(face_encoding_id: int, request: Request, service = Depends(get_face_service)):
+    def get_face_image(face_encoding_id: int, request: Request,
+                       size: Optional[int] = Query(None, description="Thumbnail size（one of storage.thumbnail_sizes），omit for the original"),
+                       service = Depends(get_face_service)):
         """
         🖼️ Get face pictures
         
-        Returns the image data of the specified face encoding
+        Returns the image data of the specified face encoding，or one of its pre-generated thumbnails
+        
+        characteristic:
+        - Served from the content-addressed blob store as a file（no database blob transfer）
+        - Strong ETag from the image content hash，If-None-Match returns 304
         """
         try:
-            # Use the database manager method directly
-            encoding = service.db_manager.get_face_encoding_by_id(face_encoding_id)
-            if not encoding:
-                raise HTTPException(status_code=404, detail="The specified face code was not found")
+            blob_store = service.db_manager.blob_store
+            if size is not None and size not in blob_store.thumbnail_sizes:
+                raise HTTPException(status_code=400, detail=f"size must be one of {list(blob_store.thumbnail_sizes)}")
             
-            image_data = encoding.get_image_data()
-            if not image_data:
+            image_ref = service.db_manager.get_face_image_ref(face_encoding_id)
+            if image_ref is None:
+                raise HTTPException(status_code=404, detail="The specified face code was not found")
+            image_hash, image_data = image_ref
+            
+            image_path = None
+            if image_hash:
+                image_path = blob_store.open_path(image_hash, size)
+                if image_path is None:
+                    if size is not None and blob_store.exists(image_hash):
+                        raise HTTPException(status_code=422, detail="Unable to create a thumbnail of this image")
+                    raise HTTPException(status_code=404, detail="This face code has no associated image data")
+            elif image_data:
+                # Row not yet moved to the blob store
+                image_hash = blob_store.hash_bytes(image_data)
+                if size is not None:
+                    image_data = blob_store.make_thumbnail(image_data, size)
+                    if image_data is None:
+                        raise HTTPException(status_code=422, detail="Unable to create a thumbnail of this image")
+            else:
                 raise HTTPException(status_code=404, detail="This face code has no associated image data")
             
+            etag = f'"{image_hash}"' if size is None else f'"{image_hash}-{size}"'
+            headers = {"ETag": etag, "Cache-Control": "max-age=3600"}
+            
+            if etag in request.headers.get("if-none-match", ""):
+                return Response(status_code=304, headers=headers)
+            
             # forHEADask，Return onlyheaders，No content returned
             if request.method == "HEAD":
-                return Response(
-                    content="",
-                    media_type="image/jpeg",
-                    headers={
-                        "Cache-Control": "max-age=3600",
-                        "Content-Length": str(len(image_data))
-                    }
-                )
+                headers["Content-Length"] = str(os.path.getsize(image_path) if image_path else len(image_data))
+                return Response(content="", media_type="image/jpeg", headers=headers)
             
-            # forGETask，Return image data directly
-            return Response(
-                content=image_data,
-                media_type="image/jpeg",
-                headers={"Cache-Control": "max-age=3600"}
-            )
+            # forGETask，Return the file（sendfile）or the legacy image data
+            if image_path:
+                return FileResponse(image_path, media_type="image/jpeg", headers=headers)
+            return Response(content=image_data, media_type="image/jpeg", headers=headers)
                 
         except HTTPException:
             raise
@@ -1229,20 +1373,19 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Failed to obtain face image")
     
     @app.get("/api/face/{face_encoding_id}/image/info")
-    async def get_face_image_info(face_encoding_id: int, request: Request, service = Depends(get_face_service)):
+    def get_face_image_info(face_encoding_id: int, request: Request, service = Depends(get_face_service)):
         """
         🖼️ Get face image info (JSON with URL)
         
         Returns JSON with image URL for API testing
         """
         try:
-            # Use the database manager method directly
-            encoding = service.db_manager.get_face_encoding_by_id(face_encoding_id)
-            if not encoding:
+            image_ref = service.db_manager.get_face_image_ref(face_encoding_id)
+            if image_ref is None:
                 raise HTTPException(status_code=404, detail="The specified face code was not found")
             
-            image_data = encoding.get_image_data()
-            if not image_data:
+            image_hash, image_data = image_ref
+            if not image_hash and not image_data:
                 raise HTTPException(status_code=404, detail="This face code has no associated image data")
             
             # Get the base URL from the request
@@ -1252,7 +1395,10 @@ def create_app() -> FastAPI:
             return JSONResponse(content={
                 "success": True,
                 "face_encoding_id": face_encoding_id,
-                "image_url": image_url
+                "image_url": image_url,
+                "thumbnail_urls": {
+                    str(size): f"{image_url}?size={size}" for size in service.db_manager.blob_store.thumbnail_sizes
+                }
             })
                 
         except HTTPException:
@@ -1262,7 +1408,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Failed to obtain face image info")
     
     @app.put("/api/person/{emp_id}")
-    async def update_person(emp_id: str, person_data: PersonUpdate, service = Depends(get_face_service)):
+    def update_person(emp_id: str, person_data: PersonUpdate, service = Depends(get_face_service)):
         """
         ✏️ Update designated person information by Employee ID
         
@@ -1287,6 +1433,7 @@ def create_app() -> FastAPI:
                 ist = pytz.timezone('Asia/Kolkata')
                 person.updated_at = datetime.now(ist)
                 session.commit()
+                service.sync_gallery_person(person.id)
                 
                 # Return updated personnel information
                 return JSONResponse(content={
@@ -1307,7 +1454,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Failed to update personnel information")
 
     @app.delete("/api/person/{emp_id}")
-    async def delete_person(emp_id: str, service = Depends(get_face_service)):
+    def delete_person(emp_id: str, service = Depends(get_face_service)):
         """
         🗑️ Delete specified person by Employee ID
         
@@ -1326,6 +1473,7 @@ def create_app() -> FastAPI:
             
             # Use the database manager's delete method which handles everything properly
             success = service.db_manager.delete_person(person_id)
+            service.sync_gallery_person(person_id)
             
             if success:
                 return JSONResponse(content={
@@ -1342,7 +1490,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Failed to delete person")
 
     @app.get("/api/config")
-    async def get_config():
+    def get_config():
         """
         ⚙️ Get system configuration
         
@@ -1352,6 +1500,7 @@ def create_app() -> FastAPI:
             from ..utils.config import config
             return JSONResponse(content={
                 "success": True,
+                "config_version": config.version,
                 "recognition_threshold": getattr(config, 'RECOGNITION_THRESHOLD', 0.24),
                 "detection_threshold": getattr(config, 'DETECTION_THRESHOLD', 0.31),
                 "duplicate_threshold": config.get('face_recognition.duplicate_threshold', 0.95),
@@ -1453,7 +1602,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Failed to update configuration")
 
     @app.delete("/api/face_encoding/{encoding_id}")
-    async def delete_face_encoding(encoding_id: int, service = Depends(get_face_service)):
+    def delete_face_encoding(encoding_id: int, service = Depends(get_face_service)):
         """
         🗑️ Delete specified face code
         
@@ -1464,7 +1613,7 @@ def create_app() -> FastAPI:
             if not success:
                 raise HTTPException(status_code=404, detail="Face encoding does not exist")
             
-            # No cache to clear - PostgreSQL handles everything
+            service.remove_gallery_encoding(encoding_id)
             
             return JSONResponse(content={
                 "success": True,
@@ -1477,7 +1626,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail="Failed to delete face encoding")
 
     @app.delete("/api/person/{emp_id}/faces/{face_encoding_id}")
-    async def delete_person_face(emp_id: str, face_encoding_id: int, service = Depends(get_face_service)):
+    def delete_person_face(emp_id: str, face_encoding_id: int, service = Depends(get_face_service)):
         """
         🗑️ Delete the specified face of the specified person by Employee ID
         
@@ -1506,10 +1655,13 @@ def create_app() -> FastAPI:
                     raise HTTPException(status_code=404, detail="The specified face does not exist or does not belong to the person")
                 
                 # Delete face code
+                image_hash = face_encoding.image_hash
                 session.delete(face_encoding)
+                service.db_manager.refresh_profile_encoding(session, person_id)
                 session.commit()
             
-            # No cache to clear - PostgreSQL handles everything
+            service.db_manager.release_image_blobs([image_hash])
+            service.remove_gallery_encoding(face_encoding_id)
             
             return JSONResponse(content={
                 "success": True,
@@ -1565,237 +1717,226 @@ def create_app() -> FastAPI:
                         error_count += 1
                         continue
                     
-                    # Save temporary files
+                    # Read and decode in memory（no temporary file）
                     content = await face_file.read()
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-                    temp_file.write(content)
-                    temp_file.close()
+                    # Use a facial recognition service to process the image and extract the encoding
+                    image = await inference.run(decode_upload, content)
+                    if image is None:
+                        results.append({
+                            'file_name': face_file.filename,
+                            'success': False,
+                            'error': 'Unable to read image file'
+                        })
+                        error_count += 1
+                        continue
                     
+                    # Detect faces and extract features
+                    detected_faces = await inference.run(service.detect_faces, image)
+                    if not detected_faces:
+                        results.append({
+                            'file_name': face_file.filename,
+                            'success': False,
+                            'error': 'No face detected'
+                        })
+                        error_count += 1
+                        continue
+                    
+                    # Check if multiple faces are detected
+                    if len(detected_faces) > 1:
+                        results.append({
+                            'file_name': face_file.filename,
+                            'success': False,
+                            'error': f'Multiple faces detected({len(detected_faces)}open)，Please provide a photo containing only one face'
+                        })
+                        error_count += 1
+                        continue
+                    
+                    # Use detected faces
+                    detected_face = detected_faces[0]
+                    encoding = detected_face.get('embedding')
+                    if encoding is None:
+                        results.append({
+                            'file_name': face_file.filename,
+                            'success': False,
+                            'error': 'Unable to extract facial features'
+                        })
+                        error_count += 1
+                        continue
+                    
+                    # Check similarity - Verify the face belongs to THIS person
                     try:
-                        # Use a facial recognition service to process the image and extract the encoding
-                        # read image
-                        image = cv2.imread(temp_file.name)
-                        if image is None:
-                            results.append({
-                                'file_name': face_file.filename,
-                                'success': False,
-                                'error': 'Unable to read image file'
-                            })
-                            error_count += 1
-                            continue
-                        
-                        # Detect faces and extract features
-                        detected_faces = service.detect_faces(image)
-                        if not detected_faces:
-                            results.append({
-                                'file_name': face_file.filename,
-                                'success': False,
-                                'error': 'No face detected'
-                            })
-                            error_count += 1
-                            continue
-                        
-                        # Check if multiple faces are detected
-                        if len(detected_faces) > 1:
-                            results.append({
-                                'file_name': face_file.filename,
-                                'success': False,
-                                'error': f'Multiple faces detected({len(detected_faces)}open)，Please provide a photo containing only one face'
-                            })
-                            error_count += 1
-                            continue
-                        
-                        # Use detected faces
-                        detected_face = detected_faces[0]
-                        encoding = detected_face.get('embedding')
-                        if encoding is None:
-                            results.append({
-                                'file_name': face_file.filename,
-                                'success': False,
-                                'error': 'Unable to extract facial features'
-                            })
-                            error_count += 1
-                            continue
-                        
-                        # Check similarity - Verify the face belongs to THIS person
-                        try:
-                            with service.db_manager.get_session() as check_session:
-                                from ..models import FaceEncoding as FaceEncodingModel
-                                
-                                # Get recognition threshold (lower = stricter matching)
-                                recognition_threshold = config.get('face_recognition.recognition_threshold', 0.6)
-                                duplicate_threshold = config.get('face_recognition.duplicate_threshold', 0.85)
-                                
-                                # STEP 1: Verify the new face matches existing faces of THIS person
-                                existing_faces = check_session.query(FaceEncodingModel).filter(
-                                    FaceEncodingModel.person_id == person_id
-                                ).all()
-                                
-                                if existing_faces:  # Only validate if person already has faces
-                                    max_similarity_to_self = 0.0
-                                    
-                                    for existing_face in existing_faces:
-                                        if existing_face.embedding is not None:
-                                            # Handle encoded data in different formats
-                                            existing_encoding = None
-                                            if isinstance(existing_face.embedding, bytes):
-                                                try:
-                                                    existing_encoding = pickle.loads(existing_face.embedding)
-                                                except Exception as e:
-                                                    logger.warning(f"Trait deserialization failed: {e}")
-                                                    continue
-                                            elif isinstance(existing_face.embedding, np.ndarray):
-                                                existing_encoding = existing_face.embedding
-                                            elif isinstance(existing_face.embedding, (list, tuple)):
-                                                existing_encoding = np.array(existing_face.embedding, dtype=np.float32)
-                                            elif isinstance(existing_face.embedding, str):
-                                                try:
-                                                    existing_encoding = np.frombuffer(
-                                                        base64.b64decode(existing_face.embedding), 
-                                                        dtype=np.float32
-                                                    )
-                                                except Exception as e:
-                                                    logger.warning(f"Base64Decoding failed: {e}")
-                                                    continue
-                                            else:
-                                                logger.warning(f"Unknown encoding format: {type(existing_face.embedding)}")
-                                                continue
-                                            
-                                            if existing_encoding is None or len(existing_encoding) == 0:
-                                                continue
-                                            
-                                            # Calculate cosine similarity
-                                            try:
-                                                similarity = float(np.dot(encoding, existing_encoding) / 
-                                                                 (np.linalg.norm(encoding) * np.linalg.norm(existing_encoding)))
-                                                max_similarity_to_self = max(max_similarity_to_self, similarity)
-                                            except Exception as e:
-                                                logger.warning(f"Similarity calculation failed: {e}")
-                                                continue
-                                    
-                                    # If the face doesn't match this person's existing faces, reject it
-                                    if max_similarity_to_self < recognition_threshold:
-                                        results.append({
-                                            'file_name': face_file.filename,
-                                            'success': False,
-                                            'error': f'Face does not match existing faces of {person_name} (Similarity: {max_similarity_to_self*100:.1f}%, required: {recognition_threshold*100:.1f}%)'
-                                        })
-                                        error_count += 1
-                                        raise Exception("Face mismatch")
-                                
-                                # STEP 2: Check similarities to other people's faces
-                                other_faces = check_session.query(FaceEncodingModel, Person).join(
-                                    Person, FaceEncodingModel.person_id == Person.id
-                                ).filter(
-                                    FaceEncodingModel.person_id != person_id
-                                ).all()
+                        with service.db_manager.get_session() as check_session:
+                            from ..models import FaceEncoding as FaceEncodingModel
+                            
+                            # Get recognition threshold (lower = stricter matching)
+                            recognition_threshold = config.get('face_recognition.recognition_threshold', 0.6)
+                            duplicate_threshold = config.get('face_recognition.duplicate_threshold', 0.85)
+                            
+                            # STEP 1: Verify the new face matches existing faces of THIS person
+                            existing_faces = check_session.query(FaceEncodingModel).filter(
+                                FaceEncodingModel.person_id == person_id
+                            ).all()
+                            
+                            if existing_faces:  # Only validate if person already has faces
+                                max_similarity_to_self = 0.0
                                 
-                                for face_encoding, other_person in other_faces:
-                                    if face_encoding.embedding is not None:
+                                for existing_face in existing_faces:
+                                    if existing_face.embedding is not None:
                                         # Handle encoded data in different formats
-                                        other_encoding = None
-                                        if isinstance(face_encoding.embedding, bytes):
+                                        existing_encoding = None
+                                        if isinstance(existing_face.embedding, bytes):
                                             try:
-                                                other_encoding = pickle.loads(face_encoding.embedding)
+                                                existing_encoding = pickle.loads(existing_face.embedding)
                                             except Exception as e:
                                                 logger.warning(f"Trait deserialization failed: {e}")
                                                 continue
-                                        elif isinstance(face_encoding.embedding, np.ndarray):
-                                            other_encoding = face_encoding.embedding
-                                        elif isinstance(face_encoding.embedding, (list, tuple)):
-                                            other_encoding = np.array(face_encoding.embedding, dtype=np.float32)
-                                        elif isinstance(face_encoding.embedding, str):
+                                        elif isinstance(existing_face.embedding, np.ndarray):
+                                            existing_encoding = existing_face.embedding
+                                        elif isinstance(existing_face.embedding, (list, tuple)):
+                                            existing_encoding = np.array(existing_face.embedding, dtype=np.float32)
+                                        elif isinstance(existing_face.embedding, str):
                                             try:
-                                                other_encoding = np.frombuffer(
-                                                    base64.b64decode(face_encoding.embedding), 
+                                                existing_encoding = np.frombuffer(
+                                                    base64.b64decode(existing_face.embedding), 
                                                     dtype=np.float32
                                                 )
                                             except Exception as e:
                                                 logger.warning(f"Base64Decoding failed: {e}")
                                                 continue
                                         else:
-                                            logger.warning(f"Unknown encoding format: {type(face_encoding.embedding)}")
+                                            logger.warning(f"Unknown encoding format: {type(existing_face.embedding)}")
                                             continue
                                         
-                                        if other_encoding is None or len(other_encoding) == 0:
+                                        if existing_encoding is None or len(existing_encoding) == 0:
                                             continue
                                         
                                         # Calculate cosine similarity
                                         try:
-                                            similarity = float(np.dot(encoding, other_encoding) / 
-                                                             (np.linalg.norm(encoding) * np.linalg.norm(other_encoding)))
-                                            
-                                            if similarity > duplicate_threshold:
-                                                results.append({
-                                                    'file_name': face_file.filename,
-                                                    'success': False,
-                                                    'error': f'The face is too similar to other people：{other_person.name} (Similarity: {similarity*100:.1f}%，threshold: {duplicate_threshold*100:.1f}%)'
-                                                })
-                                                error_count += 1
-                                                raise Exception("Duplicate faces")  # Jump out of current file processing
-                                        except ValueError as ve:
-                                            logger.warning(f"Similarity calculation failed: {ve}")
-                                            continue
-                                        except Exception as similarity_error:
-                                            if "Duplicate faces" in str(similarity_error):
-                                                raise  # Rethrow duplicate face error
-                                            logger.warning(f"Cross-person similarity detection failed: {str(similarity_error)}")
+                                            similarity = float(np.dot(encoding, existing_encoding) / 
+                                                             (np.linalg.norm(encoding) * np.linalg.norm(existing_encoding)))
+                                            max_similarity_to_self = max(max_similarity_to_self, similarity)
+                                        except Exception as e:
+                                            logger.warning(f"Similarity calculation failed: {e}")
                                             continue
-                        
-                        except Exception as check_error:
-                            if "Duplicate faces" in str(check_error) or "Face mismatch" in str(check_error):
-                                # Duplicate face or mismatch errors，Stop the entire batch immediately
-                                logger.warning(f"Add face to person validation failed，Stop processing: {str(check_error)}")
-                                
-                                # Get the last error result
-                                last_error = results[-1] if results else {
-                                    'file_name': face_file.filename,
-                                    'success': False,
-                                    'error': 'Face validation failed'
-                                }
                                 
-                                return JSONResponse(content={
-                                    "success": False,
-                                    "emp_id": emp_id,
-                                    "person_name": person_name,
-                                    "total_files": len(faces),
-                                    "success_count": success_count,
-                                    "error_count": 1,
-                                    "count": success_count,
-                                    "results": [last_error],
-                                    "message": f"for {person_name} Failed to add face: {last_error.get('error', 'Face validation failed')}. Please try again with a different face image。",
-                                    "duplicate_detected": True
-                                })
-                            logger.warning(f"Similarity check failed: {str(check_error)}")
-                        
-                        # Read image data for storage
-                        with open(temp_file.name, 'rb') as img_file:
-                            image_data = img_file.read()
-                        
-                        # Add to database
-                        face_encoding = service.db_manager.add_face_encoding(
-                            person_id=person_id,
-                            encoding=encoding,
-                            image_path=face_file.filename,  # Store original file name
-                            image_data=image_data,
-                            face_bbox=str(detected_face.get('bbox', [])),
-                            confidence=detected_face.get('det_score', 1.0),
-                            quality_score=detected_face.get('quality', 1.0)
-                        )
-                        
-                        results.append({
-                            'file_name': face_file.filename,
-                            'success': True,
-                            'face_encoding_id': face_encoding.id,  # Use uniformlyface_encoding_idField name
-                            'quality_score': detected_face.get('quality', 0),
-                            'confidence': detected_face.get('det_score', 1.0),
-                            'bbox': detected_face.get('bbox', [])
-                        })
-                        success_count += 1
-                    finally:
-                        # Clean temporary files
-                        if os.path.exists(temp_file.name):
-                            os.unlink(temp_file.name)
+                                # If the face doesn't match this person's existing faces, reject it
+                                if max_similarity_to_self < recognition_threshold:
+                                    results.append({
+                                        'file_name': face_file.filename,
+                                        'success': False,
+                                        'error': f'Face does not match existing faces of {person_name} (Similarity: {max_similarity_to_self*100:.1f}%, required: {recognition_threshold*100:.1f}%)'
+                                    })
+                                    error_count += 1
+                                    raise Exception("Face mismatch")
+                            
+                            # STEP 2: Check similarities to other people's faces
+                            other_faces = check_session.query(FaceEncodingModel, Person).join(
+                                Person, FaceEncodingModel.person_id == Person.id
+                            ).filter(
+                                FaceEncodingModel.person_id != person_id
+                            ).all()
+                            
+                            for face_encoding, other_person in other_faces:
+                                if face_encoding.embedding is not None:
+                                    # Handle encoded data in different formats
+                                    other_encoding = None
+                                    if isinstance(face_encoding.embedding, bytes):
+                                        try:
+                                            other_encoding = pickle.loads(face_encoding.embedding)
+                                        except Exception as e:
+                                            logger.warning(f"Trait deserialization failed: {e}")
+                                            continue
+                                    elif isinstance(face_encoding.embedding, np.ndarray):
+                                        other_encoding = face_encoding.embedding
+                                    elif isinstance(face_encoding.embedding, (list, tuple)):
+                                        other_encoding = np.array(face_encoding.embedding, dtype=np.float32)
+                                    elif isinstance(face_encoding.embedding, str):
+                                        try:
+                                            other_encoding = np.frombuffer(
+                                                base64.b64decode(face_encoding.embedding), 
+                                                dtype=np.float32
+                                            )
+                                        except Exception as e:
+                                            logger.warning(f"Base64Decoding failed: {e}")
+                                            continue
+                                    else:
+                                        logger.warning(f"Unknown encoding format: {type(face_encoding.embedding)}")
+                                        continue
+                                    
+                                    if other_encoding is None or len(other_encoding) == 0:
+                                        continue
+                                    
+                                    # Calculate cosine similarity
+                                    try:
+                                        similarity = float(np.dot(encoding, other_encoding) / 
+                                                         (np.linalg.norm(encoding) * np.linalg.norm(other_encoding)))
+                                        
+                                        if similarity > duplicate_threshold:
+                                            results.append({
+                                                'file_name': face_file.filename,
+                                                'success': False,
+                                                'error': f'The face is too similar to other people：{other_person.name} (Similarity: {similarity*100:.1f}%，threshold: {duplicate_threshold*100:.1f}%)'
+                                            })
+                                            error_count += 1
+                                            raise Exception("Duplicate faces")  # Jump out of current file processing
+                                    except ValueError as ve:
+                                        logger.warning(f"Similarity calculation failed: {ve}")
+                                        continue
+                                    except Exception as similarity_error:
+                                        if "Duplicate faces" in str(similarity_error):
+                                            raise  # Rethrow duplicate face error
+                                        logger.warning(f"Cross-person similarity detection failed: {str(similarity_error)}")
+                                        continue
+                    
+                    except Exception as check_error:
+                        if "Duplicate faces" in str(check_error) or "Face mismatch" in str(check_error):
+                            # Duplicate face or mismatch errors，Stop the entire batch immediately
+                            logger.warning(f"Add face to person validation failed，Stop processing: {str(check_error)}")
+                            
+                            # Get the last error result
+                            last_error = results[-1] if results else {
+                                'file_name': face_file.filename,
+                                'success': False,
+                                'error': 'Face validation failed'
+                            }
+
+                            if success_count > 0:
+                                service.sync_gallery_person(person_id)
+
+                            return JSONResponse(content={
+                                "success": False,
+                                "emp_id": emp_id,
+                                "person_name": person_name,
+                                "total_files": len(faces),
+                                "success_count": success_count,
+                                "error_count": 1,
+                                "count": success_count,
+                                "results": [last_error],
+                                "message": f"for {person_name} Failed to add face: {last_error.get('error', 'Face validation failed')}. Please try again with a different face image。",
+                                "duplicate_detected": True
+                            })
+                        logger.warning(f"Similarity check failed: {str(check_error)}")
+                    
+                    # Add to database（original upload bytes）
+                    face_encoding = service.db_manager.add_face_encoding(
+                        person_id=person_id,
+                        encoding=encoding,
+                        image_path=face_file.filename,  # Store original file name
+                        image_data=content,
+                        face_bbox=str(detected_face.get('bbox', [])),
+                        confidence=detected_face.get('det_score', 1.0),
+                        quality_score=detected_face.get('quality', 1.0)
+                    )
+                    
+                    results.append({
+                        'file_name': face_file.filename,
+                        'success': True,
+                        'face_encoding_id': face_encoding.id,  # Use uniformlyface_encoding_idField name
+                        'quality_score': detected_face.get('quality', 0),
+                        'confidence': detected_face.get('det_score', 1.0),
+                        'bbox': detected_face.get('bbox', [])
+                    })
+                    success_count += 1
                 
                 except Exception as file_error:
                     results.append({
@@ -1805,6 +1946,9 @@ def create_app() -> FastAPI:
                     })
                     error_count += 1
             
+            if success_count > 0:
+                service.sync_gallery_person(person_id)
+            
             return JSONResponse(content={
                 "success": True,
                 "emp_id": emp_id,
@@ -1850,10 +1994,9 @@ def create_app() -> FastAPI:
             if file.filename and not any(file.filename.lower().endswith(ext) for ext in allowed_extensions):
                 raise HTTPException(status_code=400, detail=f"Unsupported file format。Supported formats: {', '.join(allowed_extensions)}")
             
-            # Read pictures
+            # Read pictures（at detector scale）
             image_data = await file.read()
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            image = await inference.run(decode_upload, image_data)
             
             if image is None:
                 raise HTTPException(status_code=400, detail="Unable to parse image file")
@@ -1861,8 +2004,10 @@ def create_app() -> FastAPI:
             # Get face detection service
             face_service = get_advanced_face_service()
             
-            # Perform face detection
-            faces = face_service.detect_faces(image)
+            # Perform face detection: detector only，attribute models just when attributes are requested
+            profile = 'full' if include_attributes else 'detect'
+            pipeline = face_service.resolve_profile(profile)
+            faces = await inference.run(face_service.analyze_faces, image, profile)
             
             # Filter faces smaller than minimum size
             if min_face_size > 0:
@@ -1904,17 +2049,22 @@ def create_app() -> FastAPI:
                 "total_faces": len(result_faces),
                 "faces": result_faces,
                 "image_info": {
-                    "width": image.shape[1],
-                    "height": image.shape[0],
-                    "channels": image.shape[2] if len(image.shape) > 2 else 1
+                    "width": image.width,
+                    "height": image.height,
+                    "channels": image.detection.shape[2] if len(image.detection.shape) > 2 else 1
                 },
                 "detection_config": {
                     "detection_threshold": getattr(config, 'DETECTION_THRESHOLD', 0.5),
                     "min_face_size": min_face_size,
-                    "model": "InsightFace Buffalo-L"
+                    "model": "InsightFace Buffalo-L",
+                    "pipeline_profile": profile,
+                    "modules": pipeline['modules'],
+                    "missing_modules": pipeline['missing']
                 }
             })
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Face detection failed: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Face detection failed: {str(e)}")
@@ -1954,7 +2104,7 @@ def create_app() -> FastAPI:
         }
 
     @app.get("/api/sync/status", include_in_schema=False)
-    async def sync_status():
+    def sync_status():
         """
         🔄 Get moreWorkerSync status
         
@@ -1983,7 +2133,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail=f"Failed to get sync status: {str(e)}")
 
     @app.post("/api/sync/refresh", include_in_schema=False)
-    async def force_sync_refresh():
+    def force_sync_refresh():
         """
         🔄 Force refresh cache sync
         
@@ -2007,7 +2157,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail=f"Forced cache refresh failed: {str(e)}")
 
     @app.get("/api/cache/info")
-    async def cache_info():
+    def cache_info():
         """
         📊 Get cache information
         
@@ -2033,16 +2183,150 @@ def create_app() -> FastAPI:
                 "region_counts": db_stats.get('region_counts', {})
             }
             
+            if getattr(face_service, 'gallery_index', None) is not None:
+                cache_data["gallery_index"] = face_service.gallery_index.get_statistics()
+            
+            # Upload-content keyed detection/embedding cache
+            embedding_cache = getattr(face_service, 'embedding_cache', None)
+            cache_data["embedding_cache"] = embedding_cache.get_statistics() if embedding_cache is not None else {"enabled": False}
+            
             return cache_data
             
         except Exception as e:
             logger.error(f"Failed to obtain cache information: {e}")
             raise HTTPException(status_code=500, detail=f"Failed to obtain cache information: {str(e)}")
 
+    @app.get("/api/metrics")
+    async def inference_metrics():
+        """
+        📊 Get inference metrics
+        
+        Inference executor load and micro-batching queue depth, batch sizes and queue wait times，
+        analytics event queue depth and dropped events
+        """
+        face_service = get_face_service_instance()
+        scheduler = getattr(face_service, 'inference_scheduler', None)
+        analytics_sink = getattr(face_service, 'analytics_sink', None)
+        
+        return {
+            "success": True,
+            "inference_executor": inference.get_metrics(),
+            "onnx_sessions": getattr(face_service, 'onnx_session_report', None),
+            "micro_batching": {"enabled": True, **scheduler.get_metrics()} if scheduler is not None else {"enabled": False},
+            "analytics_sink": {"enabled": True, **analytics_sink.get_metrics()} if analytics_sink is not None else {"enabled": False}
+        }
+
     # ==================== Attendance Endpoints ====================
     
+    def attendance_result_content(service, result: Dict[str, Any], now: datetime,
+                                  latitude: Optional[float] = None, longitude: Optional[float] = None,
+                                  location_accuracy: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Response body for a check_in_or_out result（shared by /api/attendance/mark and
+        /api/attendance/recognize_mark），logs the analytics event of a performed action
+        """
+        outcome = result['outcome']
+        person = result['person']
+        attendance = result['attendance']
+        person_data = {
+            "id": person['id'],
+            "name": person['name'],
+            "emp_id": person['emp_id'],
+            "emp_rank": person['emp_rank']
+        }
+        attendance_data = {
+            "id": attendance['id'],
+            "status": attendance['status'],
+            "check_in_time": attendance['check_in_time'].isoformat() if attendance['check_in_time'] else None,
+            "check_out_time": attendance['check_out_time'].isoformat() if attendance['check_out_time'] else None,
+            "date": attendance['date'].isoformat() if attendance['date'] else None
+        }
+        
+        if outcome == 'check_out_required':
+            # Already checked in, show check-out option
+            return {
+                "success": True,
+                "action_required": "check_out",
+                "message": "Already checked in. Ready to check out.",
+                "person": person_data,
+                "attendance": attendance_data
+            }
+        
+        if outcome == 'completed':
+            # Already checked in and out
+            return {
+                "success": True,
+                "already_completed": True,
+                "message": "Already checked in and out for today",
+                "person": person_data,
+                "attendance": attendance_data
+            }
+        
+        location_key = "check_in_location" if outcome == 'check_in' else "check_out_location"
+        attendance_data[location_key] = {
+            "latitude": attendance[f"{outcome}_latitude"],
+            "longitude": attendance[f"{outcome}_longitude"],
+            "accuracy": attendance[f"{outcome}_location_accuracy"]
+        } if attendance[f"{outcome}_latitude"] else None
+        if latitude is not None and longitude is not None:
+            logger.info(f"📍 {'Check-in' if outcome == 'check_in' else 'Check-out'} location saved: ({latitude}, {longitude})")
+        logger.info(f"✅ {'Check-in' if outcome == 'check_in' else 'Check-out'} successful for {person['name']} at {now}")
+        
+        # Log the event（queued，written in bulk when the analytics event sink is enabled）
+        try:
+            service.log_event(
+                event_type=outcome,
+                person_id=person['id'],
+                emp_id=person['emp_id'],
+                name=person['name'],
+                region=person['region'],
+                metadata={
+                    'attendance_id': attendance['id'],
+                    'location': {
+                        'latitude': latitude,
+                        'longitude': longitude,
+                        'accuracy': location_accuracy
+                    } if latitude and longitude else None
+                }
+            )
+        except Exception as log_error:
+            logger.error(f"Failed to log {outcome} event: {log_error}")
+        
+        return {
+            "success": True,
+            "action_performed": outcome,
+            "message": "Checked in successfully" if outcome == 'check_in' else "Checked out successfully",
+            "person": person_data,
+            "attendance": attendance_data
+        }
+
+    def mark_recognized_persons(service, person_ids: List[int], attendance_date: datetime, now: datetime,
+                                action: str, status: str, latitude: Optional[float] = None,
+                                longitude: Optional[float] = None,
+                                location_accuracy: Optional[float] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Check in/out every recognized person and build their attendance responses（blocking，
+        run in the threadpool by /api/attendance/recognize_mark）
+        """
+        marked = service.db_manager.check_in_or_out_persons(
+            person_ids,
+            attendance_date,
+            now,
+            action=action,
+            status=status,
+            latitude=latitude,
+            longitude=longitude,
+            location_accuracy=location_accuracy
+        )
+        return {
+            person_result['person']['id']: attendance_result_content(
+                service, person_result, now, latitude, longitude, location_accuracy
+            )
+            for person_result in marked
+        }
+
     @app.post("/api/attendance/mark")
-    async def mark_attendance(
+    def mark_attendance(
         person_id: Optional[int] = Form(None, description="Person ID"),
         emp_id: Optional[str] = Form(None, description="Employee ID"),
         name: Optional[str] = Form(None, description="Person name"),
@@ -2080,21 +2364,22 @@ def create_app() -> FastAPI:
             
             logger.info(f"Attendance {action} request - person_id={person_id}, emp_id={emp_id}, name={name}, date={attendance_date}")
             
-            # Find person by person_id, emp_id, or name
-            person = None
-            if person_id:
-                person = service.db_manager.get_person_by_id(person_id)
-            elif emp_id:
-                # Find person by emp_id
-                with service.db_manager.get_session() as session:
-                    from ..models.database import Person
-                    person = session.query(Person).filter(Person.emp_id == emp_id).first()
-                    if person:
-                        session.expunge(person)
-            elif name:
-                person = service.db_manager.get_person_by_name(name)
+            # Person lookup and check-in/check-out state machine in one upsert
+            current_time_ist = datetime.now(ist)
+            result = service.db_manager.check_in_or_out(
+                attendance_date.replace(tzinfo=None),  # Stored without timezone
+                current_time_ist,
+                action=action,
+                status=status,
+                person_id=person_id,
+                emp_id=emp_id,
+                name=name,
+                latitude=latitude,
+                longitude=longitude,
+                location_accuracy=location_accuracy
+            )
             
-            if not person:
+            if result is None:
                 return JSONResponse(
                     status_code=404,
                     content={
@@ -2104,200 +2389,118 @@ def create_app() -> FastAPI:
                     }
                 )
             
-            # Check existing attendance for today
-            current_time_ist = datetime.now(ist)
-            attendance_id_for_log = None
+            return JSONResponse(content=attendance_result_content(
+                service, result, current_time_ist, latitude, longitude, location_accuracy
+            ))
+        except Exception as e:
+            logger.error(f"Failed to mark attendance: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to mark attendance: {str(e)}")
+
+    @app.post("/api/attendance/recognize_mark", summary="Recognize a frame and mark attendance in one request")
+    async def recognize_and_mark_attendance(
+        file: UploadFile = File(..., description="Image file to be recognized"),
+        region: str = Form(..., description="Region to search in (ka/ap/tn)"),
+        emp_id: Optional[str] = Form(None, description="Optional: Employee ID for targeted search"),
+        action: str = Form('check_in', description="Action: check_in or check_out"),
+        status: str = Form('present', description="Status: present or absent"),
+        latitude: Optional[float] = Form(None, description="Location latitude"),
+        longitude: Optional[float] = Form(None, description="Location longitude"),
+        location_accuracy: Optional[float] = Form(None, description="Location accuracy in meters"),
+        mark: bool = Form(True, description="Mark attendance for the recognized persons"),
+        visualize: bool = Form(False, description="Also return the annotated image (image_base64)"),
+        service = Depends(get_face_service)
+    ):
+        """
+        🧾 Kiosk check-in: face recognition and attendance marking in one request
+        
+        - The frame is decoded and recognized once（same matching as /api/recognize）
+        - Every recognized person is checked in/out in a single upsert statement using the
+          person ID resolved by the search，no second lookup by emp_id
+        - Each match carries an "attendance" object shaped like the /api/attendance/mark response
+        - The visualization is only rendered when visualize=true
+        """
+        try:
+            import pytz
             
-            with service.db_manager.get_session() as session:
-                from ..models.database import Attendance
-                existing_attendance = session.query(Attendance).filter(
-                    Attendance.person_id == person.id,
-                    Attendance.date == attendance_date.replace(tzinfo=None)  # Compare without timezone
-                ).first()
-                
-                if existing_attendance:
-                    # Attendance record exists
-                    if existing_attendance.check_in_time and not existing_attendance.check_out_time:
-                        # Already checked in, can check out
-                        if action == 'check_out':
-                            existing_attendance.check_out_time = current_time_ist
-                            # Save check-out location
-                            if latitude is not None and longitude is not None:
-                                existing_attendance.check_out_latitude = latitude
-                                existing_attendance.check_out_longitude = longitude
-                                existing_attendance.check_out_location_accuracy = location_accuracy
-                                logger.info(f"📍 Check-out location saved: ({latitude}, {longitude})")
-                            session.commit()
-                            attendance_id_for_log = existing_attendance.id
-                            
-                            attendance_data = {
-                                "id": existing_attendance.id,
-                                "status": existing_attendance.status,
-                                "check_in_time": existing_attendance.check_in_time.isoformat() if existing_attendance.check_in_time else None,
-                                "check_out_time": existing_attendance.check_out_time.isoformat() if existing_attendance.check_out_time else None,
-                                "date": existing_attendance.date.isoformat() if existing_attendance.date else None,
-                                "check_out_location": {
-                                    "latitude": existing_attendance.check_out_latitude,
-                                    "longitude": existing_attendance.check_out_longitude,
-                                    "accuracy": existing_attendance.check_out_location_accuracy
-                                } if existing_attendance.check_out_latitude else None
-                            }
-                            
-                            logger.info(f"✅ Check-out successful for {person.name} at {current_time_ist}")
-                            
-                            # Log check-out event OUTSIDE the session context
-                            try:
-                                service.db_manager.log_event(
-                                    event_type='check_out',
-                                    person_id=person.id,
-                                    emp_id=person.emp_id,
-                                    name=person.name,
-                                    region=person.region,
-                                    metadata={
-                                        'attendance_id': attendance_id_for_log,
-                                        'location': {
-                                            'latitude': latitude,
-                                            'longitude': longitude,
-                                            'accuracy': location_accuracy
-                                        } if latitude and longitude else None
-                                    }
-                                )
-                                logger.info(f"✅ Logged check-out event for {person.name}")
-                            except Exception as log_error:
-                                logger.error(f"Failed to log check-out event: {log_error}")
-                            
-                            return JSONResponse(content={
-                                "success": True,
-                                "action_performed": "check_out",
-                                "message": "Checked out successfully",
-                                "person": {
-                                    "id": person.id,
-                                    "name": person.name,
-                                    "emp_id": person.emp_id,
-                                    "emp_rank": person.emp_rank
-                                },
-                                "attendance": attendance_data
-                            })
-                        else:
-                            # Already checked in, show check-out option
-                            attendance_data = {
-                                "id": existing_attendance.id,
-                                "status": existing_attendance.status,
-                                "check_in_time": existing_attendance.check_in_time.isoformat() if existing_attendance.check_in_time else None,
-                                "check_out_time": None,
-                                "date": existing_attendance.date.isoformat() if existing_attendance.date else None
-                            }
-                            
-                            return JSONResponse(content={
-                                "success": True,
-                                "action_required": "check_out",
-                                "message": "Already checked in. Ready to check out.",
-                                "person": {
-                                    "id": person.id,
-                                    "name": person.name,
-                                    "emp_id": person.emp_id,
-                                    "emp_rank": person.emp_rank
-                                },
-                                "attendance": attendance_data
-                            })
-                    
-                    elif existing_attendance.check_in_time and existing_attendance.check_out_time:
-                        # Already checked in and out
-                        attendance_data = {
-                            "id": existing_attendance.id,
-                            "status": existing_attendance.status,
-                            "check_in_time": existing_attendance.check_in_time.isoformat() if existing_attendance.check_in_time else None,
-                            "check_out_time": existing_attendance.check_out_time.isoformat() if existing_attendance.check_out_time else None,
-                            "date": existing_attendance.date.isoformat() if existing_attendance.date else None
-                        }
-                        
-                        return JSONResponse(content={
-                            "success": True,
-                            "already_completed": True,
-                            "message": "Already checked in and out for today",
-                            "person": {
-                                "id": person.id,
-                                "name": person.name,
-                                "emp_id": person.emp_id,
-                                "emp_rank": person.emp_rank
-                            },
-                            "attendance": attendance_data
-                        })
+            threshold = config.snapshot().get('face_recognition.recognition_threshold', 0.3)
             
-            # No existing attendance, create new with check-in
-            logger.info(f"No existing attendance found, creating new check-in record for person_id={person.id}")
+            if not file.content_type or not file.content_type.startswith('image/'):
+                raise HTTPException(status_code=400, detail="Only supports image files")
+
+            content = await file.read()
+            image = await inference.run(decode_upload, content)
+            if image is None:
+                raise HTTPException(status_code=400, detail="Unable to parse image")
             
-            with service.db_manager.get_session() as session:
-                from ..models.database import Attendance
-                new_attendance = Attendance(
-                    person_id=person.id,
-                    date=attendance_date.replace(tzinfo=None),
-                    status=status,
-                    marked_at=current_time_ist,
-                    check_in_time=current_time_ist,
-                    check_in_latitude=latitude,
-                    check_in_longitude=longitude,
-                    check_in_location_accuracy=location_accuracy
-                )
-                if latitude is not None and longitude is not None:
-                    logger.info(f"📍 Check-in location saved: ({latitude}, {longitude})")
-                session.add(new_attendance)
-                session.commit()
-                session.refresh(new_attendance)
-                attendance_id_for_log = new_attendance.id
-                
-                attendance_data = {
-                    "id": new_attendance.id,
-                    "status": new_attendance.status,
-                    "check_in_time": new_attendance.check_in_time.isoformat() if new_attendance.check_in_time else None,
-                    "check_out_time": None,
-                    "date": new_attendance.date.isoformat() if new_attendance.date else None,
-                    "check_in_location": {
-                        "latitude": new_attendance.check_in_latitude,
-                        "longitude": new_attendance.check_in_longitude,
-                        "accuracy": new_attendance.check_in_location_accuracy
-                    } if new_attendance.check_in_latitude else None
+            result = await inference.run(
+                service.recognize_face_with_threshold, image, region=region, emp_id=emp_id, threshold=threshold
+            )
+            if not result['success']:
+                raise HTTPException(status_code=400, detail=result.get('error', 'Recognition failed'))
+            
+            matches = [
+                {
+                    "person_id": match.get('person_id'),
+                    "emp_id": match['emp_id'],
+                    "name": match['name'],
+                    "match_score": float(match['match_score']),
+                    "distance": float(match['distance']),
+                    "bbox": [int(v) for v in match['bbox']],
+                    "quality": float(match['quality']),
+                    "face_encoding_id": match.get('face_encoding_id')
                 }
+                for match in result['matches']
+            ]
             
-            # Log check-in event OUTSIDE the session context
-            try:
-                service.db_manager.log_event(
-                    event_type='check_in',
-                    person_id=person.id,
-                    emp_id=person.emp_id,
-                    name=person.name,
-                    region=person.region,
-                    metadata={
-                        'attendance_id': attendance_id_for_log,
-                        'location': {
-                            'latitude': latitude,
-                            'longitude': longitude,
-                            'accuracy': location_accuracy
-                        } if latitude and longitude else None
-                    }
+            # One check_in_or_out statement for every person recognized in the frame
+            attendance_by_person: Dict[int, Dict[str, Any]] = {}
+            person_ids = [match['person_id'] for match in matches if match['person_id'] is not None]
+            if mark and person_ids:
+                ist = pytz.timezone('Asia/Kolkata')
+                current_time_ist = datetime.now(ist)
+                attendance_date = datetime(current_time_ist.year, current_time_ist.month, current_time_ist.day)
+                # Marking and the per-person responses（which log analytics events）stay off the event loop
+                attendance_by_person = await run_in_threadpool(
+                    mark_recognized_persons,
+                    service,
+                    person_ids,
+                    attendance_date,
+                    current_time_ist,
+                    action,
+                    status,
+                    latitude,
+                    longitude,
+                    location_accuracy
                 )
-                logger.info(f"✅ Logged check-in event for {person.name}")
-            except Exception as log_error:
-                logger.error(f"Failed to log check-in event: {log_error}")
+            for match in matches:
+                match['attendance'] = attendance_by_person.get(match['person_id'])
             
-            return JSONResponse(content={
+            response = {
                 "success": True,
-                "action_performed": "check_in",
-                "message": "Checked in successfully",
-                "person": {
-                    "id": person.id,
-                    "name": person.name,
-                    "emp_id": person.emp_id,
-                    "emp_rank": person.emp_rank
-                },
-                "attendance": attendance_data
-            })
+                "matches": matches,
+                "total_faces": result['total_faces'],
+                "marked": len(attendance_by_person),
+                "message": result.get('message')
+            }
+            
+            if visualize and result['matches']:
+                # Draw on the full-resolution image（boxes are reported in original pixels）
+                visual_result = await inference.run(
+                    visualizer.visualize_recognition_results, image.full, result['matches'], threshold
+                )
+                if visual_result['success']:
+                    response["image_base64"] = visual_result['image_base64']
+            
+            return JSONResponse(content=response)
+
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Failed to mark attendance: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to mark attendance: {str(e)}")
+            logger.error(f"Recognize and mark attendance failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Server internal error: {str(e)}")
     
     @app.get("/api/attendance/debug/{person_id}")
-    async def debug_attendance(
+    def debug_attendance(
         person_id: int,
         service = Depends(get_face_service)
     ):
@@ -2339,7 +2542,7 @@ def create_app() -> FastAPI:
             return JSONResponse(content={"error": str(e)})
     
     @app.get("/api/attendance/check")
-    async def check_attendance(
+    def check_attendance(
         person_id: Optional[int] = Query(None, description="Person ID"),
         emp_id: Optional[str] = Query(None, description="Employee ID"),
         name: Optional[str] = Query(None, description="Person name"),
@@ -2453,13 +2656,17 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail=f"Failed to check attendance: {str(e)}")
     
     @app.get("/api/attendance")
-    async def get_attendance(
+    def get_attendance(
         date: Optional[str] = Query(None, description="Date (YYYY-MM-DD), defaults to today"),
         region: Optional[str] = Query(None, description="Region filter (ka/ap/tn)"),
+        limit: Optional[int] = Query(None, ge=1, le=5000, description="Page size（omit to return the whole roster）"),
+        cursor: Optional[int] = Query(None, ge=0, description="next_cursor of the previous page"),
         service = Depends(get_face_service)
     ):
         """
         📋 Get attendance records for a specific date
+        
+        One roster query regardless of headcount；present/absent counts always cover the whole roster
         """
         try:
             from datetime import datetime
@@ -2473,23 +2680,26 @@ def create_app() -> FastAPI:
                 attendance_date = datetime.now(ist).replace(hour=0, minute=0, second=0, microsecond=0)
             
             # Get all persons with attendance status
-            records = service.db_manager.get_all_persons_with_attendance(attendance_date, region)
+            roster = service.db_manager.get_attendance_roster(
+                attendance_date, region, after_id=cursor, limit=limit
+            )
             
             return JSONResponse(content={
                 "success": True,
                 "date": attendance_date.strftime('%Y-%m-%d'),
                 "region": region or "all",
-                "total": len(records),
-                "present": len([r for r in records if r['status'] == 'present']),
-                "absent": len([r for r in records if r['status'] == 'absent']),
-                "records": records
+                "total": roster['total'],
+                "present": roster['present'],
+                "absent": roster['absent'],
+                "records": roster['records'],
+                "next_cursor": roster['next_cursor']
             })
         except Exception as e:
             logger.error(f"Failed to get attendance: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to get attendance: {str(e)}")
     
     @app.delete("/api/attendance/{attendance_id}")
-    async def delete_attendance(
+    def delete_attendance(
         attendance_id: int,
         service = Depends(get_face_service)
     ):
@@ -2531,7 +2741,7 @@ def create_app() -> FastAPI:
     # ==================== Analytics Endpoints ====================
     
     @app.get("/api/analytics/summary")
-    async def get_analytics_summary(
+    def get_analytics_summary(
         start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
         end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
         region: Optional[str] = Query(None, description="Region filter (ka/ap/tn)"),
@@ -2559,7 +2769,7 @@ def create_app() -> FastAPI:
             raise HTTPException(status_code=500, detail=f"Failed to get analytics summary: {str(e)}")
     
     @app.get("/api/analytics/recent")
-    async def get_recent_events(
+    def get_recent_events(
         limit: int = Query(50, description="Number of events to return"),
         event_type: Optional[str] = Query(None, description="Filter by event type (registration/check_in/check_out)"),
         region: Optional[str] = Query(None, description="Region filter (ka/ap/tn)"),
@@ -0,0 +1,61 @@
+"""
+Latest-frame-wins mailbox for streaming recognition
+A live camera produces frames faster than inference can consume them when the server is
+busy; instead of queueing them, every new frame replaces the one still waiting, so the
+result sent back always belongs to the most recent frame and latency stays bounded.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class StreamFrame:
+    """One received frame"""
+    seq: int
+    data: bytes
+    received_at: float  # time.monotonic() at receipt
+
+
+class LatestFrameSlot:
+    """
+    Single-slot asynchronous mailbox
+
+    characteristic:
+    - put() never waits: a frame that has not been picked up yet is replaced and counted as dropped
+    - get() waits for the next frame and returns None once the slot is closed
+    - Not thread-safe; producer and consumer run on the same event loop
+    """
+
+    def __init__(self):
+        self._frame: Optional[StreamFrame] = None
+        self._event = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, data: bytes) -> StreamFrame:
+        """Offer a frame, replacing any frame still waiting"""
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = StreamFrame(seq=self.received, data=data, received_at=time.monotonic())
+        self._event.set()
+        return self._frame
+
+    async def get(self) -> Optional[StreamFrame]:
+        """Wait for the latest frame（None when closed）"""
+        while self._frame is None:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        frame, self._frame = self._frame, None
+        return frame
+
+    def close(self):
+        """Wake the consumer; frames still waiting are discarded"""
+        self._closed = True
+        self._frame = None
+        self._event.set()
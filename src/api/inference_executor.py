@@ -0,0 +1,155 @@
+"""
+Bounded executor for blocking inference work in FastAPI handlers
+Keeps model inference, image decoding and the related database calls off the event loop,
+and rejects new work with 429 once every worker and queue slot is taken.
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from ..utils.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(HTTPException):
+    """Raised when the inference executor is saturated (mapped to HTTP 429)"""
+
+    def __init__(self, capacity: int):
+        super().__init__(
+            status_code=429,
+            detail=f"Server is busy: inference queue is full ({capacity} requests in flight)，please retry shortly",
+            headers={'Retry-After': '1'}
+        )
+
+
+class InferenceExecutor:
+    """
+    Thread pool with a bounded number of in-flight calls
+
+    characteristic:
+    - max_workers threads run blocking calls; up to max_queue more calls may wait
+    - Calls beyond workers + queue are rejected immediately with InferenceQueueFull
+    - The pool is created lazily in the serving process (safe with preload + fork)
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.capacity = self.max_workers + self.max_queue
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != pid:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='inference')
+                    self._pool_pid = pid
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking call on the inference pool and await its result
+
+        Raises:
+            InferenceQueueFull: When workers and queue are all occupied
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            logger.warning(f"Inference executor saturated，rejecting request ({self.capacity} in flight)")
+            raise InferenceQueueFull(self.capacity)
+
+        def call():
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                # Released by the worker, so a cancelled request still holds its slot until the work ends
+                with self._stats_lock:
+                    self._in_flight -= 1
+                    self._completed += 1
+                self._slots.release()
+
+        with self._stats_lock:
+            self._in_flight += 1
+        try:
+            future = self._get_pool().submit(call)
+        except Exception:
+            with self._stats_lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+        return await asyncio.wrap_future(future)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get executor metrics"""
+        with self._stats_lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'in_flight': self._in_flight,
+                'queued': max(0, self._in_flight - self.max_workers),
+                'completed': self._completed,
+                'rejected': self._rejected
+            }
+
+
+def _workers_for_intra_op_threads(intra_op_threads: Optional[int]) -> Tuple[int, str]:
+    """
+    Default worker count: one worker per ONNX Runtime intra-op thread group, so concurrent
+    Run calls never ask for more threads than there are cores
+
+    Returns:
+        (max_workers, description of how it was chosen)
+    """
+    intra_op_threads = int(intra_op_threads or 0)
+    if intra_op_threads <= 0:
+        # 0 / unset lets ONNX Runtime use every physical core in each Run call: one call at a time
+        return 1, 'intra_op_num_threads unset，ONNX Runtime uses all cores per call'
+    cpu_count = os.cpu_count() or 1
+    return max(1, cpu_count // intra_op_threads), f"{cpu_count} cores / {intra_op_threads} intra-op threads"
+
+
+_inference_executor: Optional[InferenceExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Get the shared inference executor (sized from face_recognition.inference_executor)"""
+    global _inference_executor
+    if _inference_executor is None:
+        with _executor_lock:
+            if _inference_executor is None:
+                max_workers = config.get('face_recognition.inference_executor.max_workers')
+                batch_size = 0
+                if config.get('face_recognition.micro_batching.enabled', False):
+                    batch_size = int(config.get('face_recognition.micro_batching.max_batch_size', 16) or 1)
+                if max_workers:
+                    sizing = 'configured'
+                    if max_workers < batch_size:
+                        logger.warning(f"inference_executor.max_workers={max_workers} is below micro_batching.max_batch_size={batch_size}，"
+                                       f"batches will never fill")
+                else:
+                    max_workers, sizing = _workers_for_intra_op_threads(
+                        config.get('face_recognition.onnx.intra_op_num_threads')
+                    )
+                    if max_workers < batch_size:
+                        # Workers mostly wait on the micro-batch scheduler, which runs the model calls itself
+                        max_workers, sizing = batch_size, f"{sizing}，raised to micro_batching.max_batch_size"
+                max_queue = config.get('face_recognition.inference_executor.max_queue', 32)
+                _inference_executor = InferenceExecutor(max_workers, max_queue)
+                logger.info(f"Inference executor: {_inference_executor.max_workers} workers（{sizing}），queue limit {_inference_executor.max_queue}")
+    return _inference_executor
@@ -0,0 +1,158 @@
+"""
+Content-addressed file store for face images
+Keeps the JPEG bytes out of the face_encodings table (next to the HNSW-indexed embeddings)
+and serves them, and their thumbnail derivatives, straight from disk.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Iterator, Optional, Sequence
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """
+    Face images on the local filesystem, named by the SHA-256 of their bytes
+
+    characteristic:
+    - Originals live in root/ab/cd/<sha256>, identical uploads are stored once
+    - Thumbnails (longest side = size, JPEG) live in root/thumbs/<size>/ab/cd/<sha256>.jpg;
+      they are written when the image is stored, or on first request for older blobs
+    - Writes go through a temporary file and os.replace, readers never see partial files
+    """
+
+    def __init__(self, root: str, thumbnail_sizes: Sequence[int] = (128, 256), thumbnail_quality: int = 85):
+        self.root = root
+        self.thumbnail_sizes = tuple(sorted({int(size) for size in thumbnail_sizes}))
+        self.thumbnail_quality = int(thumbnail_quality)
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """Content address of image bytes"""
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, digest: str, size: Optional[int] = None) -> str:
+        """Filesystem path of a blob or one of its thumbnails (may not exist yet)"""
+        if size is None:
+            return os.path.join(self.root, digest[:2], digest[2:4], digest)
+        return os.path.join(self.root, 'thumbs', str(size), digest[:2], digest[2:4], f"{digest}.jpg")
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def put(self, data: bytes) -> str:
+        """
+        Store image bytes and their thumbnails
+
+        Returns:
+            The content address (SHA-256 hex digest)
+        """
+        digest = self.hash_bytes(data)
+        path = self.path(digest)
+        if not os.path.exists(path):
+            self._write(path, data)
+        for size in self.thumbnail_sizes:
+            self._ensure_thumbnail(digest, size, data)
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """Image bytes of a blob, or None if it is missing"""
+        try:
+            with open(self.path(digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def size(self, digest: str) -> int:
+        """Size of a blob in bytes (0 if it is missing)"""
+        try:
+            return os.path.getsize(self.path(digest))
+        except OSError:
+            return 0
+
+    def open_path(self, digest: str, size: Optional[int] = None) -> Optional[str]:
+        """
+        Path of an existing blob or thumbnail, generating a missing thumbnail from the original
+
+        Args:
+            digest: Content address
+            size: Thumbnail size (one of thumbnail_sizes), None for the original
+
+        Returns:
+            File path, or None if the blob does not exist or its thumbnail cannot be created
+            (the original is never returned in place of a thumbnail)
+        """
+        if size is not None and size not in self.thumbnail_sizes:
+            raise ValueError(f"Unsupported thumbnail size: {size}")
+        path = self.path(digest, size)
+        if os.path.exists(path):
+            return path
+        if size is None:
+            return None
+        data = self.get(digest)
+        if data is None:
+            return None
+        return path if self._ensure_thumbnail(digest, size, data) else None
+
+    def delete(self, digest: str):
+        """Remove a blob and its thumbnails"""
+        for path in [self.path(digest)] + [self.path(digest, size) for size in self.thumbnail_sizes]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def iter_digests(self) -> Iterator[str]:
+        """Content addresses of all stored originals"""
+        for directory, subdirs, files in os.walk(self.root):
+            if directory == self.root and 'thumbs' in subdirs:
+                subdirs.remove('thumbs')
+            for name in files:
+                if len(name) == 64 and not name.endswith('.tmp'):
+                    yield name
+
+    def make_thumbnail(self, data: bytes, size: int) -> Optional[bytes]:
+        """JPEG thumbnail of image bytes with the longest side at most size pixels"""
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        height, width = image.shape[:2]
+        scale = size / float(max(height, width))
+        if scale < 1.0:
+            image = cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.thumbnail_quality])
+        return encoded.tobytes() if ok else None
+
+    def _ensure_thumbnail(self, digest: str, size: int, data: bytes) -> bool:
+        path = self.path(digest, size)
+        if os.path.exists(path):
+            return True
+        thumbnail = self.make_thumbnail(data, size)
+        if thumbnail is None:
+            logger.warning(f"Could not create {size}px thumbnail for blob {digest}")
+            return False
+        self._write(path, thumbnail)
+        return True
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
@@ -8,7 +8,8 @@ from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Date, LargeBinary, ForeignKey, Index, Text, text, JSON
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Float, DateTime, Date, LargeBinary, ForeignKey, Index, UniqueConstraint, Text, text, JSON, func, bindparam, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship, Session
 from sqlalchemy.pool import QueuePool
@@ -17,9 +18,13 @@ import numpy as np
 import pickle
 
 from ..utils.config import config
+from .blob_store import BlobStore
 
 logger = logging.getLogger(__name__)
 
+# First key of the transaction advisory locks that serialize blob writes and blob garbage collection
+_BLOB_LOCK_NAMESPACE = 0x426C6F62
+
 Base = declarative_base()
 
 
@@ -49,6 +54,7 @@ class Person(Base, TimestampMixin):
     emp_rank = Column(String(100), nullable=False, index=True)  # Employee Rank
     client_id = Column(String(100), nullable=True, index=True)  # For multi-tenant support
     description = Column(Text, nullable=True)  # Optional, for backward compatibility
+    profile_encoding_id = Column(Integer, nullable=True)  # Representative (oldest) face encoding, kept in sync on enroll/delete
     
     # Relationship to face encodings
     face_encodings = relationship('FaceEncoding', back_populates='person', cascade='all, delete-orphan')
@@ -69,6 +75,7 @@ class Person(Base, TimestampMixin):
             'emp_rank': self.emp_rank,
             'client_id': self.client_id,
             'description': self.description,
+            'profile_encoding_id': self.profile_encoding_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -100,10 +107,11 @@ class Attendance(Base, TimestampMixin):
     # Relationship - passive_deletes tells SQLAlchemy to let the database handle CASCADE
     person = relationship('Person', backref='attendance_records', passive_deletes=True)
     
-    # Composite index for fast date + person queries
+    # Composite index for fast date + person queries; one record per person and day
     __table_args__ = (
         Index('idx_attendance_date_person', 'date', 'person_id'),
         Index('idx_attendance_date', 'date'),
+        UniqueConstraint('person_id', 'date', name='uq_attendance_person_date'),
     )
     
     def to_dict(self) -> Dict[str, Any]:
@@ -166,6 +174,16 @@ class AnalyticsLog(Base, TimestampMixin):
         }
 
 
+class AnalyticsDailyRollup(Base):
+    """Event counts per day, region and event type, maintained as events are logged"""
+    __tablename__ = 'analytics_daily_rollup'
+    
+    date = Column(Date, primary_key=True)
+    region = Column(String(50), primary_key=True, default='')  # '' for events without a region
+    event_type = Column(String(50), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+
 class FaceEncoding(Base, TimestampMixin):
     """Face encoding table using pgvector for similarity search"""
     __tablename__ = 'face_encodings'
@@ -178,7 +196,8 @@ class FaceEncoding(Base, TimestampMixin):
     
     # Metadata
     image_path = Column(String(500), nullable=True)
-    image_data = Column(LargeBinary, nullable=True)  # Store actual image
+    image_data = Column(LargeBinary, nullable=True)  # Legacy inline image (new images go to the blob store)
+    image_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the image in the blob store
     face_bbox = Column(String(100), nullable=True)  # [x1, y1, x2, y2]
     confidence = Column(Float, default=0.0)
     quality_score = Column(Float, default=0.0)
@@ -229,10 +248,20 @@ class FaceEncoding(Base, TimestampMixin):
             'confidence': self.confidence,
             'quality_score': self.quality_score,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'has_image_data': self.image_data is not None
+            'has_image_data': self.image_hash is not None or self.image_data is not None
         }
 
 
+class GalleryState(Base):
+    """Single-row gallery version, bumped on every face gallery change so worker processes can resync"""
+    __tablename__ = 'gallery_state'
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), default=lambda: TimestampMixin._get_ist_now(),
+                        onupdate=lambda: TimestampMixin._get_ist_now(), nullable=False)
+
+
 # ==================== Database Manager ====================
 
 class DatabaseManager:
@@ -268,6 +297,13 @@ class DatabaseManager:
         
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
+        # Face images are kept on disk, addressed by content hash
+        self.blob_store = BlobStore(
+            config.get('storage.blob_dir', 'data/face_images'),
+            thumbnail_sizes=config.get('storage.thumbnail_sizes', [128, 256]),
+            thumbnail_quality=config.get('storage.thumbnail_quality', 85)
+        )
+        
         logger.info(f"PostgreSQL connection established: {db_url.split('@')[1] if '@' in db_url else 'localhost'}")
         
         # Create tables and enable pgvector
@@ -401,22 +437,129 @@ class DatabaseManager:
                 session.expunge(person)
             return persons
     
+    def get_person_summaries(self, region: Optional[str] = None, client_id: Optional[str] = None,
+                             after_id: Optional[int] = None, limit: Optional[int] = None,
+                             include_images: bool = False) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        One page of persons with their face counts in a single aggregate query
+        Keyset-paginated by person id; never reads the image_data blobs
+        
+        Args:
+            region: Optional region filter
+            client_id: Optional client filter
+            after_id: Return persons with id greater than this cursor
+            limit: Page size (None returns all remaining persons)
+            include_images: Also list each person's face encodings (image sizes from the blob store)
+        
+        Returns:
+            (person dictionaries, next cursor or None on the last page)
+        """
+        with self.get_session() as session:
+            query = session.query(
+                Person.id,
+                Person.name,
+                Person.emp_id,
+                Person.emp_rank,
+                Person.region,
+                Person.client_id,
+                Person.description,
+                Person.created_at,
+                func.count(FaceEncoding.id).label('face_count'),
+                func.min(FaceEncoding.id).label('first_encoding_id')
+            ).outerjoin(FaceEncoding, FaceEncoding.person_id == Person.id)
+            
+            if region:
+                query = query.filter(Person.region == region)
+            if client_id:
+                query = query.filter(Person.client_id == client_id)
+            if after_id is not None:
+                query = query.filter(Person.id > after_id)
+            
+            query = query.group_by(Person.id).order_by(Person.id.asc())
+            if limit is not None:
+                query = query.limit(limit + 1)
+            rows = query.all()
+            
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = rows[-1].id
+            
+            persons = [{
+                'id': row.id,
+                'name': row.name,
+                'emp_id': row.emp_id,
+                'emp_rank': row.emp_rank,
+                'region': row.region,
+                'client_id': row.client_id,
+                'description': row.description,
+                'created_at': row.created_at,
+                'face_count': int(row.face_count),
+                'first_encoding_id': row.first_encoding_id
+            } for row in rows]
+            
+            if include_images and persons:
+                # The page is a contiguous id range of the filtered persons
+                image_query = session.query(
+                    FaceEncoding.id,
+                    FaceEncoding.person_id,
+                    FaceEncoding.image_path,
+                    FaceEncoding.quality_score,
+                    FaceEncoding.created_at,
+                    FaceEncoding.image_hash,
+                    func.coalesce(func.octet_length(FaceEncoding.image_data), 0).label('image_size')
+                ).join(Person, FaceEncoding.person_id == Person.id).filter(
+                    Person.id >= persons[0]['id'], Person.id <= persons[-1]['id']
+                )
+                if region:
+                    image_query = image_query.filter(Person.region == region)
+                if client_id:
+                    image_query = image_query.filter(Person.client_id == client_id)
+                
+                images_by_person: Dict[int, List[Dict[str, Any]]] = {}
+                for image in image_query.order_by(FaceEncoding.id.asc()):
+                    images_by_person.setdefault(image.person_id, []).append({
+                        'encoding_id': image.id,
+                        'image_path': image.image_path,
+                        'quality_score': image.quality_score,
+                        'created_at': image.created_at,
+                        'image_size': self.blob_store.size(image.image_hash) if image.image_hash else int(image.image_size)
+                    })
+                for person in persons:
+                    person['images'] = images_by_person.get(person['id'], [])
+            
+            return persons, next_cursor
+    
     
     def delete_person(self, person_id: int) -> bool:
-        """Delete person and all their face encodings and attendance records"""
+        """Delete person and all their face encodings, attendance records and analytics events"""
         with self.get_session() as session:
+            # Lock the person row first: analytics inserts for this person (foreign key check)
+            # wait for the delete, so no event can slip in between the rollup update and the delete
+            session.execute(text("SELECT id FROM persons WHERE id = :pid FOR UPDATE"), {"pid": person_id})
+            image_hashes = [row[0] for row in session.execute(
+                text("SELECT DISTINCT image_hash FROM face_encodings WHERE person_id = :pid AND image_hash IS NOT NULL"),
+                {"pid": person_id}
+            )]
             # Use raw SQL to avoid ORM relationship issues
             # Delete attendance records first
             session.execute(text("DELETE FROM attendance WHERE person_id = :pid"), {"pid": person_id})
+            # Delete analytics events here instead of by cascade so the rollup drops the same counts
+            logged = session.execute(
+                text("DELETE FROM analytics_log WHERE person_id = :pid RETURNING date, region, event_type"),
+                {"pid": person_id}
+            ).fetchall()
+            self._decrement_rollups(session, [tuple(row) for row in logged])
             # Delete face encodings
             session.execute(text("DELETE FROM face_encodings WHERE person_id = :pid"), {"pid": person_id})
             # Delete person
             result = session.execute(text("DELETE FROM persons WHERE id = :pid"), {"pid": person_id})
-            
-            if result.rowcount > 0:
-                logger.info(f"Deleted person ID {person_id} and all related records")
-                return True
-            return False
+            deleted = result.rowcount > 0
+        
+        self.release_image_blobs(image_hashes)
+        if deleted:
+            logger.info(f"Deleted person ID {person_id} and all related records")
+        return deleted
     
     # ==================== Face Encoding Methods ====================
     
@@ -433,7 +576,7 @@ class DatabaseManager:
             person_id: Person ID
             encoding: Face embedding vector (numpy array)
             image_path: Optional image path
-            image_data: Optional raw image data
+            image_data: Optional raw image data (written to the blob store)
             face_bbox: Optional bounding box string
             confidence: Detection confidence
             quality_score: Quality score
@@ -441,7 +584,15 @@ class DatabaseManager:
         Returns:
             FaceEncoding object
         """
+        image_hash = self.blob_store.hash_bytes(image_data) if image_data else None
+        
         with self.get_session() as session:
+            if image_hash:
+                # Store the image file first so the row never points at a missing blob; the lock
+                # (held until commit) keeps release_image_blobs from deleting it in between
+                self._lock_blob(session, image_hash)
+                self.blob_store.put(image_data)
+            
             # Convert numpy array to list for pgvector
             embedding_list = encoding.tolist() if isinstance(encoding, np.ndarray) else encoding
             
@@ -449,7 +600,7 @@ class DatabaseManager:
                 person_id=person_id,
                 embedding=embedding_list,
                 image_path=image_path,
-                image_data=image_data,
+                image_hash=image_hash,
                 face_bbox=face_bbox,
                 confidence=confidence,
                 quality_score=quality_score
@@ -457,10 +608,76 @@ class DatabaseManager:
             session.add(face_encoding)
             session.flush()
             session.refresh(face_encoding)
+            
+            # The first encoding of a person becomes its profile encoding
+            session.execute(
+                text("UPDATE persons SET profile_encoding_id = :eid WHERE id = :pid AND profile_encoding_id IS NULL"),
+                {"eid": face_encoding.id, "pid": person_id}
+            )
             logger.info(f"Added face encoding for person_id={person_id}")
             session.expunge(face_encoding)
             return face_encoding
     
+    def refresh_profile_encoding(self, session: Session, person_id: int):
+        """
+        Point a person's profile encoding back at its oldest remaining encoding
+        (call in the session that deleted one of the person's encodings)
+        """
+        session.flush()
+        session.execute(text("""
+            UPDATE persons
+            SET profile_encoding_id = (SELECT MIN(id) FROM face_encodings WHERE person_id = :pid)
+            WHERE id = :pid
+        """), {"pid": person_id})
+    
+    # ==================== Face Image Methods ====================
+    
+    def get_face_image_ref(self, encoding_id: int) -> Optional[Tuple[Optional[str], Optional[bytes]]]:
+        """
+        Locate the image of a face encoding without loading the row
+        
+        Returns:
+            (image_hash, legacy inline image_data) or None if the encoding does not exist;
+            image_data is only read for rows not yet moved to the blob store
+        """
+        with self.get_session() as session:
+            row = session.query(FaceEncoding.image_hash).filter(FaceEncoding.id == encoding_id).first()
+            if row is None:
+                return None
+            if row.image_hash:
+                return row.image_hash, None
+            image_data = session.query(FaceEncoding.image_data).filter(FaceEncoding.id == encoding_id).scalar()
+            return None, bytes(image_data) if image_data else None
+    
+    @staticmethod
+    def _lock_blob(session: Session, image_hash: str):
+        """Transaction advisory lock on one blob（released at commit/rollback）"""
+        session.execute(
+            text("SELECT pg_advisory_xact_lock(:namespace, hashtext(:digest))"),
+            {'namespace': _BLOB_LOCK_NAMESPACE, 'digest': image_hash}
+        )
+    
+    def release_image_blobs(self, image_hashes: List[str]):
+        """
+        Delete blobs (and thumbnails) no face encoding refers to any more
+        Each reference check and delete holds the blob's advisory lock, so a concurrent
+        add_face_encoding of the same bytes either commits its row first（blob kept）or
+        writes the file again after the delete
+        """
+        image_hashes = sorted({digest for digest in image_hashes if digest})
+        for digest in image_hashes:
+            with self.get_session() as session:
+                self._lock_blob(session, digest)
+                referenced = session.query(FaceEncoding.id).filter(
+                    FaceEncoding.image_hash == digest
+                ).first() is not None
+                if referenced:
+                    continue
+                try:
+                    self.blob_store.delete(digest)
+                except OSError as e:
+                    logger.warning(f"Failed to delete image blob {digest}: {e}")
+    
     # ==================== Vector Search Method (MAIN FEATURE) ====================
     
     def find_similar_faces(self, embedding: np.ndarray, region: str, 
@@ -518,12 +735,14 @@ class DatabaseManager:
             for face_encoding, person, distance in query.all():
                 similarity = 1.0 - distance  # Convert distance back to similarity
                 results.append({
+                    'person_id': person.id,
                     'emp_id': person.emp_id,
                     'name': person.name,
                     'region': person.region,
                     'match_score': similarity * 100,  # Percentage
                     'distance': float(distance),
                     'face_encoding_id': face_encoding.id,
+                    'profile_encoding_id': person.profile_encoding_id or face_encoding.id,
                     'quality': face_encoding.quality_score,
                     'confidence': face_encoding.confidence
                 })
@@ -531,7 +750,174 @@ class DatabaseManager:
             search_scope = f"emp_id '{emp_id}'" if emp_id else f"region '{region}'"
             logger.info(f"Found {len(results)} matches in {search_scope} above threshold {threshold}")
             return results
+
+    def find_similar_faces_batch(self, embeddings: List[np.ndarray], region: Optional[str],
+                                 emp_id: Optional[str] = None,
+                                 client_id: Optional[str] = None,
+                                 threshold: float = 0.3,
+                                 limit: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Find similar faces for several query embeddings in a single round trip
+        Every query vector gets its own top-k through a LATERAL join, so each result
+        list is identical to what find_similar_faces returns for that vector
+        
+        Args:
+            embeddings: Query face embeddings (e.g. every face in one frame)
+            region: Region to search in (None searches every region)
+            emp_id: Optional employee ID for targeted search
+            client_id: Optional client filter
+            threshold: Similarity threshold (0-1)
+            limit: Maximum results per query
+        
+        Returns:
+            One list of matches per query embedding
+        """
+        results: List[List[Dict[str, Any]]] = [[] for _ in range(len(embeddings))]
+        if not embeddings:
+            return results
+        
+        params: Dict[str, Any] = {'max_distance': 1.0 - threshold, 'limit': limit}
+        bind_params = []
+        values = []
+        for i, embedding in enumerate(embeddings):
+            embedding_list = embedding.tolist() if isinstance(embedding, np.ndarray) else list(embedding)
+            params[f'q{i}'] = embedding_list
+            bind_params.append(bindparam(f'q{i}', type_=Vector(len(embedding_list))))
+            values.append(f"({i}, CAST(:q{i} AS vector))")
+        
+        filters = ["TRUE"]
+        if region is not None:
+            filters.append("p.region = :region")
+            params['region'] = region
+        if emp_id:
+            filters.append("p.emp_id = :emp_id")
+            params['emp_id'] = emp_id
+        if client_id:
+            filters.append("p.client_id = :client_id")
+            params['client_id'] = client_id
+        
+        sql = text(f"""
+            WITH q(idx, embedding) AS (VALUES {', '.join(values)})
+            SELECT q.idx, m.face_encoding_id, m.person_id, m.emp_id, m.name, m.region,
+                   m.profile_encoding_id, m.quality_score, m.confidence, m.distance
+            FROM q
+            CROSS JOIN LATERAL (
+                SELECT fe.id AS face_encoding_id, p.id AS person_id, p.emp_id, p.name, p.region,
+                       p.profile_encoding_id, fe.quality_score, fe.confidence,
+                       fe.embedding <=> q.embedding AS distance
+                FROM face_encodings fe
+                JOIN persons p ON p.id = fe.person_id
+                WHERE {' AND '.join(filters)}
+                ORDER BY fe.embedding <=> q.embedding
+                LIMIT :limit
+            ) m
+            WHERE m.distance < :max_distance
+            ORDER BY q.idx, m.distance
+        """).bindparams(*bind_params)
+        
+        with self.get_session() as session:
+            for row in session.execute(sql, params):
+                distance = float(row.distance)
+                results[row.idx].append({
+                    'person_id': row.person_id,
+                    'emp_id': row.emp_id,
+                    'name': row.name,
+                    'region': row.region,
+                    'match_score': (1.0 - distance) * 100,  # Percentage
+                    'distance': distance,
+                    'face_encoding_id': row.face_encoding_id,
+                    'profile_encoding_id': row.profile_encoding_id or row.face_encoding_id,
+                    'quality': row.quality_score,
+                    'confidence': row.confidence
+                })
+        
+        search_scope = f"emp_id '{emp_id}'" if emp_id else f"region '{region}'"
+        logger.info(f"Batch search for {len(embeddings)} faces in {search_scope}: {sum(len(r) > 0 for r in results)} matched")
+        return results
     
+    def get_gallery_rows(self, person_id: Optional[int] = None) -> List[Tuple]:
+        """
+        Load embeddings with person metadata for the in-memory gallery index
+        Only selects the columns the index needs (never the image_data blobs)
+
+        Args:
+            person_id: Optional person filter (used to refresh a single person)
+
+        Returns:
+            List of (encoding_id, person_id, embedding, quality_score, confidence,
+                     emp_id, name, region, client_id) tuples
+        """
+        with self.get_session() as session:
+            query = session.query(
+                FaceEncoding.id,
+                FaceEncoding.person_id,
+                FaceEncoding.embedding,
+                FaceEncoding.quality_score,
+                FaceEncoding.confidence,
+                Person.emp_id,
+                Person.name,
+                Person.region,
+                Person.client_id
+            ).join(Person, FaceEncoding.person_id == Person.id)
+
+            if person_id is not None:
+                query = query.filter(FaceEncoding.person_id == person_id)
+
+            return [tuple(row) for row in query.order_by(FaceEncoding.id.asc()).yield_per(5000)]
+
+    def get_face_image_samples(self, limit: int = 200) -> List[Tuple[int, bytes]]:
+        """
+        Random sample of stored face images（e.g. as a model calibration / evaluation set）
+        
+        Args:
+            limit: Maximum number of images
+        
+        Returns:
+            (face_encoding_id, image_data) tuples
+        """
+        with self.get_session() as session:
+            rows = session.query(FaceEncoding.id, FaceEncoding.image_hash, FaceEncoding.image_data).filter(
+                (FaceEncoding.image_hash.isnot(None)) | (FaceEncoding.image_data.isnot(None))
+            ).order_by(func.random()).limit(limit).all()
+        
+        samples = []
+        for encoding_id, image_hash, image_data in rows:
+            data = self.blob_store.get(image_hash) if image_hash else bytes(image_data)
+            if data:
+                samples.append((encoding_id, data))
+        return samples
+    
+    def get_gallery_version(self) -> int:
+        """
+        Get the current gallery version (creates the state row on first use)
+        
+        Returns:
+            Gallery version number
+        """
+        with self.get_session() as session:
+            version = session.execute(text("SELECT version FROM gallery_state WHERE id = 1")).scalar()
+            if version is None:
+                session.execute(text(
+                    "INSERT INTO gallery_state (id, version, updated_at) VALUES (1, 0, now()) ON CONFLICT (id) DO NOTHING"
+                ))
+                version = 0
+            return int(version)
+    
+    def bump_gallery_version(self) -> int:
+        """
+        Record a face gallery change
+        
+        Returns:
+            The new gallery version
+        """
+        with self.get_session() as session:
+            version = session.execute(text(
+                "INSERT INTO gallery_state (id, version, updated_at) VALUES (1, 1, now()) "
+                "ON CONFLICT (id) DO UPDATE SET version = gallery_state.version + 1, updated_at = now() "
+                "RETURNING version"
+            )).scalar()
+            return int(version)
+
     # ==================== Statistics ====================
     
     def get_statistics(self) -> Dict[str, Any]:
@@ -589,11 +975,16 @@ class DatabaseManager:
         """Delete a face encoding by ID"""
         with self.get_session() as session:
             encoding = session.query(FaceEncoding).filter(FaceEncoding.id == encoding_id).first()
-            if encoding:
-                session.delete(encoding)
-                logger.info(f"Deleted face encoding ID {encoding_id}")
-                return True
-            return False
+            if not encoding:
+                return False
+            person_id = encoding.person_id
+            image_hash = encoding.image_hash
+            session.delete(encoding)
+            self.refresh_profile_encoding(session, person_id)
+        
+        self.release_image_blobs([image_hash])
+        logger.info(f"Deleted face encoding ID {encoding_id}")
+        return True
     
     def get_all_encodings_with_persons(self) -> List[Tuple[Person, FaceEncoding]]:
         """Get all encodings with person info (backward compatible)"""
@@ -620,36 +1011,165 @@ class DatabaseManager:
         if date is None:
             date = datetime.now(ist).replace(hour=0, minute=0, second=0, microsecond=0)
         
+        now = datetime.now(ist)
         with self.get_session() as session:
-            # Check if attendance already exists for this person on this date
-            existing = session.query(Attendance).filter(
-                Attendance.person_id == person_id,
-                Attendance.date == date
-            ).first()
-            
-            if existing:
-                # Update existing attendance
-                existing.status = status
-                existing.marked_at = datetime.now(ist)
-                session.flush()
-                session.refresh(existing)
-                session.expunge(existing)
-                logger.info(f"Updated attendance for person_id={person_id} on {date.date()}")
-                return existing
-            else:
-                # Create new attendance record
-                attendance = Attendance(
-                    person_id=person_id,
-                    date=date,
-                    status=status,
-                    marked_at=datetime.now(ist)
+            # One record per person and day（uq_attendance_person_date）
+            stmt = pg_insert(Attendance).values(
+                person_id=person_id,
+                date=date,
+                status=status,
+                marked_at=now
+            ).on_conflict_do_update(
+                constraint='uq_attendance_person_date',
+                set_={'status': status, 'marked_at': now}
+            ).returning(Attendance)
+            attendance = session.scalars(stmt, execution_options={'populate_existing': True}).one()
+            session.expunge(attendance)
+            logger.info(f"Marked attendance for person_id={person_id} on {date.date()}")
+            return attendance
+    
+    def check_in_or_out(self, date: datetime, now: datetime, action: str = 'check_in', status: str = 'present',
+                        person_id: Optional[int] = None, emp_id: Optional[str] = None, name: Optional[str] = None,
+                        latitude: Optional[float] = None, longitude: Optional[float] = None,
+                        location_accuracy: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Check-in/check-out state machine as a single upsert statement
+        
+        - No record for the day: insert one with the check-in
+        - Checked in and action == 'check_out': record the check-out
+        - Otherwise the record is returned unchanged（check-out pending or day completed）
+        The person lookup, the upsert and the result are one round trip; the unique
+        (person_id, date) constraint serializes concurrent scans of the same person
+        
+        Args:
+            date: Attendance day (naive midnight)
+            now: Scan time (check-in / check-out timestamp)
+            action: 'check_in' or 'check_out'
+            status: Status of a new record
+            person_id / emp_id / name: Person lookup, first one given wins
+            latitude / longitude / location_accuracy: Scan location
+        
+        Returns:
+            Dictionary with 'outcome' ('check_in', 'check_out', 'check_out_required', 'completed'),
+            'person' and 'attendance', or None if the person does not exist
+        """
+        if person_id:
+            person_filter, params = "id = :person_id", {'person_id': person_id}
+        elif emp_id:
+            person_filter, params = "emp_id = :emp_id", {'emp_id': emp_id}
+        elif name:
+            person_filter, params = "name = :name", {'name': name}
+        else:
+            return None
+        
+        results = self._check_in_or_out(person_filter + " ORDER BY id LIMIT 1", params, date, now, action, status,
+                                         latitude, longitude, location_accuracy)
+        return results[0] if results else None
+    
+    def check_in_or_out_persons(self, person_ids: List[int], date: datetime, now: datetime,
+                                action: str = 'check_in', status: str = 'present',
+                                latitude: Optional[float] = None, longitude: Optional[float] = None,
+                                location_accuracy: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        check_in_or_out for several already-resolved persons（e.g. every match of one frame）
+        in a single statement and transaction
+        
+        Returns:
+            One result per existing person, ordered by person id
+        """
+        person_ids = sorted({int(pid) for pid in person_ids if pid is not None})
+        if not person_ids:
+            return []
+        return self._check_in_or_out("id = ANY(:person_ids) ORDER BY id", {'person_ids': person_ids},
+                                     date, now, action, status, latitude, longitude, location_accuracy)
+    
+    def _check_in_or_out(self, person_filter: str, params: Dict[str, Any], date: datetime, now: datetime,
+                         action: str, status: str, latitude: Optional[float], longitude: Optional[float],
+                         location_accuracy: Optional[float]) -> List[Dict[str, Any]]:
+        params = dict(params, date=date, now=now, status=status, action=action,
+                      lat=latitude, lon=longitude, acc=location_accuracy)
+        sql = text(f"""
+            WITH person AS (
+                SELECT id, name, emp_id, emp_rank, region
+                FROM persons
+                WHERE {person_filter}
+            ),
+            upsert AS (
+                INSERT INTO attendance AS a (
+                    person_id, date, status, marked_at, check_in_time,
+                    check_in_latitude, check_in_longitude, check_in_location_accuracy
                 )
-                session.add(attendance)
-                session.flush()
-                session.refresh(attendance)
-                session.expunge(attendance)
-                logger.info(f"Marked attendance for person_id={person_id} on {date.date()}")
-                return attendance
+                SELECT id, CAST(:date AS timestamp), :status, CAST(:now AS timestamptz), CAST(:now AS timestamptz),
+                       CAST(:lat AS double precision), CAST(:lon AS double precision), CAST(:acc AS double precision)
+                FROM person
+                ON CONFLICT (person_id, date) DO UPDATE SET
+                    check_in_time = COALESCE(a.check_in_time, EXCLUDED.check_in_time),
+                    check_in_latitude = CASE WHEN a.check_in_time IS NULL THEN EXCLUDED.check_in_latitude ELSE a.check_in_latitude END,
+                    check_in_longitude = CASE WHEN a.check_in_time IS NULL THEN EXCLUDED.check_in_longitude ELSE a.check_in_longitude END,
+                    check_in_location_accuracy = CASE WHEN a.check_in_time IS NULL THEN EXCLUDED.check_in_location_accuracy ELSE a.check_in_location_accuracy END,
+                    check_out_time = CASE WHEN :action = 'check_out' AND a.check_in_time IS NOT NULL AND a.check_out_time IS NULL
+                                          THEN EXCLUDED.check_in_time ELSE a.check_out_time END,
+                    check_out_latitude = CASE WHEN :action = 'check_out' AND a.check_in_time IS NOT NULL AND a.check_out_time IS NULL
+                                              AND EXCLUDED.check_in_latitude IS NOT NULL AND EXCLUDED.check_in_longitude IS NOT NULL
+                                              THEN EXCLUDED.check_in_latitude ELSE a.check_out_latitude END,
+                    check_out_longitude = CASE WHEN :action = 'check_out' AND a.check_in_time IS NOT NULL AND a.check_out_time IS NULL
+                                               AND EXCLUDED.check_in_latitude IS NOT NULL AND EXCLUDED.check_in_longitude IS NOT NULL
+                                               THEN EXCLUDED.check_in_longitude ELSE a.check_out_longitude END,
+                    check_out_location_accuracy = CASE WHEN :action = 'check_out' AND a.check_in_time IS NOT NULL AND a.check_out_time IS NULL
+                                                       AND EXCLUDED.check_in_latitude IS NOT NULL AND EXCLUDED.check_in_longitude IS NOT NULL
+                                                       THEN EXCLUDED.check_in_location_accuracy ELSE a.check_out_location_accuracy END
+                RETURNING a.id, a.person_id AS attendance_person_id, a.status, a.date, a.check_in_time, a.check_out_time,
+                          a.check_in_latitude, a.check_in_longitude, a.check_in_location_accuracy,
+                          a.check_out_latitude, a.check_out_longitude, a.check_out_location_accuracy,
+                          (a.xmax = 0) AS inserted
+            )
+            SELECT p.id AS person_id, p.name, p.emp_id, p.emp_rank, p.region, u.*
+            FROM person p
+            JOIN upsert u ON u.attendance_person_id = p.id
+            ORDER BY p.id
+        """)
+        
+        with self.get_session() as session:
+            rows = session.execute(sql, params).mappings().all()
+        return [self._check_in_or_out_result(row, now) for row in rows]
+    
+    @staticmethod
+    def _check_in_or_out_result(row, now: datetime) -> Dict[str, Any]:
+        """Derive the state machine outcome from an upserted attendance row"""
+        if row['inserted']:
+            outcome = 'check_in'
+        elif row['check_out_time'] is not None and row['check_out_time'] == now:
+            outcome = 'check_out'
+        elif row['check_in_time'] is not None and row['check_in_time'] == now:
+            outcome = 'check_in'  # Record created earlier without a check-in
+        elif row['check_out_time'] is not None:
+            outcome = 'completed'
+        else:
+            outcome = 'check_out_required'
+        
+        return {
+            'outcome': outcome,
+            'person': {
+                'id': row['person_id'],
+                'name': row['name'],
+                'emp_id': row['emp_id'],
+                'emp_rank': row['emp_rank'],
+                'region': row['region']
+            },
+            'attendance': {
+                'id': row['id'],
+                'status': row['status'],
+                'date': row['date'],
+                'check_in_time': row['check_in_time'],
+                'check_out_time': row['check_out_time'],
+                'check_in_latitude': row['check_in_latitude'],
+                'check_in_longitude': row['check_in_longitude'],
+                'check_in_location_accuracy': row['check_in_location_accuracy'],
+                'check_out_latitude': row['check_out_latitude'],
+                'check_out_longitude': row['check_out_longitude'],
+                'check_out_location_accuracy': row['check_out_location_accuracy']
+            }
+        }
     
     def get_attendance_by_date(self, date: datetime, region: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get attendance records for a specific date with person details"""
@@ -677,39 +1197,101 @@ class DatabaseManager:
             
             return results
     
+    def get_attendance_roster(self, date: datetime, region: Optional[str] = None,
+                              after_id: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Daily roster: every person with their attendance status for a date, in one query
+        Persons are LEFT JOINed to the day's attendance; the present/absent counts cover the
+        whole roster and are computed by the same statement as the (keyset-paginated) page
+        
+        Args:
+            date: Attendance date
+            region: Optional region filter
+            after_id: Return persons with id greater than this cursor
+            limit: Page size (None returns all remaining persons)
+        
+        Returns:
+            Dictionary with total/present/absent counts, records and next_cursor
+        """
+        params: Dict[str, Any] = {
+            'date': date,
+            'after_id': after_id if after_id is not None else 0,
+            'limit': limit + 1 if limit is not None else None
+        }
+        filters = ["TRUE"]
+        if region:
+            filters.append("p.region = :region")
+            params['region'] = region
+        
+        sql = text(f"""
+            WITH day AS (
+                SELECT DISTINCT ON (person_id) id, person_id, status, marked_at, check_in_time, check_out_time
+                FROM attendance
+                WHERE date = :date
+                ORDER BY person_id, id
+            ),
+            roster AS (
+                SELECT p.id AS person_id, p.name, p.emp_id, p.emp_rank, p.region,
+                       COALESCE(d.status, 'absent') AS status, d.marked_at, d.check_in_time,
+                       d.check_out_time, d.id AS attendance_id
+                FROM persons p
+                LEFT JOIN day d ON d.person_id = p.id
+                WHERE {' AND '.join(filters)}
+            ),
+            counts AS (
+                SELECT COUNT(*) AS total,
+                       COUNT(*) FILTER (WHERE status = 'present') AS present,
+                       COUNT(*) FILTER (WHERE status = 'absent') AS absent
+                FROM roster
+            )
+            SELECT c.total, c.present, c.absent, r.*
+            FROM counts c
+            LEFT JOIN LATERAL (
+                SELECT * FROM roster
+                WHERE person_id > :after_id
+                ORDER BY person_id
+                LIMIT :limit
+            ) r ON TRUE
+        """)
+        
+        with self.get_session() as session:
+            rows = session.execute(sql, params).mappings().all()
+        
+        records = []
+        for row in rows:
+            if row['person_id'] is None:
+                continue  # Empty page: only the counts row
+            records.append({
+                'person_id': row['person_id'],
+                'name': row['name'],
+                'emp_id': row['emp_id'],
+                'emp_rank': row['emp_rank'],
+                'region': row['region'],
+                'status': row['status'],
+                'marked_at': row['marked_at'].isoformat() if row['marked_at'] else None,
+                'check_in_time': row['check_in_time'].isoformat() if row['check_in_time'] else None,
+                'check_out_time': row['check_out_time'].isoformat() if row['check_out_time'] else None,
+                'attendance_id': row['attendance_id'],
+                'date': date.isoformat()
+            })
+        
+        next_cursor = None
+        if limit is not None and len(records) > limit:
+            records = records[:limit]
+            next_cursor = records[-1]['person_id']
+        
+        counts = rows[0] if rows else {'total': 0, 'present': 0, 'absent': 0}
+        return {
+            'total': int(counts['total']),
+            'present': int(counts['present']),
+            'absent': int(counts['absent']),
+            'records': records,
+            'next_cursor': next_cursor
+        }
+    
     def get_all_persons_with_attendance(self, date: datetime, region: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get all persons with their attendance status for a specific date"""
-        with self.get_session() as session:
-            # Get all persons in the region
-            query = session.query(Person)
-            if region:
-                query = query.filter(Person.region == region)
-            
-            persons = query.all()
-            
-            results = []
-            for person in persons:
-                # Check if attendance exists for this person on this date
-                attendance = session.query(Attendance).filter(
-                    Attendance.person_id == person.id,
-                    Attendance.date == date
-                ).first()
-                
-                results.append({
-                    'person_id': person.id,
-                    'name': person.name,
-                    'emp_id': person.emp_id,
-                    'emp_rank': person.emp_rank,
-                    'region': person.region,
-                    'status': attendance.status if attendance else 'absent',
-                    'marked_at': attendance.marked_at.isoformat() if attendance and attendance.marked_at else None,
-                    'check_in_time': attendance.check_in_time.isoformat() if attendance and attendance.check_in_time else None,
-                    'check_out_time': attendance.check_out_time.isoformat() if attendance and attendance.check_out_time else None,
-                    'attendance_id': attendance.id if attendance else None,
-                    'date': date.isoformat()
-                })
-            
-            return results
+        return self.get_attendance_roster(date, region)['records']
     
     # ==================== Analytics Logging ====================
     
@@ -745,6 +1327,7 @@ class DatabaseManager:
                 session.add(log_entry)
                 session.flush()
                 log_id = log_entry.id
+                self._increment_rollups(session, [(now_ist.date(), region, event_type)])
                 session.commit()
                 
             logger.info(f"✅ Analytics event logged: {event_type} for {name} (ID: {log_id})")
@@ -754,55 +1337,119 @@ class DatabaseManager:
             logger.error(f"❌ Failed to log analytics event: {e}")
             raise
     
+    def log_events(self, events: List[Dict[str, Any]]) -> int:
+        """
+        Insert many analytics events in one transaction (multi-row INSERT plus rollup upserts)
+        
+        Args:
+            events: Dictionaries with event_type, person_id, emp_id, name, region,
+                    timestamp, date and event_metadata
+        
+        Returns:
+            Number of events written
+        """
+        if not events:
+            return 0
+        with self.get_session() as session:
+            # Persons deleted since the event was queued would fail the foreign key
+            person_ids = {event['person_id'] for event in events if event.get('person_id') is not None}
+            existing = set()
+            if person_ids:
+                existing = {row[0] for row in session.query(Person.id).filter(Person.id.in_(person_ids))}
+            rows = [
+                dict(event, person_id=event.get('person_id') if event.get('person_id') in existing else None)
+                for event in events
+            ]
+            session.execute(insert(AnalyticsLog), rows)
+            self._increment_rollups(session, [(row['date'], row.get('region'), row['event_type']) for row in rows])
+        logger.debug(f"Analytics events written: {len(rows)}")
+        return len(rows)
+    
+    def _increment_rollups(self, session: Session, events: List[Tuple[Any, Optional[str], str]]):
+        """
+        Add logged events to the daily rollup (in the session that inserts them)
+        
+        Args:
+            events: (date, region, event_type) of each logged event
+        """
+        for (event_date, region, event_type), count in self._rollup_counts(events):
+            session.execute(text("""
+                INSERT INTO analytics_daily_rollup (date, region, event_type, count)
+                VALUES (:date, :region, :event_type, :count)
+                ON CONFLICT (date, region, event_type)
+                DO UPDATE SET count = analytics_daily_rollup.count + EXCLUDED.count
+            """), {'date': event_date, 'region': region, 'event_type': event_type, 'count': count})
+    
+    def _decrement_rollups(self, session: Session, events: List[Tuple[Any, Optional[str], str]]):
+        """
+        Remove deleted events from the daily rollup (in the session that deletes them)
+        
+        Args:
+            events: (date, region, event_type) of each deleted event
+        """
+        for (event_date, region, event_type), count in self._rollup_counts(events):
+            session.execute(text("""
+                UPDATE analytics_daily_rollup SET count = count - :count
+                WHERE date = :date AND region = :region AND event_type = :event_type
+            """), {'date': event_date, 'region': region, 'event_type': event_type, 'count': count})
+    
+    @staticmethod
+    def _rollup_counts(events: List[Tuple[Any, Optional[str], str]]) -> List[Tuple[Tuple[Any, str, str], int]]:
+        """Event counts per rollup key, in a fixed key order so concurrent writers lock rollup rows in the same order"""
+        counts: Dict[Tuple[Any, str, str], int] = {}
+        for event_date, region, event_type in events:
+            key = (event_date, region or '', event_type)
+            counts[key] = counts.get(key, 0) + 1
+        return sorted(counts.items())
+    
     def get_analytics_summary(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, 
                              region: Optional[str] = None) -> Dict[str, Any]:
         """
         Get analytics summary for a date range
         
         Returns counts of registrations, check-ins, and check-outs
+        Read from the daily rollup, so the cost grows with the number of days, not events
         """
         with self.get_session() as session:
-            query = session.query(AnalyticsLog)
+            query = session.query(
+                AnalyticsDailyRollup.date,
+                AnalyticsDailyRollup.event_type,
+                func.sum(AnalyticsDailyRollup.count)
+            ).filter(AnalyticsDailyRollup.event_type.in_(['registration', 'check_in', 'check_out']))
             
             if start_date:
-                query = query.filter(AnalyticsLog.date >= start_date.date())
+                query = query.filter(AnalyticsDailyRollup.date >= start_date.date())
             if end_date:
-                query = query.filter(AnalyticsLog.date <= end_date.date())
+                query = query.filter(AnalyticsDailyRollup.date <= end_date.date())
             if region:
-                query = query.filter(AnalyticsLog.region == region)
-            
-            all_logs = query.all()
-            
-            # Count by event type
-            registrations = len([log for log in all_logs if log.event_type == 'registration'])
-            check_ins = len([log for log in all_logs if log.event_type == 'check_in'])
-            check_outs = len([log for log in all_logs if log.event_type == 'check_out'])
+                query = query.filter(AnalyticsDailyRollup.region == region)
             
-            # Get daily breakdown
-            daily_stats = {}
-            for log in all_logs:
-                date_str = log.date.isoformat()
-                if date_str not in daily_stats:
-                    daily_stats[date_str] = {'registrations': 0, 'check_ins': 0, 'check_outs': 0}
-                
-                if log.event_type == 'registration':
-                    daily_stats[date_str]['registrations'] += 1
-                elif log.event_type == 'check_in':
-                    daily_stats[date_str]['check_ins'] += 1
-                elif log.event_type == 'check_out':
-                    daily_stats[date_str]['check_outs'] += 1
-            
-            return {
-                'total_registrations': registrations,
-                'total_check_ins': check_ins,
-                'total_check_outs': check_outs,
-                'daily_stats': daily_stats,
-                'date_range': {
-                    'start': start_date.isoformat() if start_date else None,
-                    'end': end_date.isoformat() if end_date else None
-                },
-                'region': region
-            }
+            rows = query.group_by(AnalyticsDailyRollup.date, AnalyticsDailyRollup.event_type).order_by(
+                AnalyticsDailyRollup.date
+            ).all()
+        
+        # Get daily breakdown
+        stat_keys = {'registration': 'registrations', 'check_in': 'check_ins', 'check_out': 'check_outs'}
+        totals = {'registrations': 0, 'check_ins': 0, 'check_outs': 0}
+        daily_stats = {}
+        for event_date, event_type, count in rows:
+            date_str = event_date.isoformat()
+            if date_str not in daily_stats:
+                daily_stats[date_str] = {'registrations': 0, 'check_ins': 0, 'check_outs': 0}
+            daily_stats[date_str][stat_keys[event_type]] += int(count)
+            totals[stat_keys[event_type]] += int(count)
+        
+        return {
+            'total_registrations': totals['registrations'],
+            'total_check_ins': totals['check_ins'],
+            'total_check_outs': totals['check_outs'],
+            'daily_stats': daily_stats,
+            'date_range': {
+                'start': start_date.isoformat() if start_date else None,
+                'end': end_date.isoformat() if end_date else None
+            },
+            'region': region
+        }
     
     def get_recent_events(self, limit: int = 50, event_type: Optional[str] = None, 
                          region: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -1,6 +1,13 @@
 """
 初始化服务模块
 """
-from .advanced_face_service import AdvancedFaceRecognitionService, get_advanced_face_service
+import importlib
 
 __all__ = ['AdvancedFaceRecognitionService', 'get_advanced_face_service']
+
+
+def __getattr__(name):
+    # Loaded on first access, so numpy-only modules (e.g. gallery_index) import without the model stack
+    if name in __all__:
+        return getattr(importlib.import_module('.advanced_face_service', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,6 +3,7 @@ based on InsightFace and DeepFace Advanced facial recognition services
 Using the latest deep learning technology，Provides higher accuracy and performance
 """
 import os
+import glob
 import cv2
 import numpy as np
 import logging
@@ -15,22 +16,39 @@ import base64
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from src.utils.enhanced_visualization import EnhancedFaceVisualizer
-import pickle
 import base64
 from pathlib import Path
 
 # Advanced face recognition library
 import insightface
+from insightface.app.common import Face
+from insightface.model_zoo import ArcFaceONNX, Attribute, Landmark, RetinaFace
+from insightface.utils import face_align, ensure_available
 from deepface import DeepFace
+import onnx
 import onnxruntime
 
 # local module
 from ..models.database import DatabaseManager, Person, FaceEncoding
 from ..utils.config import config
 from ..utils.model_manager import get_model_manager
+from ..utils.image_utils import DecodedImage, decode_upload
+from .gallery_index import GalleryIndex
+from .gallery_sync import GallerySnapshotSync, GalleryVersionSync
+from .inference_scheduler import MicroBatchScheduler
+from .embedding_cache import EmbeddingCache, content_key
+from .analytics_sink import AnalyticsEventSink
+from .face_tracker import FaceTracker
 
 logger = logging.getLogger(__name__)
 
+# InsightFace modules run by each pipeline profile
+PIPELINE_PROFILES = {
+    'detect': ('detection',),  # Boxes, 5 key points and scores only
+    'embed': ('detection', 'recognition'),  # Plus the ArcFace embedding（recognition、enrollment）
+    'full': ('detection', 'recognition', 'genderage', 'landmark_2d_106', 'landmark_3d_68')  # Every attribute
+}
+
 class AdvancedFaceRecognitionService:
     """
     Advanced facial recognition service
@@ -64,13 +82,52 @@ class AdvancedFaceRecognitionService:
         self.visualizer = EnhancedFaceVisualizer()
         
         # initialization InsightFace
+        self._recognition_batching = True  # Cleared if the recognition model rejects batched input
+        self.onnx_session_report = None
+        self._resolved_profiles: Dict[str, Dict[str, List[str]]] = {}
+        self.active_model_name = model_name
         self._init_insightface()
         
         # set up DeepFace Configuration
         self._init_deepface()
         
-        # PostgreSQL + pgvector handles all caching and search
-        logger.info("📝 Using PostgreSQL + pgvector for face search")
+        # Optional cache of detections and embeddings keyed by upload content（retries and re-sent frames）
+        self.embedding_cache = None
+        if config.get('face_recognition.enable_cache', True) and self.app is not None:
+            self.embedding_cache = EmbeddingCache(
+                max_entries=config.get('face_recognition.cache_limit', 5000),
+                max_bytes=config.get('face_recognition.cache_max_bytes', 64 * 1024 * 1024),
+                ttl=config.get('face_recognition.cache_ttl', 300)
+            )
+        
+        # Optional micro-batching of concurrent detection/embedding requests
+        self.inference_scheduler = None
+        if config.get('face_recognition.micro_batching.enabled', False) and self.app is not None:
+            self.inference_scheduler = MicroBatchScheduler(
+                self.detect_faces_batch,
+                window_ms=config.get('face_recognition.micro_batching.window_ms', 10),
+                max_batch_size=config.get('face_recognition.micro_batching.max_batch_size', 16),
+                name='face_inference'
+            )
+        
+        # Optional in-memory gallery index（PostgreSQL + pgvector remains the store of record）
+        self.gallery_index = None
+        self.gallery_sync = None
+        if config.get('face_recognition.gallery_index.enabled', False):
+            self._init_gallery_index()
+        else:
+            logger.info("📝 Using PostgreSQL + pgvector for face search")
+        
+        # Optional buffered analytics writer（events are flushed in bulk by a background thread）
+        self.analytics_sink = None
+        if config.get('analytics.event_sink.enabled', False):
+            self.analytics_sink = AnalyticsEventSink(
+                self.db_manager,
+                max_queue=config.get('analytics.event_sink.max_queue', 10000),
+                batch_size=config.get('analytics.event_sink.batch_size', 500),
+                flush_interval=config.get('analytics.event_sink.flush_interval', 1.0),
+                spool_dir=config.get('analytics.event_sink.spool_dir', 'data/analytics_spool')
+            )
         
         logger.info(f"Advanced face recognition service initialization completed，Use model: {model_name}")
     
@@ -80,13 +137,29 @@ class AdvancedFaceRecognitionService:
             # Configure using the model manager InsightFace path
             model_root = self.model_manager.configure_insightface(self.model_name)
             
+            # Optional INT8 model pack（built by scripts/quantize_models.py）
+            model_name = self.model_name
+            if config.get('face_recognition.quantization.enabled', False):
+                if self.model_manager.has_quantized_model(self.model_name):
+                    model_name = self.model_manager.get_quantized_model_name(self.model_name)
+                    logger.info(f"Using INT8 quantized models: {model_name}")
+                else:
+                    logger.warning(f"INT8 models for {self.model_name} have not been built（run scripts/quantize_models.py），using fp32 models")
+            self.active_model_name = model_name
+            
+            # Providers and detection size from configuration（GPU: add CUDAExecutionProvider）
+            providers = config.get('face_recognition.providers', ['CPUExecutionProvider']) or ['CPUExecutionProvider']
+            det_size = tuple(config.get('face_recognition.det_size', [640, 640]))
+            
             # Initialize application
-            self.app = insightface.app.FaceAnalysis(
-                name=self.model_name,
-                root=model_root,
-                providers=['CPUExecutionProvider']  # use CPU，GPU Can be changed to CUDAExecutionProvider
-            )
-            self.app.prepare(ctx_id=0, det_size=(640, 640))
+            # Only the configured modules are kept loaded（resolve_profile reports what a profile lacks）
+            modules = list(config.get('face_recognition.pipeline.modules', ['detection', 'recognition', 'genderage']))
+            if 'detection' not in modules:
+                modules.insert(0, 'detection')
+            self.app = self._load_face_analysis(model_name, model_root, providers, modules)
+            logger.info(f"InsightFace modules loaded: {sorted(self.app.models.keys())}")
+            self._report_session_options(providers)
+            self.app.prepare(ctx_id=0, det_size=det_size)
             
             logger.info(f"InsightFace Initialization successful，model path: {model_root}")
             
@@ -94,6 +167,295 @@ class AdvancedFaceRecognitionService:
             logger.error(f"InsightFace Initialization failed: {str(e)}")
             self.app = None
     
+    def _build_session_options(self) -> onnxruntime.SessionOptions:
+        """ONNX Runtime session options from face_recognition.onnx"""
+        onnx_config = config.get('face_recognition.onnx', {}) or {}
+        options = onnxruntime.SessionOptions()
+        
+        # 0 keeps the ONNX Runtime default（one thread per physical core）
+        options.intra_op_num_threads = int(onnx_config.get('intra_op_num_threads', 0) or 0)
+        options.inter_op_num_threads = int(onnx_config.get('inter_op_num_threads', 0) or 0)
+        
+        optimization_levels = {
+            'disable': onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            'basic': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            'extended': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            'all': onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        }
+        level = str(onnx_config.get('graph_optimization_level', 'all')).lower()
+        if level not in optimization_levels:
+            logger.warning(f"Unknown graph_optimization_level '{level}'，using 'all'")
+            level = 'all'
+        options.graph_optimization_level = optimization_levels[level]
+        
+        execution_mode = str(onnx_config.get('execution_mode', 'sequential')).lower()
+        options.execution_mode = (onnxruntime.ExecutionMode.ORT_PARALLEL if execution_mode == 'parallel'
+                                  else onnxruntime.ExecutionMode.ORT_SEQUENTIAL)
+        
+        options.enable_cpu_mem_arena = bool(onnx_config.get('enable_cpu_mem_arena', True))
+        options.enable_mem_pattern = bool(onnx_config.get('enable_mem_pattern', True))
+        return options
+    
+    def _load_face_analysis(self, model_name: str, model_root: str, providers: List[str],
+                            modules: List[str]) -> insightface.app.FaceAnalysis:
+        """
+        FaceAnalysis whose model sessions are each created once with the configured session options
+        （model_zoo only forwards providers，so FaceAnalysis itself would drop them）
+        Models outside modules are routed from their ONNX graph and never get a session
+        """
+        try:
+            options = self._build_session_options()
+        except Exception as e:
+            logger.warning(f"ONNX Runtime session options not applied，using defaults: {str(e)}")
+            options = None
+        
+        onnxruntime.set_default_logger_severity(3)
+        app = insightface.app.FaceAnalysis.__new__(insightface.app.FaceAnalysis)
+        app.model_dir = ensure_available('models', model_name, root=model_root)
+        app.models = {}
+        for onnx_file in sorted(glob.glob(os.path.join(app.model_dir, '*.onnx'))):
+            model_class, taskname = self._route_model_file(onnx_file)
+            if model_class is None or taskname not in modules or taskname in app.models:
+                logger.debug(f"InsightFace model skipped: {os.path.basename(onnx_file)} ({taskname})")
+                continue
+            session = onnxruntime.InferenceSession(onnx_file, sess_options=options, providers=providers)
+            app.models[taskname] = model_class(model_file=onnx_file, session=session)
+        
+        if 'detection' not in app.models:
+            raise RuntimeError(f"No detection model found in {app.model_dir}")
+        app.det_model = app.models['detection']
+        return app
+    
+    @staticmethod
+    def _route_model_file(onnx_file: str) -> Tuple[Optional[type], Optional[str]]:
+        """
+        InsightFace model class and task of an ONNX file
+        （the rules of model_zoo.ModelRouter，read from the graph instead of an inference session）
+        """
+        graph = onnx.load(onnx_file, load_external_data=False).graph
+        initializers = {tensor.name for tensor in graph.initializer}
+        
+        def shape(value):
+            return [dim.dim_value if dim.HasField('dim_value') else dim.dim_param
+                    for dim in value.type.tensor_type.shape.dim]
+        
+        inputs = [shape(value) for value in graph.input if value.name not in initializers]
+        outputs = [shape(value) for value in graph.output]
+        input_shape = inputs[0]
+        
+        if len(outputs) >= 5:
+            return RetinaFace, 'detection'
+        if input_shape[2] == 192 and input_shape[3] == 192:
+            if outputs[0][1] == 3309:
+                return Landmark, 'landmark_3d_68'
+            return Landmark, f"landmark_2d_{outputs[0][1] // 2}"
+        if input_shape[2] == 96 and input_shape[3] == 96:
+            return Attribute, 'genderage' if outputs[0][1] == 3 else f"attribute_{outputs[0][1]}"
+        if len(inputs) == 2 and input_shape[2] == 128 and input_shape[3] == 128:
+            return None, 'inswapper'  # Face swapping is not used here
+        if (isinstance(input_shape[2], int) and input_shape[2] == input_shape[3]
+                and input_shape[2] >= 112 and input_shape[2] % 16 == 0):
+            return ArcFaceONNX, 'recognition'
+        return None, None
+    
+    def _report_session_options(self, providers: List[str]):
+        """Record and log the session settings of every loaded model，read back from the live sessions"""
+        report = {
+            'model_pack': self.active_model_name,
+            'providers': providers,
+            'models': {}
+        }
+        
+        for taskname, model in self.app.models.items():
+            report['models'][taskname] = {
+                'file': os.path.basename(model.model_file),
+                'providers': model.session.get_providers(),
+                **self._session_settings(model.session.get_session_options())
+            }
+        report.update(self._session_settings(self.app.det_model.session.get_session_options()))
+        
+        self.onnx_session_report = report
+        logger.info(
+            f"ONNX Runtime sessions: providers={providers}, "
+            f"intra_op_threads={report['intra_op_num_threads'] or 'default'}, "
+            f"inter_op_threads={report['inter_op_num_threads'] or 'default'}, "
+            f"graph_opt={report['graph_optimization_level']}, mode={report['execution_mode']}, "
+            f"cpu_mem_arena={report['enable_cpu_mem_arena']}, mem_pattern={report['enable_mem_pattern']}"
+        )
+        for taskname, info in report['models'].items():
+            logger.info(f"  {taskname}: {info['file']} -> {info['providers']}")
+    
+    @staticmethod
+    def _session_settings(options: onnxruntime.SessionOptions) -> Dict[str, Any]:
+        """Session settings reported at startup and /api/metrics"""
+        return {
+            'intra_op_num_threads': options.intra_op_num_threads,
+            'inter_op_num_threads': options.inter_op_num_threads,
+            'graph_optimization_level': str(options.graph_optimization_level).split('.')[-1],
+            'execution_mode': str(options.execution_mode).split('.')[-1],
+            'enable_cpu_mem_arena': options.enable_cpu_mem_arena,
+            'enable_mem_pattern': options.enable_mem_pattern
+        }
+    
+    def _init_gallery_index(self):
+        """Load the in-memory gallery index from face_encodings"""
+        try:
+            self.gallery_index = GalleryIndex()
+            if config.get('face_recognition.gallery_index.shared_snapshot', False):
+                # Multi-process mode：map the shared snapshot and follow the database gallery version
+                self.gallery_sync = GallerySnapshotSync(
+                    self.gallery_index,
+                    self.db_manager,
+                    config.get('face_recognition.gallery_index.snapshot_dir', 'data/gallery_index'),
+                    sync_interval=config.get('face_recognition.gallery_index.sync_interval', 2.0)
+                )
+                self.gallery_sync.ensure_current(force=True)
+                logger.info(f"📝 Using shared gallery index snapshot v{self.gallery_sync.version} for face search")
+            else:
+                # Private index per process：reload when another worker bumps the gallery version
+                self.gallery_sync = GalleryVersionSync(
+                    self.gallery_index,
+                    self.db_manager,
+                    sync_interval=config.get('face_recognition.gallery_index.sync_interval', 2.0)
+                )
+                self.gallery_sync.ensure_current(force=True)
+                logger.info(f"📝 Using in-memory gallery index v{self.gallery_sync.version} for face search")
+        except Exception as e:
+            logger.error(f"Gallery index initialization failed，fall back to pgvector search: {str(e)}")
+            self.gallery_index = None
+            self.gallery_sync = None
+    
+    def _gallery_ready(self) -> bool:
+        """Whether searches can be served from the gallery index（remaps a newer shared snapshot first）"""
+        if self.gallery_index is None:
+            return False
+        if self.gallery_sync is not None:
+            try:
+                self.gallery_sync.ensure_current()
+            except Exception as e:
+                logger.warning(f"Gallery snapshot sync failed: {e}")
+        return self.gallery_index.is_loaded
+    
+    def _publish_gallery_change(self):
+        """Bump the gallery version（other worker processes resync，/api/persons ETags change）"""
+        try:
+            if self.gallery_sync is not None:
+                self.gallery_sync.mark_changed()
+            else:
+                self.db_manager.bump_gallery_version()
+        except Exception as e:
+            logger.warning(f"Gallery version update failed: {e}")
+    
+    def _find_similar_faces(self, embedding: np.ndarray, region: str, emp_id: Optional[str] = None,
+                            client_id: Optional[str] = None, threshold: float = 0.3,
+                            limit: int = 5) -> List[Dict[str, Any]]:
+        """Top-k face search，served from the gallery index when loaded，otherwise by pgvector"""
+        if self._gallery_ready():
+            return self.gallery_index.search(
+                embedding, region=region, emp_id=emp_id, client_id=client_id,
+                threshold=threshold, limit=limit
+            )
+        return self.db_manager.find_similar_faces(
+            embedding=embedding, region=region, emp_id=emp_id, client_id=client_id,
+            threshold=threshold, limit=limit
+        )
+    
+    def _find_similar_faces_batch(self, embeddings: List[np.ndarray], region: Optional[str], emp_id: Optional[str] = None,
+                                  client_id: Optional[str] = None, threshold: float = 0.3,
+                                  limit: int = 5) -> List[List[Dict[str, Any]]]:
+        """Top-k search for every face of one frame in a single matrix product / database round trip"""
+        if not embeddings:
+            return []
+        if self._gallery_ready():
+            return self.gallery_index.search_batch(
+                np.stack(embeddings), region=region, emp_id=emp_id, client_id=client_id,
+                threshold=threshold, limit=limit
+            )
+        return self.db_manager.find_similar_faces_batch(
+            embeddings, region=region, emp_id=emp_id, client_id=client_id,
+            threshold=threshold, limit=limit
+        )
+    
+    def _index_face_encoding(self, person: Person, face_encoding: FaceEncoding, features: np.ndarray, quality: float):
+        """Add a freshly stored encoding to the gallery index"""
+        if self.gallery_index is None:
+            self._publish_gallery_change()
+            return
+        try:
+            self.gallery_index.add(
+                encoding_id=face_encoding.id,
+                person_id=person.id,
+                embedding=features,
+                emp_id=person.emp_id,
+                name=person.name,
+                region=person.region,
+                client_id=person.client_id,
+                quality=quality,
+                confidence=quality
+            )
+            self._publish_gallery_change()
+        except Exception as e:
+            logger.warning(f"Gallery index update failed，reloading person {person.id}: {e}")
+            self.sync_gallery_person(person.id)
+    
+    def sync_gallery_person(self, person_id: int):
+        """
+        Re-read one person's encodings into the gallery index
+        Call after any change made directly through the database manager（delete、update、add faces）
+        """
+        if self.gallery_index is not None:
+            try:
+                self.gallery_index.replace_person(person_id, self.db_manager.get_gallery_rows(person_id=person_id))
+            except Exception as e:
+                logger.error(f"Gallery index sync failed for person {person_id}: {e}")
+        self._publish_gallery_change()
+    
+    def remove_gallery_encoding(self, encoding_id: int):
+        """Drop a deleted encoding from the gallery index"""
+        if self.gallery_index is not None:
+            self.gallery_index.remove_encoding(encoding_id)
+        self._publish_gallery_change()
+    
+    def log_event(self, event_type: str, person_id: Optional[int] = None, emp_id: Optional[str] = None,
+                  name: Optional[str] = None, region: Optional[str] = None, metadata: Optional[dict] = None):
+        """Record an analytics event，queued for a bulk write when the event sink is enabled"""
+        if self.analytics_sink is not None:
+            self.analytics_sink.emit(event_type, person_id=person_id, emp_id=emp_id, name=name,
+                                     region=region, metadata=metadata)
+        else:
+            self.db_manager.log_event(event_type, person_id=person_id, emp_id=emp_id, name=name,
+                                      region=region, metadata=metadata)
+    
+    def get_sync_status(self) -> Dict[str, Any]:
+        """Gallery index status（for /api/sync/status）"""
+        if self.gallery_index is None:
+            return {'gallery_index': False, 'search_backend': 'pgvector'}
+        status = {
+            'gallery_index': True,
+            'search_backend': 'in-memory',
+            **self.gallery_index.get_statistics()
+        }
+        if self.gallery_sync is not None:
+            status['sync'] = self.gallery_sync.get_status()
+        return status
+    
+    def force_cache_refresh(self) -> Dict[str, Any]:
+        """Reload the gallery index from the database（for /api/sync/refresh）"""
+        if self.gallery_index is None:
+            return {'success': False, 'error': 'Gallery index is not enabled'}
+        try:
+            if self.gallery_sync is not None:
+                # New version：every worker process reloads（or remaps the rebuilt snapshot）
+                self.db_manager.bump_gallery_version()
+                self.gallery_sync.ensure_current(force=True)
+                total = self.gallery_index.get_statistics()['total_encodings']
+                return {'success': True, 'message': f'Gallery index v{self.gallery_sync.version} reloaded with {total} encodings'}
+            total = self.gallery_index.load(self.db_manager.get_gallery_rows())
+            return {'success': True, 'message': f'Gallery index reloaded with {total} encodings'}
+        except Exception as e:
+            logger.error(f"Gallery index reload failed: {e}")
+            return {'success': False, 'error': str(e)}
+    
     def _init_deepface(self):
         """initialization DeepFace Configuration"""
         # Configuration DeepFace model path
@@ -110,16 +472,21 @@ class AdvancedFaceRecognitionService:
         
         logger.info("DeepFace Configuration completed")
     
-    def detect_faces(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    def detect_faces(self, image: Union[np.ndarray, DecodedImage]) -> List[Dict[str, Any]]:
         """
         High-precision face detection
         
         Args:
-            image: input image (BGR Format)
+            image: input image (BGR Format) or DecodedImage upload
             
         Returns:
             List of detected face information，Contains location、Key points、Quality score and more
         """
+        if isinstance(image, DecodedImage):
+            if self.app:
+                return self.detect_faces_batch([image])[0]
+            image = image.full
+        
         faces = []
         
         # Get face detection threshold
@@ -127,25 +494,9 @@ class AdvancedFaceRecognitionService:
         
         try:
             if self.app:
-                # use InsightFace Detection
-                results = self.app.get(image)
-                
-                for face in results:
-                    # Apply detection threshold filtering
-                    if face.det_score < detection_threshold:
-                        logger.debug(f"Face detection confidence is too low: {face.det_score:.3f} < {detection_threshold}")
-                        continue
-                        
-                    face_info = {
-                        'bbox': face.bbox.astype(int).tolist(),  # [x1, y1, x2, y2]
-                        'landmarks': face.kps.astype(int).tolist(),  # 5key points
-                        'det_score': float(face.det_score),  # Detection confidence
-                        'embedding': face.embedding,  # 512dimensional eigenvector
-                        'age': getattr(face, 'age', None),
-                        'gender': getattr(face, 'gender', None),
-                        'quality': self._calculate_face_quality(face)
-                    }
-                    faces.append(face_info)
+                # use InsightFace Detection（embed profile，same models as the DecodedImage path）
+                results = self._analyze_images([image], detection_threshold)[0]
+                faces = [self._face_to_info(face) for face in results]
             
             else:
                 # Alternatives：use OpenCV Detection
@@ -158,6 +509,262 @@ class AdvancedFaceRecognitionService:
             logger.error(f"Face detection failed: {str(e)}")
             return []
     
+    def analyze_faces(self, image: Union[np.ndarray, DecodedImage], profile: str = 'detect') -> List[Dict[str, Any]]:
+        """
+        Face detection running only the models of a pipeline profile
+        
+        Args:
+            image: input image (BGR Format) or DecodedImage upload
+            profile: 'detect'（boxes and key points）, 'embed'（plus embedding）or 'full'（plus the loaded attribute models）
+            
+        Returns:
+            Same format as detect_faces（embedding / age / gender are None when not computed）
+        """
+        if not self.app:
+            return self._detect_faces_opencv(self._as_array(image))
+        
+        detection_threshold = getattr(config, 'DETECTION_THRESHOLD', 0.5)
+        try:
+            faces = self._analyze_images([image], detection_threshold, profile=profile)[0]
+            return [self._face_to_info(face) for face in faces]
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Face detection failed: {str(e)}")
+            return []
+    
+    def detect_faces_shared(self, image: Union[np.ndarray, DecodedImage]) -> List[Dict[str, Any]]:
+        """
+        Face detection for request handlers
+        Routed through the micro-batching scheduler when enabled，so concurrent requests share one batch
+        
+        Args:
+            image: input image (BGR Format) or DecodedImage upload
+            
+        Returns:
+            Same as detect_faces
+        """
+        if self.inference_scheduler is None:
+            return self.detect_faces(image)
+        try:
+            return self.inference_scheduler.run(image)
+        except Exception as e:
+            logger.error(f"Micro-batched detection failed，fall back to direct detection: {str(e)}")
+            return self.detect_faces(image)
+    
+    def detect_faces_batch(self, images: List[Union[np.ndarray, DecodedImage]]) -> List[List[Dict[str, Any]]]:
+        """
+        Batch face detection for multi-frame uploads
+        Detection runs per image，then every aligned face crop of every image goes through
+        the recognition model as stacked ONNX Runtime batches
+        
+        Args:
+            images: input images (BGR Format) or DecodedImage uploads（detected at reduced scale）
+            
+        Returns:
+            One face list per image，same format as detect_faces（original-resolution coordinates）
+        """
+        if not images:
+            return []
+        if not self.app:
+            return [self.detect_faces(self._as_array(image)) for image in images]
+        
+        # Get face detection threshold
+        detection_threshold = getattr(config, 'DETECTION_THRESHOLD', 0.5)
+        
+        try:
+            # Byte-identical uploads are served from the embedding cache
+            keys = [self._cache_key(image, detection_threshold) for image in images]
+            batch_faces = [self.embedding_cache.get(key) if key else None for key in keys]
+            misses = [i for i, faces in enumerate(batch_faces) if faces is None]
+            
+            if misses:
+                analyzed = self._analyze_images([images[i] for i in misses], detection_threshold)
+                for i, faces in zip(misses, analyzed):
+                    batch_faces[i] = [self._face_to_info(face) for face in faces]
+                    if keys[i]:
+                        self.embedding_cache.put(keys[i], batch_faces[i])
+            logger.info(f"detected {sum(len(faces) for faces in batch_faces)} faces in {len(images)} images")
+            return batch_faces
+        except Exception as e:
+            logger.error(f"Batch face detection failed，fall back to single image detection: {str(e)}")
+            return [self.detect_faces(self._as_array(image)) for image in images]
+    
+    def _cache_key(self, image: Union[np.ndarray, DecodedImage], detection_threshold: float) -> Optional[str]:
+        """Embedding cache key of an upload（None when caching does not apply）"""
+        if self.embedding_cache is None or not isinstance(image, DecodedImage) or image.data is None:
+            return None
+        return content_key(
+            image.data,
+            self.active_model_name,
+            tuple(config.get('face_recognition.det_size', [640, 640])),
+            image.reduction,
+            config.get('face_recognition.decode.min_recognition_face_px', 112),
+            detection_threshold
+        )
+    
+    @staticmethod
+    def _as_array(image: Union[np.ndarray, DecodedImage]) -> np.ndarray:
+        """Full-resolution array for code paths that need plain images"""
+        return image.full if isinstance(image, DecodedImage) else image
+    
+    @staticmethod
+    def _read_image(image: Union[str, bytes, np.ndarray, DecodedImage]) -> Tuple[Optional[DecodedImage], Optional[bytes]]:
+        """
+        Normalize an image argument to (decoded image, original encoded bytes)
+        Uploads arrive as bytes or DecodedImage and are never written to disk; file paths are still accepted
+        
+        Returns:
+            (None, None) if the image cannot be read
+        """
+        if image is None:
+            return None, None
+        if isinstance(image, DecodedImage):
+            return image, image.data
+        if isinstance(image, np.ndarray):
+            return DecodedImage.from_array(image), None
+        if isinstance(image, str):
+            try:
+                with open(image, 'rb') as f:
+                    image = f.read()
+            except OSError:
+                return None, None
+        data = bytes(image)
+        return decode_upload(data), data
+    
+    @staticmethod
+    def _encode_image(image: DecodedImage, data: Optional[bytes]) -> Optional[bytes]:
+        """Bytes stored as image_data：the upload itself，or a JPEG encoding for array inputs"""
+        if data is not None:
+            return data
+        success, buffer = cv2.imencode('.jpg', image.full)
+        return buffer.tobytes() if success else None
+    
+    def resolve_profile(self, profile: str) -> Dict[str, List[str]]:
+        """
+        Modules a pipeline profile really runs：its PIPELINE_PROFILES entry limited to the loaded models
+        
+        Returns:
+            {'modules': modules that run, 'missing': profile modules not loaded at startup}
+        """
+        resolved = self._resolved_profiles.get(profile)
+        if resolved is None:
+            if profile not in PIPELINE_PROFILES:
+                raise ValueError(f"Unknown pipeline profile: {profile}")
+            loaded = self.app.models if self.app else {}
+            resolved = {
+                'modules': [module for module in PIPELINE_PROFILES[profile] if module in loaded],
+                'missing': [module for module in PIPELINE_PROFILES[profile] if module not in loaded]
+            }
+            if resolved['missing']:
+                logger.warning(f"Pipeline profile '{profile}' runs without {resolved['missing']}："
+                               f"not in face_recognition.pipeline.modules")
+            self._resolved_profiles[profile] = resolved
+        return resolved
+    
+    def _analyze_images(self, images: List[Union[np.ndarray, DecodedImage]], min_det_score: float = 0.0,
+                        profile: str = 'embed') -> List[List[Face]]:
+        """
+        Equivalent of FaceAnalysis.get over several images
+        Faces below min_det_score are dropped before any attribute or recognition inference.
+        DecodedImage inputs are detected at their reduced level; recognition crops come from
+        the coarsest level where the face is at least min_recognition_face_px wide.
+        Only the loaded models of the pipeline profile run（see resolve_profile）.
+        """
+        modules = self.resolve_profile(profile)['modules']
+        all_faces = []
+        pending = []  # (level image, keypoints at that level, face) waiting for recognition
+        recognition_model = self.app.models.get('recognition') if 'recognition' in modules else None
+        attribute_models = [
+            model for taskname, model in self.app.models.items()
+            if taskname in modules and taskname not in ('detection', 'recognition')
+        ]
+        min_face_px = config.get('face_recognition.decode.min_recognition_face_px', 112)
+        
+        for item in images:
+            decoded = item if isinstance(item, DecodedImage) else DecodedImage.from_array(item)
+            image = decoded.detection
+            scale = decoded.scale_of(image)
+            
+            bboxes, kpss = self.app.det_model.detect(image, max_num=0, metric='default')
+            image_faces = []
+            for i in range(bboxes.shape[0]):
+                if bboxes[i, 4] < min_det_score:
+                    continue
+                face = Face(bbox=bboxes[i, 0:4], kps=kpss[i] if kpss is not None else None, det_score=bboxes[i, 4])
+                for model in attribute_models:
+                    model.get(image, face)
+                
+                if scale != 1.0:
+                    # Report everything in original-resolution pixels
+                    face.bbox = face.bbox * scale
+                    if face.kps is not None:
+                        face.kps = face.kps * scale
+                    for key in ('landmark_2d_106', 'landmark_3d_68'):
+                        if face.get(key) is not None:
+                            face[key] = face[key] * scale
+                
+                if recognition_model is not None and face.kps is not None:
+                    pending.append(self._recognition_crop_source(decoded, face, min_face_px))
+                image_faces.append(face)
+            all_faces.append(image_faces)
+        
+        if pending:
+            self._embed_faces(recognition_model, pending)
+        return all_faces
+    
+    @staticmethod
+    def _recognition_crop_source(decoded: DecodedImage, face: Face, min_face_px: int) -> Tuple[np.ndarray, np.ndarray, Face]:
+        """(level image, key points at that level, face) used to align the recognition crop"""
+        face_size = max(face.bbox[2] - face.bbox[0], face.bbox[3] - face.bbox[1])
+        level_image = decoded.level_for_face(face_size, min_face_px)
+        return level_image, face.kps / decoded.scale_of(level_image), face
+    
+    def _embed_selected_faces(self, decoded: DecodedImage, faces: List[Face]):
+        """Embed some faces of a frame analyzed with the detect profile"""
+        recognition_model = self.app.models.get('recognition')
+        if recognition_model is None:
+            return
+        min_face_px = config.get('face_recognition.decode.min_recognition_face_px', 112)
+        pending = [self._recognition_crop_source(decoded, face, min_face_px) for face in faces if face.kps is not None]
+        if pending:
+            self._embed_faces(recognition_model, pending)
+    
+    def _embed_faces(self, model, pending: List[Tuple[np.ndarray, np.ndarray, Face]]):
+        """Run the recognition model over aligned crops in batches of inference_batch_size"""
+        batch_size = max(1, int(config.get('face_recognition.inference_batch_size', 32)))
+        input_size = model.input_size[0]
+        
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            crops = [face_align.norm_crop(image, landmark=kps, image_size=input_size) for image, kps, _ in chunk]
+            
+            if self._recognition_batching and len(crops) > 1:
+                try:
+                    embeddings = model.get_feat(crops)
+                except Exception as e:
+                    # Models exported with a fixed batch dimension only accept one crop per run
+                    logger.warning(f"Batched recognition not supported by model，using batch size 1: {str(e)}")
+                    self._recognition_batching = False
+                    embeddings = np.concatenate([model.get_feat(crop) for crop in crops])
+            else:
+                embeddings = np.concatenate([model.get_feat(crop) for crop in crops])
+            
+            for (_, _, face), embedding in zip(chunk, embeddings):
+                face.embedding = embedding.flatten()
+    
+    def _face_to_info(self, face: Face) -> Dict[str, Any]:
+        """Convert an InsightFace face into the face information dictionary"""
+        return {
+            'bbox': face.bbox.astype(int).tolist(),  # [x1, y1, x2, y2]
+            'landmarks': face.kps.astype(int).tolist(),  # 5key points
+            'det_score': float(face.det_score),  # Detection confidence
+            'embedding': face.embedding,  # 512dimensional eigenvector
+            'age': getattr(face, 'age', None),
+            'gender': getattr(face, 'gender', None),
+            'quality': self._calculate_face_quality(face)
+        }
+    
     def _detect_faces_opencv(self, image: np.ndarray) -> List[Dict[str, Any]]:
         """use OpenCV Perform face detection（Alternatives）"""
         try:
@@ -209,12 +816,12 @@ class AdvancedFaceRecognitionService:
         
         return float(quality_score)
     
-    def extract_features(self, image: np.ndarray, face_info: Dict[str, Any]) -> Optional[np.ndarray]:
+    def extract_features(self, image: Union[np.ndarray, DecodedImage], face_info: Dict[str, Any]) -> Optional[np.ndarray]:
         """
         Extract facial feature vector
         
         Args:
-            image: original image
+            image: original image or DecodedImage
             face_info: Face information（Contains bounding box）
             
         Returns:
@@ -226,6 +833,7 @@ class AdvancedFaceRecognitionService:
                 return face_info['embedding']
             
             # Crop face area
+            image = self._as_array(image)
             bbox = face_info['bbox']
             face_crop = image[bbox[1]:bbox[3], bbox[0]:bbox[2]]
             
@@ -250,13 +858,13 @@ class AdvancedFaceRecognitionService:
             logger.error(f"Feature extraction failed: {str(e)}")
             return None
     
-    def enroll_person(self, name: str, image_path: str, region: str, emp_id: str, emp_rank: str, description: Optional[str] = None, original_filename: Optional[str] = None, client_id: Optional[str] = None) -> Dict[str, Any]:
+    def enroll_person(self, name: str, image: Union[str, bytes, np.ndarray, DecodedImage], region: str, emp_id: str, emp_rank: str, description: Optional[str] = None, original_filename: Optional[str] = None, client_id: Optional[str] = None) -> Dict[str, Any]:
         """
         High-precision personnel warehousing
         
         Args:
             name: Personnel name
-            image_path: image path（Temporary file path）
+            image: uploaded image bytes，DecodedImage，image array or image path
             region: Region (ka/ap/tn)
             emp_id: Employee ID
             emp_rank: Employee Rank
@@ -267,8 +875,9 @@ class AdvancedFaceRecognitionService:
             Storage result information
         """
         try:
-            # read image
-            image = cv2.imread(image_path)
+            # read image（in memory）
+            source_path = image if isinstance(image, str) else None
+            image, image_data = self._read_image(image)
             if image is None:
                 return {'success': False, 'error': 'Unable to read image file'}
             
@@ -304,6 +913,7 @@ class AdvancedFaceRecognitionService:
                 
                 if existing_person:
                     # A person with the same name already exists，Add new facial features to it
+                    person = existing_person
                     person_id = getattr(existing_person, "id", None)
                     person_emp_id = getattr(existing_person, "emp_id", emp_id)
                     if not isinstance(person_id, int):
@@ -317,16 +927,15 @@ class AdvancedFaceRecognitionService:
                     person_emp_id = person.emp_id
                     logger.info(f"Create new person: {name} in region {region} with emp_id {emp_id} and rank {emp_rank} (ID: {person_id})")
                 
-                # Read image binary data
-                with open(image_path, 'rb') as f:
-                    image_data = f.read()
+                # Original upload bytes are stored as they arrived
+                image_data = self._encode_image(image, image_data)
                 
                 # Save feature vectors and image data
                 bbox = face['bbox']
                 face_bbox_str = f"[{int(bbox[0])},{int(bbox[1])},{int(bbox[2])},{int(bbox[3])}]"
                 
-                # Use the original filename asimage_pathstorage，instead of a temporary path
-                stored_image_path = original_filename if original_filename else os.path.basename(image_path)
+                # Use the original filename asimage_pathstorage
+                stored_image_path = original_filename or (os.path.basename(source_path) if source_path else None)
                 
                 face_encoding = self.db_manager.add_face_encoding(
                     person_id=person_id,
@@ -338,7 +947,8 @@ class AdvancedFaceRecognitionService:
                     quality_score=face['quality']
                 )
                 
-                # No cache needed - PostgreSQL handles everything
+                # Keep the in-memory gallery index in sync
+                self._index_face_encoding(person, face_encoding, features, face['quality'])
                 
                 logger.info(f"Successfully stored facial features: {name} (personnelID: {person_id}, featureID: {face_encoding.id})")
                 
@@ -360,14 +970,14 @@ class AdvancedFaceRecognitionService:
             logger.error(f"Personnel entry failed: {str(e)}")
             return {'success': False, 'error': f'Storage failed: {str(e)}'}
     
-    def enroll_person_no_duplicate_check(self, name: str, image_path: str, region: str, emp_id: str, emp_rank: str, description: Optional[str] = None, original_filename: Optional[str] = None) -> Dict[str, Any]:
+    def enroll_person_no_duplicate_check(self, name: str, image: Union[str, bytes, np.ndarray, DecodedImage], region: str, emp_id: str, emp_rank: str, description: Optional[str] = None, original_filename: Optional[str] = None) -> Dict[str, Any]:
         """
         Personnel warehousing（Skip duplicate detection）
         For bulk registration that has been pre-checked
         
         Args:
             name: Personnel name
-            image_path: image path（Temporary file path）
+            image: uploaded image bytes，DecodedImage，image array or image path
             region: Region (ka/ap/tn)
             emp_id: Employee ID
             emp_rank: Employee Rank
@@ -378,8 +988,9 @@ class AdvancedFaceRecognitionService:
             Storage result information
         """
         try:
-            # read image
-            image = cv2.imread(image_path)
+            # read image（in memory）
+            source_path = image if isinstance(image, str) else None
+            image, image_data = self._read_image(image)
             if image is None:
                 return {'success': False, 'error': 'Unable to read image file'}
             
@@ -410,6 +1021,7 @@ class AdvancedFaceRecognitionService:
                 
                 if existing_person:
                     # A person with the same name already exists，Add new facial features to it
+                    person = existing_person
                     person_id = getattr(existing_person, "id", None)
                     person_emp_id = getattr(existing_person, "emp_id", emp_id)
                     if not isinstance(person_id, int):
@@ -423,16 +1035,15 @@ class AdvancedFaceRecognitionService:
                     person_emp_id = person.emp_id
                     logger.info(f"Create new person: {name} in region {region} with emp_id {emp_id} and rank {emp_rank} (ID: {person_id})")
                 
-                # Read image binary data
-                with open(image_path, 'rb') as f:
-                    image_data = f.read()
+                # Original upload bytes are stored as they arrived
+                image_data = self._encode_image(image, image_data)
                 
                 # Save feature vectors and image data
                 bbox = face['bbox']
                 face_bbox_str = f"[{int(bbox[0])},{int(bbox[1])},{int(bbox[2])},{int(bbox[3])}]"
                 
-                # Use the original filename asimage_pathstorage，instead of a temporary path
-                stored_image_path = original_filename if original_filename else os.path.basename(image_path)
+                # Use the original filename asimage_pathstorage
+                stored_image_path = original_filename or (os.path.basename(source_path) if source_path else None)
                 
                 face_encoding = self.db_manager.add_face_encoding(
                     person_id=person_id,
@@ -444,7 +1055,8 @@ class AdvancedFaceRecognitionService:
                     quality_score=face['quality']
                 )
                 
-                # No cache needed - PostgreSQL handles everything
+                # Keep the in-memory gallery index in sync
+                self._index_face_encoding(person, face_encoding, features, face['quality'])
                 
                 logger.info(f"Successfully stored facial features: {name} (personnelID: {person_id}, featureID: {face_encoding.id})")
                 
@@ -490,60 +1102,9 @@ class AdvancedFaceRecognitionService:
 
             # key changes：Check all faces in entire database，regardless of name
             # This ensures that the same face cannot be registered under different names
+            # combined_score is monotonic in cosine similarity，so the nearest stored face decides
             try:
-                with self.db_manager.get_session() as session:
-                    from ..models import FaceEncoding as FaceEncodingModel
-                    from ..models import Person
-                    
-                    # Get all face codes in the database
-                    all_faces = session.query(FaceEncodingModel, Person).join(
-                        Person, FaceEncodingModel.person_id == Person.id
-                    ).all()
-                    
-                    logger.info(f"Checking against {len(all_faces)} registered faces in database")
-                    
-                    max_similarity = 0.0
-                    most_similar_person = None
-                    
-                    for face_encoding, person in all_faces:
-                        db_enc = face_encoding.embedding
-                        if db_enc is None:
-                            continue
-                            
-                        # Process encoded data
-                        db_feature = self._parse_face_encoding(db_enc)
-                        if db_feature is None:
-                            logger.warning(f"Failed to parse encoding for person: {person.name}")
-                            continue
-                        
-                        # Calculate similarity
-                        similarity_result = self._calculate_enhanced_similarity(features, db_feature)
-                        
-                        # Track highest similarity for logging
-                        if similarity_result['combined_score'] > max_similarity:
-                            max_similarity = similarity_result['combined_score']
-                            most_similar_person = person.name
-                        
-                        # Log each comparison for debugging
-                        logger.debug(f"Comparing with {person.name}: {similarity_result['combined_score']:.2f}%")
-                        
-                        # Strict inspection：If the similarity exceeds the threshold，Reject regardless of whether the names are the same or not.
-                        if similarity_result['combined_score'] > similarity_threshold_percent:
-                            logger.warning(f"🚫 DUPLICATE DETECTED! New: '{name}' vs Existing: '{person.name}' | Similarity: {similarity_result['combined_score']:.2f}% (Threshold: {similarity_threshold_percent}%)")
-                            
-                            if person.name == name:
-                                # Duplicate faces of people with the same name
-                                return {
-                                    'success': False,
-                                    'error': f'Similar faces already exist for this person (Matching degree: {similarity_result["combined_score"]:.1f}%，threshold: {similarity_threshold_percent:.1f}%)'
-                                }
-                            else:
-                                # Duplicate faces of different people - This is the key fix
-                                return {
-                                    'success': False,
-                                    'error': f'This face has been registered as：{person.name}。The same face cannot be registered as different people。(Matching degree: {similarity_result["combined_score"]:.1f}%，threshold: {similarity_threshold_percent:.1f}%)'
-                                }
-                            
+                nearest = self._find_nearest_registered_faces([features])[0]
             except Exception as e:
                 logger.error(f"Repeat check failed: {e}")
                 # if check fails，for safety reasons，Deny registration
@@ -552,6 +1113,29 @@ class AdvancedFaceRecognitionService:
                     'error': 'Face repeatability check failed，For data security，Please try registration again'
                 }
             
+            max_similarity = 0.0
+            most_similar_person = None
+            if nearest is not None:
+                max_similarity = nearest['combined_score']
+                most_similar_person = nearest['name']
+                
+                # Strict inspection：If the similarity exceeds the threshold，Reject regardless of whether the names are the same or not.
+                if max_similarity > similarity_threshold_percent:
+                    logger.warning(f"🚫 DUPLICATE DETECTED! New: '{name}' vs Existing: '{most_similar_person}' | Similarity: {max_similarity:.2f}% (Threshold: {similarity_threshold_percent}%)")
+                    
+                    if most_similar_person == name:
+                        # Duplicate faces of people with the same name
+                        return {
+                            'success': False,
+                            'error': f'Similar faces already exist for this person (Matching degree: {max_similarity:.1f}%，threshold: {similarity_threshold_percent:.1f}%)'
+                        }
+                    else:
+                        # Duplicate faces of different people - This is the key fix
+                        return {
+                            'success': False,
+                            'error': f'This face has been registered as：{most_similar_person}。The same face cannot be registered as different people。(Matching degree: {max_similarity:.1f}%，threshold: {similarity_threshold_percent:.1f}%)'
+                        }
+            
             # 3. If exclude frame data is provided，Check if it is too similar to other frames in the same session（Interframe check for video registration only）
             if exclude_session_frames:
                 session_duplicate_threshold = 0.98  # Frames within the same session use a higher threshold
@@ -581,29 +1165,42 @@ class AdvancedFaceRecognitionService:
                 'error': 'Face repeatability check failed，Please try registration again'
             }
     
-    def _parse_face_encoding(self, db_enc) -> Optional[np.ndarray]:
+    @staticmethod
+    def _combined_scores(cosine_similarities: np.ndarray) -> np.ndarray:
         """
-        Parse face encoding data in different formats
+        Vectorized combined_score，same formula as _calculate_enhanced_similarity
+        For normalized vectors the Euclidean distance follows from the cosine similarity:
+        ||a - b|| = sqrt(2 - 2cos)
         
         Args:
-            db_enc: Encoded data in database
+            cosine_similarities: Cosine similarities (any shape)
             
         Returns:
-            parsednumpyarray orNone
+            combined_score values（percentage）
         """
-        try:
-            if isinstance(db_enc, bytes):
-                return pickle.loads(db_enc)
-            elif isinstance(db_enc, np.ndarray):
-                return db_enc
-            elif isinstance(db_enc, (list, tuple)):
-                return np.array(db_enc, dtype=np.float32)
-            else:
-                logger.warning(f"Unknown encoding format: {type(db_enc)}")
-                return None
-        except Exception as e:
-            logger.warning(f"Feature parsing failed: {e}")
-            return None
+        cosine = np.asarray(cosine_similarities, dtype=np.float64)
+        euclidean_dist = np.sqrt(np.clip(2.0 - 2.0 * cosine, 0.0, None))
+        return ((cosine * 0.8) + ((2.0 - euclidean_dist) / 2.0 * 0.2)) * 100
+    
+    def _find_nearest_registered_faces(self, embeddings: List[np.ndarray]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Top-1 stored face across every region for each query embedding
+        
+        Args:
+            embeddings: Query face embeddings
+            
+        Returns:
+            Best match per query（with combined_score added）or None when the gallery is empty
+        """
+        nearest = []
+        for similar_faces in self._find_similar_faces_batch(embeddings, region=None, threshold=-1.0, limit=1):
+            if not similar_faces:
+                nearest.append(None)
+                continue
+            best_match = dict(similar_faces[0])
+            best_match['combined_score'] = float(self._combined_scores(best_match['match_score'] / 100.0))
+            nearest.append(best_match)
+        return nearest
     
     def _calculate_enhanced_similarity(self, features1: np.ndarray, features2: np.ndarray) -> Dict[str, float]:
         """
@@ -650,18 +1247,18 @@ class AdvancedFaceRecognitionService:
                 'combined_score': 0.0
             }
     
-    def _extract_features_for_comparison(self, image_path: str) -> Optional[np.ndarray]:
+    def _extract_features_for_comparison(self, image: Union[str, bytes, np.ndarray, DecodedImage]) -> Optional[np.ndarray]:
         """
         Extract facial features for comparison purposes，No repeated testing
         
         Args:
-            image_path: image path
+            image: uploaded image bytes，DecodedImage，image array or image path
             
         Returns:
             eigenvector orNone
         """
         try:
-            image = cv2.imread(image_path)
+            image, _ = self._read_image(image)
             if image is None:
                 return None
             
@@ -712,20 +1309,20 @@ class AdvancedFaceRecognitionService:
             logger.warning(f"Frame similarity check failed: {e}")
             return {'success': True}  # Allow continuation if check fails
     
-    def pre_check_duplicate_for_batch(self, image_paths: List[str], name: str) -> Dict[str, Any]:
+    def pre_check_duplicate_for_batch(self, images: List[Union[str, bytes, np.ndarray, DecodedImage]], name: str) -> Dict[str, Any]:
         """
         Duplicate detection before batch registration - Check all frames for conflicts with existing database
         This ensures that all frames are checked before any database operations
         
         Args:
-            image_paths: and large image path list
+            images: frames as uploaded bytes，DecodedImage，arrays or image paths
             name: Personnel name
             
         Returns:
             Check results dictionary
         """
         try:
-            logger.info(f"Repeat checks before starting batch registration，Name: {name}, Frames: {len(image_paths)}")
+            logger.info(f"Repeat checks before starting batch registration，Name: {name}, Frames: {len(images)}")
             
             # Get duplicate detection threshold
             duplicate_threshold_value = config.get('face_recognition.duplicate_threshold', 0.75)
@@ -736,22 +1333,24 @@ class AdvancedFaceRecognitionService:
             
             similarity_threshold_percent = duplicate_threshold * 100
             
-            # First extract the features of all frames
+            # First extract the features of all frames（detection and recognition run as one batch）
+            frames = []
+            for i, item in enumerate(images):
+                image, _ = self._read_image(item)
+                if image is not None:
+                    frames.append((i, image))
+            
             frame_features = []
-            for i, image_path in enumerate(image_paths):
+            batch_faces = self.detect_faces_batch([image for _, image in frames])
+            for (i, image), faces in zip(frames, batch_faces):
                 try:
-                    image = cv2.imread(image_path)
-                    if image is None:
-                        continue
-                    
-                    faces = self.detect_faces(image)
                     if not faces:
                         continue
                     
                     face = faces[0]  # Only take the first face
                     features = self.extract_features(image, face)
                     if features is not None:
-                        frame_features.append((i, features, image_path))
+                        frame_features.append((i, features))
                         
                 except Exception as e:
                     logger.warning(f"Extract frames {i+1} Feature failed: {e}")
@@ -766,53 +1365,40 @@ class AdvancedFaceRecognitionService:
             logger.info(f"Extracted successfully {len(frame_features)} Characteristics of frames")
             
             # Check each frame to see if it conflicts with an existing face in the database
+            # Frames are scored against the whole gallery in chunks（one similarity matrix per chunk），
+            # and the check stops at the first chunk containing an offending frame
+            frame_chunk_size = 8
             try:
-                with self.db_manager.get_session() as session:
-                    from ..models import FaceEncoding as FaceEncodingModel
-                    from ..models import Person
-                    
-                    # Get all face codes in the database
-                    all_faces = session.query(FaceEncodingModel, Person).join(
-                        Person, FaceEncodingModel.person_id == Person.id
-                    ).all()
+                for start in range(0, len(frame_features), frame_chunk_size):
+                    chunk = frame_features[start:start + frame_chunk_size]
+                    nearest_faces = self._find_nearest_registered_faces([vec for _, vec in chunk])
                     
-                    logger.info(f"Compare in database {len(all_faces)} registered faces")
-                    
-                    # Check every frame
-                    for frame_idx, frame_features_vec, frame_path in frame_features:
-                        for face_encoding, person in all_faces:
-                            db_enc = face_encoding.embedding
-                            if db_enc is None:
-                                continue
-                                
-                            # Process encoded data
-                            db_feature = self._parse_face_encoding(db_enc)
-                            if db_feature is None:
-                                continue
-                            
-                            # Calculate similarity
-                            similarity_result = self._calculate_enhanced_similarity(frame_features_vec, db_feature)
+                    for (frame_idx, _), nearest in zip(chunk, nearest_faces):
+                        if nearest is None:
+                            continue
+                        combined_score = nearest['combined_score']
+                        
+                        # If the similarity exceeds the threshold，Immediately reject the entire batch registration
+                        if combined_score > similarity_threshold_percent:
+                            existing_name = nearest['name']
+                            logger.warning(f"Duplicate faces detected in batch registration! frame{frame_idx+1}: '{name}' vs Already exists: '{existing_name}', Similarity: {combined_score:.2f}%")
                             
-                            # If the similarity exceeds the threshold，Immediately reject the entire batch registration
-                            if similarity_result['combined_score'] > similarity_threshold_percent:
-                                logger.warning(f"Duplicate faces detected in batch registration! frame{frame_idx+1}: '{name}' vs Already exists: '{person.name}', Similarity: {similarity_result['combined_score']:.2f}%")
-                                
-                                if person.name == name:
-                                    # Duplicate faces of people with the same name
-                                    return {
-                                        'success': False,
-                                        'error': f'Similar faces already exist for this person (Matching degree: {similarity_result["combined_score"]:.1f}%，threshold: {similarity_threshold_percent:.1f}%)',
-                                        'frame_index': frame_idx + 1,
-                                        'existing_person': person.name
-                                    }
-                                else:
-                                    # Duplicate faces of different people
-                                    return {
-                                        'success': False,
-                                        'error': f'This face has been registered as：{person.name}。The same face cannot be registered as different people。(Matching degree: {similarity_result["combined_score"]:.1f}%，threshold: {similarity_threshold_percent:.1f}%)',
-                                        'frame_index': frame_idx + 1,
-                                        'existing_person': person.name
-                                    }
+                            if existing_name == name:
+                                # Duplicate faces of people with the same name
+                                return {
+                                    'success': False,
+                                    'error': f'Similar faces already exist for this person (Matching degree: {combined_score:.1f}%，threshold: {similarity_threshold_percent:.1f}%)',
+                                    'frame_index': frame_idx + 1,
+                                    'existing_person': existing_name
+                                }
+                            else:
+                                # Duplicate faces of different people
+                                return {
+                                    'success': False,
+                                    'error': f'This face has been registered as：{existing_name}。The same face cannot be registered as different people。(Matching degree: {combined_score:.1f}%，threshold: {similarity_threshold_percent:.1f}%)',
+                                    'frame_index': frame_idx + 1,
+                                    'existing_person': existing_name
+                                }
                     
             except Exception as e:
                 logger.error(f"Check before batch registration failed: {e}")
@@ -831,30 +1417,24 @@ class AdvancedFaceRecognitionService:
                 'error': 'Face repeatability check failed，Please try registration again'
             }
     
-    def extract_face_embeddings(self, image: Union[np.ndarray, str]) -> Dict[str, Any]:
+    def extract_face_embeddings(self, image: Union[str, bytes, np.ndarray, DecodedImage]) -> Dict[str, Any]:
         """
         A method specifically used to extract facial feature vectors，No identification
         
         Args:
-            image: image array or image path
+            image: uploaded image bytes，DecodedImage，image array or image path
             
         Returns:
             Results containing face feature vectors
         """
         try:
-            # Process the input image
-            if isinstance(image, str):
-                img = cv2.imread(image)
-                if img is None:
-                    return {'success': False, 'error': 'Unable to read image file'}
-            else:
-                img = image.copy()
-            
+            # Process the input image（in memory）
+            img, _ = self._read_image(image)
             if img is None:
-                return {'success': False, 'error': 'Invalid image data'}
+                return {'success': False, 'error': 'Unable to read image file'}
             
-            # Get image size
-            height, width = img.shape[:2]
+            # Get image size（original resolution）
+            width, height = img.width, img.height
             
             face_embeddings = []
             
@@ -863,7 +1443,7 @@ class AdvancedFaceRecognitionService:
                 if self.app is not None:
                     logger.info("Get startedInsightFacePerform face detection and feature extraction")
                     # Get all faces and features directly
-                    faces_with_features = self.app.get(img)
+                    faces_with_features = self._analyze_images([img])[0]
                     logger.info(f"InsightFacedetected {len(faces_with_features)} personal face")
                     
                     for i, face_result in enumerate(faces_with_features):
@@ -942,7 +1522,7 @@ class AdvancedFaceRecognitionService:
                 return {'success': False, 'matches': [], 'error': 'Unable to read image'}
             
             # Detect faces
-            faces = self.detect_faces(img)
+            faces = self.detect_faces_shared(img)
             
             if not faces:
                 return {'success': True, 'matches': [], 'message': 'No face detected'}
@@ -990,19 +1570,13 @@ class AdvancedFaceRecognitionService:
         Returns:
             List of matching results
         """
-        # Read the current recognition threshold from the configuration file
-        import json
-        try:
-            with open('config.json', 'r') as f:
-                config_data = json.load(f)
-                threshold = config_data.get('face_recognition', {}).get('recognition_threshold', 0.3)
-        except:
-            threshold = 0.3  # default value
+        # Current recognition threshold from the configuration snapshot（no file I/O）
+        threshold = config.snapshot().get('face_recognition.recognition_threshold', 0.3)
         
         try:
             # Use database search with region filter
-            results = self.db_manager.find_similar_faces(
-                embedding=features,
+            results = self._find_similar_faces(
+                features,
                 region=region,
                 threshold=threshold,
                 limit=10
@@ -1133,13 +1707,13 @@ class AdvancedFaceRecognitionService:
             logger.error(f"Failed to obtain statistics: {str(e)}")
             return {}
 
-    def recognize_face_with_threshold(self, image: np.ndarray, region: str, threshold: float = 0.25, emp_id: Optional[str] = None, client_id: Optional[str] = None) -> Dict[str, Any]:
+    def recognize_face_with_threshold(self, image: Union[np.ndarray, DecodedImage], region: str, threshold: float = 0.25, emp_id: Optional[str] = None, client_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Face recognition using custom thresholds and region filtering
         **Now uses PostgreSQL + pgvector for fast similarity search**
         
         Args:
-            image: input image
+            image: input image or DecodedImage upload
             region: Region to search in (A, B, C, etc.)
             threshold: recognition threshold
             emp_id: Optional employee ID for targeted search (only search this person's faces)
@@ -1152,7 +1726,7 @@ class AdvancedFaceRecognitionService:
             start_time = datetime.now()
             
             # Detect faces
-            faces = self.detect_faces(image)
+            faces = self.detect_faces_shared(image)
             logger.info(f"detected {len(faces)} personal face")
             
             if not faces:
@@ -1164,61 +1738,43 @@ class AdvancedFaceRecognitionService:
                 }
 
             matches = []
+            search_scope = f"emp_id {emp_id}" if emp_id else f"region {region}"
             
-            # Recognize each detected face using vector search
-            for face in faces:
+            # Stack every face of the frame and search them in one go
+            searchable = [face for face in faces if face.get('embedding') is not None]
+            all_similar = self._find_similar_faces_batch(
+                [face['embedding'] for face in searchable],
+                region=region,
+                emp_id=emp_id,
+                client_id=client_id,
+                threshold=threshold,
+                limit=5  # Get top 5 matches
+            )
+            
+            for face, similar_faces in zip(searchable, all_similar):
                 bbox = face['bbox']
-                face_embedding = face.get('embedding')
-                
-                if face_embedding is None:
-                    continue
-                
-                # Use pgvector to find matches in the specified region (and optionally specific emp_id)
-                similar_faces = self.db_manager.find_similar_faces(
-                    embedding=face_embedding,
-                    region=region,
-                    emp_id=emp_id,
-                    client_id=client_id,
-                    threshold=threshold,
-                    limit=5  # Get top 5 matches
-                )
                 
                 if similar_faces:
                     # Take the best match
                     best_match = similar_faces[0]
-                    search_scope = f"emp_id {emp_id}" if emp_id else f"region {region}"
                     logger.info(f"Recognition successful: {best_match['name']}, Similarity: {best_match['match_score']:.1f}% in {search_scope}")
                     
-                    # Get the first (oldest) face encoding for this person for consistency
-                    first_encoding_id = None
-                    try:
-                        with self.db_manager.get_session() as session:
-                            from ..models.database import Person, FaceEncoding
-                            person = session.query(Person).filter(Person.emp_id == best_match['emp_id']).first()
-                            if person:
-                                first_encoding = session.query(FaceEncoding).filter(
-                                    FaceEncoding.person_id == person.id
-                                ).order_by(FaceEncoding.id.asc()).first()
-                                if first_encoding:
-                                    first_encoding_id = first_encoding.id
-                    except Exception as e:
-                        logger.warning(f"Could not get first encoding: {e}")
-                        first_encoding_id = best_match['face_encoding_id']  # Fallback to matched encoding
-                    
                     matches.append({
+                        'person_id': best_match['person_id'],
                         'emp_id': best_match['emp_id'],
                         'name': best_match['name'],
                         'match_score': best_match['match_score'],
                         'distance': best_match['distance'],
                         'bbox': bbox,
                         'quality': face.get('det_score', 0.9),
-                        'face_encoding_id': first_encoding_id  # Use first encoding for consistency
+                        # Stable profile (oldest) encoding, carried by the search results themselves
+                        'face_encoding_id': best_match.get('profile_encoding_id') or best_match['face_encoding_id']
                     })
                 else:
                     # No match found
-                    search_scope = f"emp_id {emp_id}" if emp_id else f"region {region}"
                     logger.info(f"Recognition failed: No matching faces found in {search_scope}")
                     matches.append({
+                        'person_id': None,
                         'emp_id': 'UNKNOWN',
                         'name': 'Unknown',
                         'match_score': 0.0,
@@ -1251,29 +1807,140 @@ class AdvancedFaceRecognitionService:
                 'error': str(e)
             }
     
-    def visualize_face_detection(self, image_path: str) -> Dict[str, Any]:
+    def create_face_tracker(self) -> Optional[FaceTracker]:
+        """Tracker for one live stream（None when tracking is disabled or InsightFace is unavailable）"""
+        if not self.app or not config.get('face_recognition.tracking.enabled', False):
+            return None
+        return FaceTracker(
+            iou_threshold=config.get('face_recognition.tracking.iou_threshold', 0.3),
+            max_landmark_shift=config.get('face_recognition.tracking.max_landmark_shift', 0.35),
+            reembed_interval=config.get('face_recognition.tracking.reembed_interval', 10),
+            min_track_confidence=config.get('face_recognition.tracking.min_track_confidence', 0.5),
+            min_det_score=config.get('face_recognition.tracking.min_det_score', 0.6),
+            max_missed=config.get('face_recognition.tracking.max_missed', 5)
+        )
+    
+    def recognize_tracked_frame(self, image: DecodedImage, tracker: FaceTracker, region: str, threshold: float = 0.25,
+                                emp_id: Optional[str] = None, client_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        recognize_face_with_threshold for consecutive frames of one stream
+        Faces are detected every frame，but only faces the tracker cannot vouch for（new tracks,
+        every reembed_interval frames, low track confidence）are embedded and searched;
+        the others reuse the identity of their track
+        
+        Args:
+            image: DecodedImage frame
+            tracker: The stream's FaceTracker
+            region / threshold / emp_id / client_id: Same as recognize_face_with_threshold
+            
+        Returns:
+            Same as recognize_face_with_threshold，matches also carry track_id and reused
+        """
+        try:
+            start_time = datetime.now()
+            tracker.ensure_context((region, emp_id, client_id, threshold))
+            
+            detection_threshold = getattr(config, 'DETECTION_THRESHOLD', 0.5)
+            faces = self._analyze_images([image], detection_threshold, profile='detect')[0]
+            tracks = tracker.update([(face.bbox, face.kps, float(face.det_score)) for face in faces])
+            
+            # Embed and search only the faces whose identity is not reused
+            to_embed = [(face, track) for face, track in zip(faces, tracks) if track.needs_embedding]
+            self._embed_selected_faces(image, [face for face, _ in to_embed])
+            searchable = [(face, track) for face, track in to_embed if face.get('embedding') is not None]
+            all_similar = self._find_similar_faces_batch(
+                [face.embedding for face, _ in searchable],
+                region=region,
+                emp_id=emp_id,
+                client_id=client_id,
+                threshold=threshold,
+                limit=1
+            )
+            for (face, track), similar_faces in zip(searchable, all_similar):
+                if similar_faces:
+                    best_match = similar_faces[0]
+                    identity = {
+                        'person_id': best_match['person_id'],
+                        'emp_id': best_match['emp_id'],
+                        'name': best_match['name'],
+                        'match_score': best_match['match_score'],
+                        'distance': best_match['distance'],
+                        'face_encoding_id': best_match.get('profile_encoding_id') or best_match['face_encoding_id']
+                    }
+                else:
+                    identity = {
+                        'person_id': None,
+                        'emp_id': 'UNKNOWN',
+                        'name': 'Unknown',
+                        'match_score': 0.0,
+                        'distance': 2.0,
+                        'face_encoding_id': None
+                    }
+                tracker.set_identity(track, identity)
+            
+            searched = {id(track) for _, track in searchable}
+            matches = []
+            for face, track in zip(faces, tracks):
+                identity = track.identity or {
+                    'person_id': None, 'emp_id': 'UNKNOWN', 'name': 'Unknown',
+                    'match_score': 0.0, 'distance': 2.0, 'face_encoding_id': None
+                }
+                matches.append(dict(
+                    identity,
+                    bbox=face.bbox.astype(int).tolist(),
+                    quality=float(face.det_score),
+                    track_id=track.track_id,
+                    reused=id(track) not in searched
+                ))
+            
+            processing_time = (datetime.now() - start_time).total_seconds()
+            recognized_count = len([m for m in matches if m['emp_id'] != 'UNKNOWN'])
+            
+            return {
+                'success': True,
+                'matches': matches,
+                'total_faces': len(faces),
+                'embedded_faces': len(searchable),
+                'processing_time': processing_time,
+                'threshold_used': threshold,
+                'region': region,
+                'message': f'Recognition completed in region {region}, detected {len(faces)} faces, recognized {recognized_count} known persons'
+            }
+            
+        except Exception as e:
+            logger.error(f"Tracked face recognition failed: {str(e)}")
+            return {
+                'success': False,
+                'matches': [],
+                'total_faces': 0,
+                'error': str(e)
+            }
+    
+    def visualize_face_detection(self, image: Union[str, bytes, np.ndarray, DecodedImage]) -> Dict[str, Any]:
         """
         Generate face detection visualization images（Use augmented visualizer）
         
         Args:
-            image_path: Image file path
+            image: uploaded image bytes，DecodedImage，image array or image file path
             
         Returns:
             Dict: Dictionary containing visualization results
         """
         try:
-            # read image
-            image = cv2.imread(image_path)
-            if image is None:
+            # read image（in memory）
+            decoded, _ = self._read_image(image)
+            if decoded is None:
                 return {
                     'success': False,
                     'error': 'Unable to read image file'
                 }
+            image = decoded.full
             
             # Detect faces
             faces_data = []
             if self.app:
-                faces = self.app.get(image)
+                # Boxes and scores only: no landmark, attribute or recognition models
+                faces = self._analyze_images([decoded], profile='detect')[0]
                 for i, face in enumerate(faces):
                     bbox = face.bbox.astype(int)
                     face_info = {
@@ -0,0 +1,352 @@
+"""
+Buffered writer for analytics events
+Request handlers only enqueue events; a background thread writes them to analytics_log in
+bulk, so a check-in no longer waits for its own insert and commit.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import pytz
+
+from ..models.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+_IST = pytz.timezone('Asia/Kolkata')
+
+
+class AnalyticsEventSink:
+    """
+    Bounded in-memory queue of analytics events with bulk flushing
+
+    characteristic:
+    - A flush happens when batch_size events are queued or flush_interval seconds after
+      the first queued event; each flush is one multi-row INSERT (plus the rollup upserts)
+    - When the queue is full new events are dropped and counted, callers never block
+    - Events that cannot be written (database down, shutdown timeout) are written to a new
+      JSON-lines spool file per batch and replayed by the next flush that succeeds, in any
+      process; a spool file only appears under its final name once complete, and files left
+      claimed or half-written by a process that died are picked up again
+    - The worker thread starts lazily on first emit (and again after a fork)
+    """
+
+    def __init__(self, db_manager: DatabaseManager, max_queue: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 1.0, spool_dir: str = 'data/analytics_spool'):
+        self.db_manager = db_manager
+        self.max_queue = max(1, int(max_queue))
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.spool_dir = spool_dir
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=self.max_queue)
+        self._worker = None
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._flushes = 0
+        self._failed_flushes = 0
+        self._spooled = 0
+        self._replayed = 0
+        self._last_flush_ms = 0.0
+
+    # ==================== Submission ====================
+
+    def emit(self, event_type: str, person_id: Optional[int] = None, emp_id: Optional[str] = None,
+             name: Optional[str] = None, region: Optional[str] = None, metadata: Optional[dict] = None) -> bool:
+        """
+        Queue an analytics event (same arguments as DatabaseManager.log_event)
+
+        Returns:
+            False if the event was dropped because the queue is full
+        """
+        now_ist = datetime.now(_IST)
+        event = {
+            'event_type': event_type,
+            'person_id': person_id,
+            'emp_id': emp_id,
+            'name': name,
+            'region': region,
+            'timestamp': now_ist,
+            'date': now_ist.date(),
+            'event_metadata': metadata
+        }
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._metrics_lock:
+                self._dropped += 1
+            logger.warning(f"Analytics event queue full（{self.max_queue}），dropped {event_type} event for {name}")
+            return False
+        with self._metrics_lock:
+            self._enqueued += 1
+        return True
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+            if self._worker_pid is not None and self._worker_pid != pid:
+                # Forked child: the parent's thread and queued events do not exist here
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                with self._metrics_lock:
+                    self._reset_metrics()
+            if self._worker_pid is None:
+                atexit.register(self.close)
+            self._worker_pid = pid
+            self._worker = threading.Thread(target=self._worker_loop, name='analytics-sink', daemon=True)
+            self._worker.start()
+            logger.info(f"Analytics event sink started (batch: {self.batch_size}, interval: {self.flush_interval}s)")
+
+    # ==================== Worker ====================
+
+    def _collect_batch(self) -> List[Optional[Dict[str, Any]]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and batch[-1] is not None:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker_loop(self):
+        self._replay_spool()  # Events left behind by earlier processes
+        while True:
+            batch = self._collect_batch()
+            stop = batch[-1] is None
+            events = [event for event in batch if event is not None]
+            if events:
+                self._flush(events)
+            if stop:
+                return
+
+    def _flush(self, events: List[Dict[str, Any]]):
+        started = time.perf_counter()
+        try:
+            self.db_manager.log_events(events)
+        except Exception as e:
+            logger.error(f"Analytics flush of {len(events)} events failed，spooling to disk: {e}")
+            with self._metrics_lock:
+                self._failed_flushes += 1
+            self._spool(events)
+            return
+
+        with self._metrics_lock:
+            self._written += len(events)
+            self._flushes += 1
+            self._last_flush_ms = (time.perf_counter() - started) * 1000
+        self._replay_spool()
+
+    # ==================== Spool ====================
+
+    def _spool(self, events: List[Dict[str, Any]]):
+        """
+        Write events to a new spool file
+        The file is written under a temporary name and renamed into place when complete, so a
+        replayer never claims a file that is still being written
+        """
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            path = os.path.join(self.spool_dir, f"events-{os.getpid()}-{time.time_ns()}.jsonl")
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                for event in events:
+                    f.write(json.dumps(event, default=_json_default, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(f"{path}.tmp", path)
+            with self._metrics_lock:
+                self._spooled += len(events)
+        except Exception as e:
+            with self._metrics_lock:
+                self._dropped += len(events)
+            logger.error(f"Failed to spool {len(events)} analytics events，events lost: {e}")
+
+    def _replay_spool(self):
+        """Write spooled events of any process back to the database"""
+        self._reclaim_stale_claims()
+        for path in glob.glob(os.path.join(self.spool_dir, 'events-*.jsonl')):
+            # Claim the file first so concurrent workers never replay it twice
+            claimed = f"{path}.replay-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            events = self._read_claimed(claimed)
+            if events is None:
+                continue
+
+            written = 0
+            try:
+                while written < len(events):
+                    self.db_manager.log_events(events[written:written + self.batch_size])
+                    written = min(len(events), written + self.batch_size)
+            except Exception as e:
+                logger.warning(f"Analytics spool replay failed，will retry: {e}")
+                # Keep only the events that were not written yet
+                self._spool(events[written:])
+                with self._metrics_lock:
+                    self._spooled -= len(events) - written
+            os.remove(claimed)
+            with self._metrics_lock:
+                self._replayed += written
+            if written:
+                logger.info(f"Replayed {written} spooled analytics events")
+            if written < len(events):
+                return
+
+    def _read_claimed(self, claimed: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Events of a claimed spool file; corrupt lines are dropped and counted
+        A file that cannot be read at all is renamed to *.bad（None is returned）
+        """
+        events, corrupt = [], 0
+        try:
+            with open(claimed, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        events.append(_load_event(line))
+                    except (ValueError, KeyError, TypeError):
+                        corrupt += 1
+        except OSError as e:
+            lost = _count_lines(claimed)
+            bad_path = f"{claimed}.bad"
+            try:
+                os.rename(claimed, bad_path)
+            except OSError:
+                bad_path = claimed
+            with self._metrics_lock:
+                self._dropped += lost
+            logger.error(f"Unreadable analytics spool file（{lost} events lost），kept as {bad_path}: {e}")
+            return None
+        if corrupt:
+            with self._metrics_lock:
+                self._dropped += corrupt
+            logger.error(f"Dropped {corrupt} corrupt events from analytics spool file {claimed}")
+        return events
+
+    def _reclaim_stale_claims(self):
+        """Put back files claimed by processes that died while replaying them, or left half-written"""
+        for partial in glob.glob(os.path.join(self.spool_dir, 'events-*.jsonl.tmp')):
+            pid = os.path.basename(partial).split('-')[1]
+            # A live process may still be writing it（including another thread of this one）
+            if not pid.isdigit() or _process_alive(int(pid)):
+                continue
+            try:
+                os.rename(partial, partial[:-len('.tmp')])  # A torn last line is dropped as corrupt
+                logger.info(f"Recovered analytics spool file left unfinished by process {pid}")
+            except OSError:
+                continue
+        for claimed in glob.glob(os.path.join(self.spool_dir, 'events-*.jsonl.replay-*')):
+            base, _, pid = claimed.rpartition('.replay-')
+            if not pid.isdigit():
+                continue
+            # This thread is the only replayer of its process, so its own old claims are stale too
+            if int(pid) != os.getpid() and _process_alive(int(pid)):
+                continue
+            # Unique name: the original spool file may already exist again
+            reclaimed = f"{base[:-len('.jsonl')]}-reclaimed-{pid}-{time.time_ns()}.jsonl"
+            try:
+                os.rename(claimed, reclaimed)
+                logger.info(f"Reclaimed analytics spool file abandoned by process {pid}")
+            except OSError:
+                continue
+
+    # ==================== Lifecycle ====================
+
+    def close(self, timeout: float = 10.0):
+        """Flush queued events and stop the worker; events left over are spooled"""
+        worker = self._worker
+        if worker is None or self._worker_pid != os.getpid() or not worker.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+            worker.join(timeout)
+        except queue.Full:
+            pass
+        if worker.is_alive():
+            # Database too slow or down: keep whatever is still queued on disk
+            leftover = []
+            while True:
+                try:
+                    event = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is not None:
+                    leftover.append(event)
+            if leftover:
+                self._spool(leftover)
+            logger.warning(f"Analytics sink did not finish flushing in {timeout}s，spooled {len(leftover)} events")
+
+    # ==================== Metrics ====================
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get sink metrics"""
+        with self._metrics_lock:
+            return {
+                'running': self._worker is not None and self._worker.is_alive(),
+                'queue_depth': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval,
+                'enqueued': self._enqueued,
+                'written': self._written,
+                'dropped': self._dropped,
+                'flushes': self._flushes,
+                'failed_flushes': self._failed_flushes,
+                'spooled': self._spooled,
+                'replayed': self._replayed,
+                'last_flush_ms': round(self._last_flush_ms, 3)
+            }
+
+
+def _count_lines(path: str) -> int:
+    """Best-effort number of events in a spool file"""
+    try:
+        with open(path, 'rb') as f:
+            return sum(1 for line in f if line.strip())
+    except OSError:
+        return 0
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _load_event(line: str) -> Dict[str, Any]:
+    event = json.loads(line)
+    event['timestamp'] = datetime.fromisoformat(event['timestamp'])
+    event['date'] = date.fromisoformat(event['date'])
+    return event
@@ -0,0 +1,127 @@
+"""
+Content-addressed cache for face analysis results
+Kiosk retries and re-sent frames carry byte-identical uploads, so detection results and
+embeddings are cached under a hash of the uploaded bytes and the analysis settings.
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rough per-face overhead of the info dictionary on top of its arrays
+_FACE_OVERHEAD_BYTES = 512
+
+
+def content_key(data: bytes, *settings: Any) -> str:
+    """
+    Cache key for uploaded bytes
+
+    Args:
+        data: Encoded image bytes
+        settings: Analysis settings that change the result (model name, det_size, thresholds...)
+    """
+    digest = hashlib.blake2b(data, digest_size=16)
+    digest.update(repr(settings).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _entry_size(faces: Sequence[Dict[str, Any]]) -> int:
+    """Approximate memory footprint of one cached face list"""
+    size = 0
+    for face in faces:
+        size += _FACE_OVERHEAD_BYTES
+        for value in face.values():
+            if isinstance(value, np.ndarray):
+                size += value.nbytes
+            elif isinstance(value, list):
+                size += 8 * len(value)
+    return size
+
+
+class EmbeddingCache:
+    """
+    LRU cache of per-image face lists (detections with embeddings)
+
+    characteristic:
+    - Bounded by entry count and approximate byte size, least recently used first out
+    - Entries expire ttl seconds after they were stored
+    - Returned face dictionaries are copies, so callers may annotate them freely
+    - Hit/miss/eviction counters for /api/cache/info
+    """
+
+    def __init__(self, max_entries: int = 5000, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300.0):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl = float(ttl)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (faces, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Cached face list for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl > 0 and time.monotonic() - entry[2] > self.ttl:
+                self._drop(key)
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            faces = entry[0]
+        return [dict(face) for face in faces]
+
+    def put(self, key: str, faces: Sequence[Dict[str, Any]]):
+        """Store the face list of an image"""
+        faces = [dict(face) for face in faces]
+        size = _entry_size(faces) + len(key)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (faces, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def _drop(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'enabled': True,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations
+            }
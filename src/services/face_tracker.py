@@ -0,0 +1,183 @@
+"""
+Cross-frame face tracker for live recognition streams
+In live mode the same people stay in view for many consecutive frames; a tracker associates
+each frame's detections with the faces of the previous frames, so a tracked face keeps its
+identity and only needs a new embedding and vector search every few frames.
+"""
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_track_ids = itertools.count(1)
+
+
+@dataclass
+class Track:
+    """One face followed across frames"""
+    track_id: int
+    bbox: np.ndarray
+    kps: Optional[np.ndarray]
+    det_score: float
+    identity: Optional[Dict[str, Any]] = None  # Match dictionary of the last search（None until embedded）
+    frames_since_embed: int = 0
+    missed: int = 0
+    hits: int = 1
+    confidence: float = 1.0  # Association IoU with the previous frame
+    needs_embedding: bool = field(default=True, repr=False)
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of [x1, y1, x2, y2] boxes"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0).astype(np.float32)
+
+
+def landmark_shift(track: Track, bbox: np.ndarray, kps: Optional[np.ndarray]) -> float:
+    """Mean displacement of the 5 key points, relative to the face width"""
+    if track.kps is None or kps is None:
+        return 0.0
+    width = max(float(bbox[2] - bbox[0]), 1.0)
+    return float(np.linalg.norm(np.asarray(kps) - track.kps, axis=1).mean() / width)
+
+
+class FaceTracker:
+    """
+    IoU / landmark based tracker for one video stream
+
+    characteristic:
+    - Detections are matched greedily to tracks by IoU; a pair is rejected when the key points
+      moved more than max_landmark_shift face widths（two people crossing）
+    - A tracked face reuses its identity; it is re-embedded every reembed_interval frames,
+      or earlier when the association IoU or the detection score drops below its minimum
+    - Tracks not seen for max_missed frames are dropped
+    - The tracker is reset when the search context（region, client, threshold）changes
+    - Not thread-safe: one tracker per stream, frames processed one at a time
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_landmark_shift: float = 0.35,
+                 reembed_interval: int = 10, min_track_confidence: float = 0.5,
+                 min_det_score: float = 0.6, max_missed: int = 5):
+        self.iou_threshold = float(iou_threshold)
+        self.max_landmark_shift = float(max_landmark_shift)
+        self.reembed_interval = max(1, int(reembed_interval))
+        self.min_track_confidence = float(min_track_confidence)
+        self.min_det_score = float(min_det_score)
+        self.max_missed = max(0, int(max_missed))
+
+        self.tracks: List[Track] = []
+        self._context: Optional[Hashable] = None
+        self.frames = 0
+        self.embedded = 0
+        self.reused = 0
+
+    def ensure_context(self, context: Hashable):
+        """Drop every track when the search context changes（identities depend on it）"""
+        if context != self._context:
+            if self.tracks:
+                logger.debug(f"Tracker context changed，dropping {len(self.tracks)} tracks")
+            self.tracks = []
+            self._context = context
+
+    def reset(self):
+        """Forget every track"""
+        self.tracks = []
+        self._context = None
+
+    def update(self, detections: Sequence[Tuple[np.ndarray, Optional[np.ndarray], float]]) -> List[Track]:
+        """
+        Associate one frame's detections with the current tracks
+
+        Args:
+            detections: (bbox, kps, det_score) per detected face, original-resolution pixels
+
+        Returns:
+            One track per detection（same order）; track.needs_embedding tells whether the
+            face must be embedded and searched in this frame
+        """
+        self.frames += 1
+        boxes = np.array([np.asarray(bbox, dtype=np.float32)[:4] for bbox, _, _ in detections],
+                         dtype=np.float32).reshape(-1, 4)
+        track_boxes = np.array([track.bbox for track in self.tracks], dtype=np.float32).reshape(-1, 4)
+        ious = iou_matrix(track_boxes, boxes)
+
+        assigned: List[Optional[Track]] = [None] * len(detections)
+        used_tracks = set()
+        if ious.size:
+            # Greedy association, best overlap first
+            for flat in np.argsort(-ious, axis=None):
+                t, d = np.unravel_index(flat, ious.shape)
+                iou = float(ious[t, d])
+                if iou < self.iou_threshold:
+                    break
+                if t in used_tracks or assigned[d] is not None:
+                    continue
+                bbox, kps, det_score = detections[d]
+                track = self.tracks[t]
+                if landmark_shift(track, boxes[d], kps) > self.max_landmark_shift:
+                    continue
+                used_tracks.add(t)
+                assigned[d] = track
+                track.confidence = iou
+
+        for t, track in enumerate(self.tracks):
+            if t not in used_tracks:
+                track.missed += 1
+
+        for d, (bbox, kps, det_score) in enumerate(detections):
+            track = assigned[d]
+            kps = np.asarray(kps, dtype=np.float32) if kps is not None else None
+            if track is None:
+                track = Track(track_id=next(_track_ids), bbox=boxes[d], kps=kps, det_score=float(det_score))
+                self.tracks.append(track)
+                assigned[d] = track
+            else:
+                track.bbox = boxes[d]
+                track.kps = kps
+                track.det_score = float(det_score)
+                track.missed = 0
+                track.hits += 1
+                track.frames_since_embed += 1
+                track.needs_embedding = (
+                    track.identity is None
+                    or track.frames_since_embed >= self.reembed_interval
+                    or track.confidence < self.min_track_confidence
+                    or track.det_score < self.min_det_score
+                )
+            if track.needs_embedding:
+                self.embedded += 1
+            else:
+                self.reused += 1
+
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+        return assigned
+
+    def set_identity(self, track: Track, identity: Dict[str, Any]):
+        """Record the search result of a freshly embedded track"""
+        track.identity = identity
+        track.frames_since_embed = 0
+        track.needs_embedding = False
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get tracker metrics"""
+        total = self.embedded + self.reused
+        return {
+            'frames': self.frames,
+            'active_tracks': len(self.tracks),
+            'embedded_faces': self.embedded,
+            'reused_faces': self.reused,
+            'reuse_ratio': round(self.reused / total, 3) if total else 0.0
+        }
@@ -0,0 +1,418 @@
+"""
+In-memory gallery index for face matching
+Keeps every stored embedding as an L2-normalized float32 matrix per (region, client_id)
+partition, so a top-k search is one matrix-vector product instead of a database round trip.
+PostgreSQL + pgvector stays the store of record; the index is rebuilt from face_encodings.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PartitionKey = Tuple[str, Optional[str]]
+
+# Per-partition arrays, in _Partition.view() order
+_ARRAY_NAMES = ('matrix', 'encoding_ids', 'person_ids', 'quality', 'confidence')
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row (zero rows are left untouched)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class _Partition:
+    """
+    Contiguous embedding matrix with parallel id arrays
+
+    Rows are appended in place past `size`, so a reader holding a view of the first
+    `size` rows never observes a half-written row. Removals rebuild the arrays.
+    """
+
+    def __init__(self, dim: int, capacity: int = 256):
+        self.dim = dim
+        self.size = 0
+        self.matrix = np.empty((capacity, dim), dtype=np.float32)
+        self.encoding_ids = np.empty(capacity, dtype=np.int64)
+        self.person_ids = np.empty(capacity, dtype=np.int64)
+        self.quality = np.empty(capacity, dtype=np.float32)
+        self.confidence = np.empty(capacity, dtype=np.float32)
+
+    @classmethod
+    def from_arrays(cls, matrix: np.ndarray, encoding_ids: np.ndarray, person_ids: np.ndarray,
+                    quality: np.ndarray, confidence: np.ndarray) -> '_Partition':
+        """
+        Wrap existing arrays (e.g. read-only memory maps) without copying
+        The first append or removal copies into private memory
+        """
+        partition = cls.__new__(cls)
+        partition.dim = matrix.shape[1]
+        partition.size = matrix.shape[0]
+        partition.matrix = matrix
+        partition.encoding_ids = encoding_ids
+        partition.person_ids = person_ids
+        partition.quality = quality
+        partition.confidence = confidence
+        return partition
+
+    def _grow(self, required: int):
+        capacity = max(required, self.matrix.shape[0] * 2, 256)
+        for name in _ARRAY_NAMES:
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def append(self, embeddings: np.ndarray, encoding_ids: Sequence[int], person_ids: Sequence[int],
+               quality: Sequence[float], confidence: Sequence[float]):
+        count = embeddings.shape[0]
+        end = self.size + count
+        if end > self.matrix.shape[0]:
+            self._grow(end)
+        self.matrix[self.size:end] = embeddings
+        self.encoding_ids[self.size:end] = encoding_ids
+        self.person_ids[self.size:end] = person_ids
+        self.quality[self.size:end] = quality
+        self.confidence[self.size:end] = confidence
+        # Publish the new rows only after they are fully written
+        self.size = end
+
+    def remove(self, mask: np.ndarray):
+        """Drop the rows selected by mask (over the first `size` rows)"""
+        keep = ~mask
+        for name in _ARRAY_NAMES:
+            setattr(self, name, np.ascontiguousarray(getattr(self, name)[:self.size][keep]))
+        self.size = int(keep.sum())
+
+    def view(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        size = self.size
+        return (self.matrix[:size], self.encoding_ids[:size], self.person_ids[:size],
+                self.quality[:size], self.confidence[:size])
+
+
+class GalleryIndex:
+    """
+    Partitioned in-memory embedding index
+
+    characteristic:
+    - One partition per (region, client_id), searched with a single matrix-vector product
+    - Same result format and similarity semantics as DatabaseManager.find_similar_faces
+    - Incremental add / per-person refresh to stay in sync with the database
+    """
+
+    # Gallery rows scored per matrix product, bounds the (queries x rows) score matrix
+    search_chunk_rows = 65536
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self._partitions: Dict[PartitionKey, _Partition] = {}
+        self._persons: Dict[int, Dict[str, Any]] = {}
+        self._emp_to_person: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.is_loaded = False
+        self.loaded_at = None
+
+    # ==================== Loading ====================
+
+    def load(self, rows: Iterable[Sequence[Any]]) -> int:
+        """
+        Replace the index contents with gallery rows
+
+        Args:
+            rows: (encoding_id, person_id, embedding, quality, confidence, emp_id, name, region, client_id)
+
+        Returns:
+            Number of indexed encodings
+        """
+        grouped: Dict[PartitionKey, List[Sequence[Any]]] = {}
+        persons: Dict[int, Dict[str, Any]] = {}
+        for row in rows:
+            encoding_id, person_id, embedding, quality, confidence, emp_id, name, region, client_id = row
+            if embedding is None:
+                continue
+            grouped.setdefault((region, client_id), []).append(row)
+            profile_id = persons[person_id]['profile_encoding_id'] if person_id in persons else encoding_id
+            persons[person_id] = {'emp_id': emp_id, 'name': name, 'region': region, 'client_id': client_id,
+                                  'profile_encoding_id': min(profile_id, encoding_id)}
+
+        partitions: Dict[PartitionKey, _Partition] = {}
+        total = 0
+        for key, part_rows in grouped.items():
+            embeddings = _normalize_rows(np.stack([np.asarray(r[2], dtype=np.float32) for r in part_rows]))
+            partition = _Partition(embeddings.shape[1], capacity=len(part_rows))
+            partition.append(
+                embeddings,
+                [r[0] for r in part_rows],
+                [r[1] for r in part_rows],
+                [r[3] or 0.0 for r in part_rows],
+                [r[4] or 0.0 for r in part_rows]
+            )
+            partitions[key] = partition
+            total += len(part_rows)
+
+        with self._lock:
+            self._partitions = partitions
+            self._persons = persons
+            self._emp_to_person = {info['emp_id']: pid for pid, info in persons.items()}
+            self.is_loaded = True
+            self.loaded_at = datetime.now().isoformat()
+
+        logger.info(f"Gallery index loaded: {total} encodings in {len(partitions)} partitions")
+        return total
+
+    # ==================== Maintenance ====================
+
+    def add(self, encoding_id: int, person_id: int, embedding: np.ndarray, emp_id: str, name: str,
+            region: str, client_id: Optional[str] = None, quality: float = 0.0, confidence: float = 0.0):
+        """Add a single encoding (called right after it is stored in the database)"""
+        vector = _normalize_rows(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        key = (region, client_id)
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = _Partition(vector.shape[1])
+                self._partitions[key] = partition
+            partition.append(vector, [encoding_id], [person_id], [quality or 0.0], [confidence or 0.0])
+            previous = self._persons.get(person_id)
+            profile_id = encoding_id
+            if previous and previous.get('profile_encoding_id') is not None:
+                profile_id = min(previous['profile_encoding_id'], encoding_id)
+            self._persons[person_id] = {'emp_id': emp_id, 'name': name, 'region': region, 'client_id': client_id,
+                                        'profile_encoding_id': profile_id}
+            self._emp_to_person[emp_id] = person_id
+
+    def remove_person(self, person_id: int):
+        """Remove every encoding belonging to a person"""
+        with self._lock:
+            for partition in self._partitions.values():
+                mask = partition.person_ids[:partition.size] == person_id
+                if mask.any():
+                    partition.remove(mask)
+            info = self._persons.pop(person_id, None)
+            if info and self._emp_to_person.get(info['emp_id']) == person_id:
+                del self._emp_to_person[info['emp_id']]
+
+    def remove_encoding(self, encoding_id: int):
+        """Remove a single encoding (the person's profile encoding moves to its oldest remaining one)"""
+        with self._lock:
+            for partition in self._partitions.values():
+                mask = partition.encoding_ids[:partition.size] == encoding_id
+                if mask.any():
+                    person_id = int(partition.person_ids[:partition.size][mask][0])
+                    partition.remove(mask)
+                    person = self._persons.get(person_id)
+                    if person is not None and person.get('profile_encoding_id') == encoding_id:
+                        person['profile_encoding_id'] = self._oldest_encoding(person_id)
+                    return
+
+    def _oldest_encoding(self, person_id: int) -> Optional[int]:
+        """Lowest encoding id still indexed for a person"""
+        oldest = None
+        for partition in self._partitions.values():
+            ids = partition.encoding_ids[:partition.size][partition.person_ids[:partition.size] == person_id]
+            if ids.size:
+                candidate = int(ids.min())
+                oldest = candidate if oldest is None else min(oldest, candidate)
+        return oldest
+
+    def replace_person(self, person_id: int, rows: Iterable[Sequence[Any]]):
+        """Replace a person's encodings and metadata with freshly loaded gallery rows"""
+        with self._lock:
+            self.remove_person(person_id)
+            for row in rows:
+                encoding_id, _, embedding, quality, confidence, emp_id, name, region, client_id = row
+                if embedding is None:
+                    continue
+                self.add(encoding_id, person_id, embedding, emp_id, name, region, client_id, quality, confidence)
+
+    # ==================== Search ====================
+
+    def _select_views(self, region: Optional[str], client_id: Optional[str]) -> List[Tuple[np.ndarray, ...]]:
+        """Consistent views of the partitions matching the filters (taken under the lock)"""
+        with self._lock:
+            return [
+                partition.view() for (part_region, part_client), partition in self._partitions.items()
+                if (region is None or part_region == region) and (client_id is None or part_client == client_id)
+            ]
+
+    def search(self, embedding: np.ndarray, region: Optional[str] = None,
+               emp_id: Optional[str] = None, client_id: Optional[str] = None,
+               threshold: float = 0.3, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Find the most similar stored faces
+
+        Args:
+            embedding: Query face embedding
+            region: Region to search in (None searches every region)
+            emp_id: Optional employee ID for targeted search
+            client_id: Optional client filter
+            threshold: Cosine similarity threshold (0-1)
+            limit: Maximum results to return
+
+        Returns:
+            List of matches in the same format as DatabaseManager.find_similar_faces
+        """
+        queries = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        return self.search_batch(queries, region, emp_id, client_id, threshold, limit)[0]
+
+    def search_batch(self, embeddings: np.ndarray, region: Optional[str] = None,
+                     emp_id: Optional[str] = None, client_id: Optional[str] = None,
+                     threshold: float = 0.3, limit: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Top-k search for several query embeddings at once (e.g. every face in one frame)
+        Each partition is scored with (queries x gallery) matrix products over row chunks
+
+        Args:
+            embeddings: Query matrix, one embedding per row
+            region / emp_id / client_id / threshold / limit: Same as search
+
+        Returns:
+            One result list per query row
+        """
+        queries = _normalize_rows(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+        candidates: List[List[Tuple]] = [[] for _ in range(queries.shape[0])]
+        if queries.shape[0] == 0 or limit <= 0:
+            return candidates
+
+        person_filter = None
+        if emp_id:
+            person_filter = self._emp_to_person.get(emp_id)
+            if person_filter is None:
+                return candidates
+
+        for view in self._select_views(region, client_id):
+            for start in range(0, view[0].shape[0], self.search_chunk_rows):
+                end = start + self.search_chunk_rows
+                matrix, encoding_ids, person_ids, quality, confidence = (arr[start:end] for arr in view)
+                similarities = queries @ matrix.T
+                valid = similarities > threshold
+                if person_filter is not None:
+                    valid &= (person_ids == person_filter)[np.newaxis, :]
+                for query_idx in np.flatnonzero(valid.any(axis=1)):
+                    row_scores = similarities[query_idx]
+                    rows = np.flatnonzero(valid[query_idx])
+                    if rows.size > limit:
+                        rows = rows[np.argpartition(-row_scores[rows], limit - 1)[:limit]]
+                    for row in rows:
+                        candidates[query_idx].append((float(row_scores[row]), int(encoding_ids[row]), int(person_ids[row]),
+                                                      float(quality[row]), float(confidence[row])))
+
+        return [self._build_results(query_candidates, limit) for query_candidates in candidates]
+
+    def _build_results(self, candidates: List[Tuple], limit: int) -> List[Dict[str, Any]]:
+        """Merge per-partition candidates into the final top-k result list"""
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        results = []
+        for similarity, encoding_id, person_id, quality, confidence in candidates[:limit]:
+            person = self._persons.get(person_id)
+            if person is None:
+                continue
+            results.append({
+                'person_id': person_id,
+                'emp_id': person['emp_id'],
+                'name': person['name'],
+                'region': person['region'],
+                'match_score': similarity * 100,  # Percentage
+                'distance': 1.0 - similarity,  # Same as pgvector cosine distance
+                'face_encoding_id': encoding_id,
+                'profile_encoding_id': person.get('profile_encoding_id') or encoding_id,
+                'quality': quality,
+                'confidence': confidence
+            })
+        return results
+
+    # ==================== Snapshots ====================
+
+    def save_snapshot(self, directory: str, version: int):
+        """
+        Write the index to a snapshot directory (one .npy file per partition array)
+        The directory is written under a temporary name and renamed into place
+
+        Args:
+            directory: Target snapshot directory
+            version: Gallery version the snapshot represents
+        """
+        tmp_dir = f"{directory}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        with self._lock:
+            partitions = []
+            for number, ((region, client_id), partition) in enumerate(self._partitions.items()):
+                for name, array in zip(_ARRAY_NAMES, partition.view()):
+                    np.save(os.path.join(tmp_dir, f"p{number}_{name}.npy"), np.ascontiguousarray(array))
+                partitions.append({'file': f"p{number}", 'region': region, 'client_id': client_id,
+                                   'size': partition.size})
+            manifest = {
+                'version': version,
+                'dim': self.dim,
+                'created_at': datetime.now().isoformat(),
+                'partitions': partitions,
+                'persons': {str(pid): info for pid, info in self._persons.items()}
+            }
+
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(tmp_dir, directory)
+        logger.info(f"Gallery index snapshot v{version} written: {directory}")
+
+    def load_snapshot(self, directory: str) -> int:
+        """
+        Replace the index contents with a snapshot, memory-mapping the embedding arrays
+        Every process mapping the same snapshot shares one copy in the page cache
+
+        Args:
+            directory: Snapshot directory written by save_snapshot
+
+        Returns:
+            Gallery version of the snapshot
+        """
+        with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        partitions: Dict[PartitionKey, _Partition] = {}
+        for entry in manifest['partitions']:
+            arrays = [np.load(os.path.join(directory, f"{entry['file']}_{name}.npy"), mmap_mode='r')
+                      for name in _ARRAY_NAMES]
+            partitions[(entry['region'], entry['client_id'])] = _Partition.from_arrays(*arrays)
+        persons = {int(pid): info for pid, info in manifest['persons'].items()}
+
+        with self._lock:
+            self._partitions = partitions
+            self._persons = persons
+            self._emp_to_person = {info['emp_id']: pid for pid, info in persons.items()}
+            self.is_loaded = True
+            self.loaded_at = datetime.now().isoformat()
+
+        logger.info(f"Gallery index snapshot v{manifest['version']} mapped: "
+                    f"{sum(p.size for p in partitions.values())} encodings in {len(partitions)} partitions")
+        return int(manifest['version'])
+
+    # ==================== Statistics ====================
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get index statistics"""
+        with self._lock:
+            partitions = {
+                f"{region}/{client_id or '-'}": partition.size
+                for (region, client_id), partition in self._partitions.items()
+            }
+            total = sum(partitions.values())
+            return {
+                'loaded': self.is_loaded,
+                'loaded_at': self.loaded_at,
+                'total_encodings': total,
+                'total_persons': len(self._persons),
+                'partitions': partitions,
+                'memory_mb': round(sum(p.matrix.nbytes for p in self._partitions.values()) / (1024 * 1024), 2)
+            }
@@ -0,0 +1,192 @@
+"""
+Cross-process gallery index synchronization
+Every gallery change bumps a version row in PostgreSQL. Worker processes either reload their
+private index or map a shared, versioned snapshot of the index from disk (np.load mmap), and
+do so again whenever the database version moves on.
+"""
+import fcntl
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from ..models.database import DatabaseManager
+from .gallery_index import GalleryIndex
+
+logger = logging.getLogger(__name__)
+
+
+class GalleryVersionSync:
+    """
+    Keeps a process-local GalleryIndex in step with the database gallery version
+
+    characteristic:
+    - Used when every worker holds a private index: a version change made by another
+      process reloads the index from face_encodings
+    - Local changes are applied to the index immediately; the version bump tells the
+      other processes to reload
+    - Version checks are throttled to one database query per sync_interval seconds
+    """
+
+    mode = 'private_index'
+
+    def __init__(self, index: GalleryIndex, db_manager: DatabaseManager, sync_interval: float = 2.0):
+        self.index = index
+        self.db_manager = db_manager
+        self.sync_interval = float(sync_interval)
+        self.version: Optional[int] = None
+        self._last_check = 0.0
+        self._sync_lock = threading.Lock()
+
+    def _reload(self, version: int):
+        """Bring the index to a gallery version"""
+        self.index.load(self.db_manager.get_gallery_rows())
+
+    def ensure_current(self, force: bool = False) -> bool:
+        """
+        Reload the index when the database gallery version has changed
+
+        Args:
+            force: Skip the sync_interval throttle
+
+        Returns:
+            True if the index was reloaded
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.sync_interval:
+            return False
+        if not self._sync_lock.acquire(blocking=force):
+            return False  # Another thread is already syncing
+        try:
+            self._last_check = now
+            version = self.db_manager.get_gallery_version()
+            if version == self.version and not force:
+                return False
+            self.version = self._reload(version) or version
+            return True
+        finally:
+            self._sync_lock.release()
+
+    def mark_changed(self):
+        """Publish a gallery change made by this process (already applied to the local index)"""
+        with self._sync_lock:
+            previous = self.version
+            version = self.db_manager.bump_gallery_version()
+            # If nobody else changed the gallery in between, the local index already matches
+            if previous is not None and version == previous + 1:
+                self.version = version
+            # Otherwise leave the version stale so the next check reloads
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get synchronization status"""
+        return {
+            'mode': self.mode,
+            'version': self.version,
+            'sync_interval': self.sync_interval,
+            'pid': os.getpid()
+        }
+
+
+class GallerySnapshotSync(GalleryVersionSync):
+    """
+    GalleryVersionSync over a shared, memory-mapped snapshot instead of a private copy
+
+    characteristic:
+    - Snapshots live in snapshot_dir/v<version> and are built once (under an exclusive file
+      lock) by whichever process first needs that version, then memory-mapped by all others
+    - Snapshots are mapped under the shared lock, so pruning never removes one mid-load;
+      a snapshot pruned before it was mapped is retried with the latest version
+    """
+
+    mode = 'shared_snapshot'
+    load_attempts = 3
+
+    def __init__(self, index: GalleryIndex, db_manager: DatabaseManager, snapshot_dir: str,
+                 sync_interval: float = 2.0, keep_snapshots: int = 2):
+        super().__init__(index, db_manager, sync_interval)
+        self.snapshot_dir = snapshot_dir
+        self.keep_snapshots = max(1, int(keep_snapshots))
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+    def _snapshot_path(self, version: int) -> str:
+        return os.path.join(self.snapshot_dir, f"v{version}")
+
+    @contextmanager
+    def _build_lock(self, shared: bool = False):
+        """Inter-process lock: exclusive to build and prune snapshots, shared to map one"""
+        with open(os.path.join(self.snapshot_dir, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def build_snapshot(self, version: int) -> str:
+        """Build the snapshot for a version from the database unless it already exists"""
+        path = self._snapshot_path(version)
+        with self._build_lock():
+            if not os.path.exists(os.path.join(path, 'manifest.json')):
+                builder = GalleryIndex(self.index.dim)
+                builder.load(self.db_manager.get_gallery_rows())
+                builder.save_snapshot(path, version)
+                self._prune_snapshots(version)
+        return path
+
+    def _prune_snapshots(self, current_version: int):
+        """Delete all but the newest keep_snapshots snapshots (mapped files stay valid until unmapped)"""
+        versions = []
+        for entry in os.listdir(self.snapshot_dir):
+            if entry.startswith('v') and entry[1:].isdigit():
+                versions.append(int(entry[1:]))
+        for version in sorted(versions, reverse=True)[self.keep_snapshots:]:
+            if version != current_version:
+                shutil.rmtree(self._snapshot_path(version), ignore_errors=True)
+
+    def _reload(self, version: int) -> int:
+        for attempt in range(self.load_attempts):
+            path = self.build_snapshot(version)
+            try:
+                with self._build_lock(shared=True):
+                    self.index.load_snapshot(path)
+                return version
+            except FileNotFoundError:
+                # Pruned by a process that built a newer version in between
+                logger.info(f"Gallery snapshot v{version} was pruned before it was mapped，retrying with the latest version")
+                version = self.db_manager.get_gallery_version()
+        raise RuntimeError(f"Gallery snapshot could not be mapped after {self.load_attempts} attempts")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get synchronization status"""
+        status = super().get_status()
+        status['snapshot_dir'] = self.snapshot_dir
+        return status
+
+
+def prepare_gallery_snapshot() -> Optional[int]:
+    """
+    Build the snapshot for the current gallery version ahead of forking workers
+    (called from the Gunicorn preload factory so workers start by mapping it)
+
+    Returns:
+        The snapshot version, or None when shared snapshots are disabled
+    """
+    from ..utils.config import config
+
+    if not (config.get('face_recognition.gallery_index.enabled', False)
+            and config.get('face_recognition.gallery_index.shared_snapshot', False)):
+        return None
+    db_manager = DatabaseManager()
+    try:
+        sync = GallerySnapshotSync(
+            GalleryIndex(), db_manager,
+            config.get('face_recognition.gallery_index.snapshot_dir', 'data/gallery_index')
+        )
+        version = db_manager.get_gallery_version()
+        sync.build_snapshot(version)
+        return version
+    finally:
+        # Do not hand pooled connections to forked workers
+        db_manager.engine.dispose()
@@ -0,0 +1,168 @@
+"""
+Micro-batching scheduler for face model inference
+Collects concurrent detection/embedding requests for a short window and runs them
+as one batch, so parallel recognition requests share ONNX Runtime batches.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingRequest:
+    """One queued item with its result future"""
+
+    __slots__ = ('item', 'future', 'enqueued_at')
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatchScheduler:
+    """
+    Dynamic micro-batching in front of a batch function
+
+    characteristic:
+    - A batch is dispatched when max_batch_size items are queued or window_ms has
+      passed since the first item of the batch arrived
+    - Results are fanned back out to each caller through a Future
+    - The worker thread starts lazily on first submit (and again after a fork)
+    - Queue depth, batch size and queue wait time are tracked as metrics
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], window_ms: float = 10.0,
+                 max_batch_size: int = 16, name: str = 'inference'):
+        """
+        Args:
+            batch_fn: Function mapping a list of items to a list of results (same order)
+            window_ms: Maximum time to wait for more items after the first one
+            max_batch_size: Maximum items per batch
+            name: Scheduler name (used for the worker thread and logs)
+        """
+        self.batch_fn = batch_fn
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.name = name
+
+        self._queue: "queue.Queue[_PendingRequest]" = queue.Queue()
+        self._worker = None
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self._total_requests = 0
+        self._total_batches = 0
+        self._total_errors = 0
+        self._max_batch_seen = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+        self._last_batch_size = 0
+
+    # ==================== Submission ====================
+
+    def submit(self, item: Any) -> Future:
+        """Queue one item, the returned future resolves to its result"""
+        self._ensure_worker()
+        request = _PendingRequest(item)
+        self._queue.put(request)
+        return request.future
+
+    def run(self, item: Any, timeout: float = None) -> Any:
+        """Queue one item and block until its result is available"""
+        return self.submit(item).result(timeout=timeout)
+
+    def _ensure_worker(self):
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+            if self._worker_pid is not None and self._worker_pid != pid:
+                # Forked child: the parent's thread and queued items do not exist here
+                self._queue = queue.Queue()
+                with self._metrics_lock:
+                    self._reset_metrics()
+            self._worker_pid = pid
+            self._worker = threading.Thread(target=self._worker_loop, name=f"{self.name}-microbatch", daemon=True)
+            self._worker.start()
+            logger.info(f"Micro-batching scheduler '{self.name}' started "
+                        f"(window: {self.window * 1000:.1f}ms, max batch: {self.max_batch_size})")
+
+    # ==================== Worker ====================
+
+    def _collect_batch(self) -> List[_PendingRequest]:
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued_at + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker_loop(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            waits = [started - request.enqueued_at for request in batch]
+
+            try:
+                results = self.batch_fn([request.item for request in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"batch function returned {len(results)} results for {len(batch)} items")
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+                failed = False
+            except Exception as e:
+                logger.error(f"Micro-batch '{self.name}' failed: {str(e)}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                failed = True
+
+            elapsed = time.perf_counter() - started
+            with self._metrics_lock:
+                self._total_requests += len(batch)
+                self._total_batches += 1
+                self._total_errors += int(failed)
+                self._last_batch_size = len(batch)
+                self._max_batch_seen = max(self._max_batch_seen, len(batch))
+                self._total_wait += sum(waits)
+                self._max_wait = max(self._max_wait, max(waits))
+                self._total_run += elapsed
+
+    # ==================== Metrics ====================
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get scheduler metrics"""
+        with self._metrics_lock:
+            batches = self._total_batches
+            requests = self._total_requests
+            return {
+                'name': self.name,
+                'running': self._worker is not None and self._worker.is_alive(),
+                'window_ms': self.window * 1000,
+                'max_batch_size': self.max_batch_size,
+                'queue_depth': self._queue.qsize(),
+                'total_requests': requests,
+                'total_batches': batches,
+                'failed_batches': self._total_errors,
+                'last_batch_size': self._last_batch_size,
+                'max_batch_size_seen': self._max_batch_seen,
+                'avg_batch_size': round(requests / batches, 2) if batches else 0.0,
+                'avg_wait_ms': round(self._total_wait / requests * 1000, 3) if requests else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 3),
+                'avg_batch_run_ms': round(self._total_run / batches * 1000, 3) if batches else 0.0
+            }
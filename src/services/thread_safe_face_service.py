@@ -57,16 +57,19 @@ class ThreadSafeFaceService:
     
     def detect_faces(self, image, **kwargs):
         """Thread-safe face detection"""
+        if self._service.inference_scheduler is not None:
+            # The scheduler's single worker already serializes model access
+            return self._service.detect_faces_shared(image)
         with self._service_lock:
             return self._service.detect_faces(image, **kwargs)
     
-    def enroll_person(self, name: str, image_path: str, region: str, emp_id: str, emp_rank: str, 
+    def enroll_person(self, name: str, image, region: str, emp_id: str, emp_rank: str, 
                      description: Optional[str] = None, original_filename: Optional[str] = None, 
                      client_id: Optional[str] = None) -> Dict[str, Any]:
         """Thread-safe personnel warehousing"""
         with self._service_lock:
             with self._cache_lock:
-                return self._service.enroll_person(name, image_path, region, emp_id, emp_rank, description, original_filename, client_id)
+                return self._service.enroll_person(name, image, region, emp_id, emp_rank, description, original_filename, client_id)
     
     def recognize_face(self, image, **kwargs) -> Dict[str, Any]:
         """Thread-safe face recognition"""
@@ -93,10 +96,10 @@ class ThreadSafeFaceService:
         with self._cache_lock:
             return self._service.recognize_face_with_threshold(image, region, threshold, emp_id, client_id)
     
-    def visualize_face_detection(self, image_path: str) -> Dict[str, Any]:
+    def visualize_face_detection(self, image) -> Dict[str, Any]:
         """Thread-safe face detection visualization"""
         with self._service_lock:
-            return self._service.visualize_face_detection(image_path)
+            return self._service.visualize_face_detection(image)
     
     @property
     def db_manager(self):
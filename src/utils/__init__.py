@@ -7,5 +7,6 @@ from .config import config, setup_logging, ensure_directories, get_upload_config
 __all__ = [
     'validate_image', 'preprocess_image', 'resize_image', 'draw_face_boxes',
     'save_image_with_results', 'create_thumbnail', 'get_image_info',
+    'DecodedImage', 'decode_image_bytes', 'decode_upload',
     'config', 'setup_logging', 'ensure_directories', 'get_upload_config'
 ]
@@ -2,21 +2,58 @@
 Unified configuration management tool - Make sure all configurations start with config.json read，Avoid hardcoding
 """
 import os
+import copy
 import json
 import logging
+import threading
 from pathlib import Path
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+
+class ConfigSnapshot:
+    """
+    Immutable, versioned view of the configuration
+    
+    Readers take the current snapshot and use it without any file I/O or locking；
+    writes and reloads publish a new snapshot instead of changing this one.
+    Dict and list values are handed out as copies so the snapshot itself never changes.
+    """
+    
+    __slots__ = ('version', 'mtime', '_data')
+    
+    def __init__(self, data: dict, version: int, mtime: Optional[float]):
+        self.version = version
+        self.mtime = mtime
+        self._data = data
+    
+    def get(self, key_path: str, default=None):
+        """Get configuration value based on path（dotted，like face_recognition.recognition_threshold）"""
+        value = self._data
+        try:
+            for key in key_path.split('.'):
+                value = value[key]
+        except (KeyError, TypeError):
+            return default
+        return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
 class Config:
     """Unified configuration management class - All configurations are from config.json read"""
     
     def __init__(self, config_file: str = "config.json"):
         self.config_file = config_file
+        self._lock = threading.RLock()
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._watch_interval = None
+        self._fork_hook_registered = False
         self.config = self._load_config()
         
         # Read all parameters from configuration file，Do not set default class attributes
         self._load_all_configs()
+        self._publish_snapshot()
     
     def _load_all_configs(self):
         """Load all configuration from configuration file into class properties"""
@@ -31,6 +68,8 @@ class Config:
         self.DUPLICATE_THRESHOLD = face_config.get('duplicate_threshold', 0.93)
         self.ENABLE_CACHE = face_config.get('enable_cache', True)
         self.CACHE_LIMIT = face_config.get('cache_limit', 5000)
+        self.CACHE_MAX_BYTES = face_config.get('cache_max_bytes', 64 * 1024 * 1024)
+        self.CACHE_TTL = face_config.get('cache_ttl', 300)
         self.BATCH_SIZE = face_config.get('batch_size', 500)
         
         # Database configuration
@@ -77,15 +116,81 @@ class Config:
                 "deepface_model": "ArcFace",
                 "det_size": [640, 640],
                 "providers": ["CPUExecutionProvider"],
+                "onnx": {
+                    "intra_op_num_threads": 2,
+                    "inter_op_num_threads": 0,
+                    "graph_optimization_level": "all",
+                    "execution_mode": "sequential",
+                    "enable_cpu_mem_arena": True,
+                    "enable_mem_pattern": True
+                },
                 "duplicate_threshold": 0.93,
                 "enable_cache": True,
                 "cache_limit": 5000,
-                "batch_size": 500
+                "cache_max_bytes": 67108864,
+                "cache_ttl": 300,
+                "batch_size": 500,
+                "inference_batch_size": 32,
+                "decode": {
+                    "enabled": True,
+                    "min_recognition_face_px": 112
+                },
+                "quantization": {
+                    "enabled": False,
+                    "method": "static",
+                    "calibration_samples": 200,
+                    "tasks": ["detection", "recognition"]
+                },
+                "micro_batching": {
+                    "enabled": False,
+                    "window_ms": 10,
+                    "max_batch_size": 16
+                },
+                "inference_executor": {
+                    "max_workers": None,
+                    "max_queue": 32
+                },
+                "gallery_index": {
+                    "enabled": False,
+                    "shared_snapshot": False,
+                    "snapshot_dir": "data/gallery_index",
+                    "sync_interval": 2.0
+                },
+                "pipeline": {
+                    "modules": ["detection", "recognition", "genderage"]
+                },
+                "tracking": {
+                    "enabled": False,
+                    "iou_threshold": 0.3,
+                    "max_landmark_shift": 0.35,
+                    "reembed_interval": 10,
+                    "min_track_confidence": 0.5,
+                    "min_det_score": 0.6,
+                    "max_missed": 5
+                }
             },
             "api": {
                 "host": "0.0.0.0",
                 "port": 8000,
-                "debug": False
+                "debug": False,
+                "config_watch_interval": 2.0,
+                "live_stream": {
+                    "max_frame_bytes": 4194304
+                }
+            },
+            "analytics": {
+                "event_sink": {
+                    "enabled": False,
+                    "max_queue": 10000,
+                    "batch_size": 500,
+                    "flush_interval": 1.0,
+                    "spool_dir": "data/analytics_spool"
+                }
+            },
+            "storage": {
+                "blob_dir": "data/face_images",
+                "thumbnail_sizes": [128, 256],
+                "thumbnail_quality": 85
             },
             "upload": {
                 "max_file_size": 16777216,
@@ -136,15 +241,18 @@ class Config:
     def _save_config(self, config: dict):
         """Save configuration to file"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
+            # Write then rename，so other processes never read a half-written file
+            temp_file = f"{self.config_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
                 json.dump(config, f, indent=2, ensure_ascii=False)
+            os.replace(temp_file, self.config_file)
             logger.info(f"Configuration saved to: {self.config_file}")
         except Exception as e:
             logger.error(f"Failed to save configuration file: {str(e)}")
     
     def get(self, key_path: str, default=None):
         """
-        Get configuration value based on path
+        Get configuration value based on path（read from the current snapshot）
         
         Args:
             key_path: Configuration path，like "upload.allowed_extensions"
@@ -153,15 +261,64 @@ class Config:
         Returns:
             configuration value
         """
-        keys = key_path.split('.')
-        value = self.config
-        
+        return self._snapshot.get(key_path, default)
+    
+    # ==================== Snapshots ====================
+    
+    def _file_mtime(self) -> Optional[float]:
         try:
-            for key in keys:
-                value = value[key]
-            return value
-        except (KeyError, TypeError):
-            return default
+            return os.stat(self.config_file).st_mtime
+        except OSError:
+            return None
+    
+    def _publish_snapshot(self):
+        """Replace the current snapshot（one reference assignment，so readers never see a partial update）"""
+        version = self._snapshot.version + 1 if self._snapshot is not None else 1
+        self._snapshot = ConfigSnapshot(copy.deepcopy(self.config), version, self._file_mtime())
+    
+    def snapshot(self) -> ConfigSnapshot:
+        """Current immutable configuration snapshot"""
+        return self._snapshot
+    
+    @property
+    def version(self) -> int:
+        """Version of the current snapshot（incremented on every set/reload）"""
+        return self._snapshot.version
+    
+    def start_watcher(self, interval: float = 2.0):
+        """
+        Reload the configuration when the file changes on disk
+        Polls the file mtime from a daemon thread，so a write made by one worker process
+        reaches every other worker; the thread is restarted in forked children
+        """
+        self._watch_interval = float(interval)
+        if self._watch_interval <= 0:
+            return
+        if not self._fork_hook_registered and hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._restart_watcher_in_child)
+            self._fork_hook_registered = True
+        if self._watcher is None or not self._watcher.is_alive():
+            self._watcher = threading.Thread(target=self._watch_loop, name='config-watcher', daemon=True)
+            self._watcher.start()
+            logger.info(f"Configuration watcher started（interval: {self._watch_interval}s）")
+    
+    def _restart_watcher_in_child(self):
+        self._watcher = None
+        self.start_watcher(self._watch_interval)
+    
+    def _watch_loop(self):
+        stop = threading.Event()
+        while not stop.wait(self._watch_interval):
+            try:
+                mtime = self._file_mtime()
+                if mtime is None or mtime == self._snapshot.mtime:
+                    continue
+                # Skip files that do not parse（e.g. mid-edit），the next poll retries
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    json.load(f)
+                self.reload()
+            except Exception as e:
+                logger.warning(f"Configuration watcher failed to reload: {str(e)}")
     
     def get_allowed_extensions(self):
         """Get a list of allowed file extensions"""
@@ -196,33 +353,39 @@ class Config:
             value: new value
         """
         keys = key_path.split('.')
-        config = self.config
-        
-        # Navigate to target location
-        for key in keys[:-1]:
-            if key not in config:
-                config[key] = {}
-            config = config[key]
-        
-        # Set value
-        config[keys[-1]] = value
-        
-        # Reload class properties
-        self._load_all_configs()
-        
-        # Save configuration
-        self._save_config(self.config)
-        logger.info(f"Configuration has been updated: {key_path} = {value}")
+        with self._lock:
+            config = self.config
+            
+            # Navigate to target location
+            for key in keys[:-1]:
+                if key not in config:
+                    config[key] = {}
+                config = config[key]
+            
+            # Set value
+            config[keys[-1]] = value
+            
+            # Reload class properties
+            self._load_all_configs()
+            
+            # Save configuration，then publish the snapshot（records the new file mtime）
+            self._save_config(self.config)
+            self._publish_snapshot()
+        logger.info(f"Configuration has been updated: {key_path} = {value}（version {self.version}）")
     
     def reload(self):
         """Reload configuration"""
-        self.config = self._load_config()
-        self._load_all_configs()
-        logger.info("Configuration file has been reloaded")
+        with self._lock:
+            self.config = self._load_config()
+            self._load_all_configs()
+            self._publish_snapshot()
+        logger.info(f"Configuration file has been reloaded（version {self.version}）")
     
     def save(self):
         """Save current configuration to file"""
-        self._save_config(self.config)
+        with self._lock:
+            self._save_config(self.config)
+            self._publish_snapshot()
 
 # Global configuration example
 config = Config()
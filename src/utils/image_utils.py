@@ -4,11 +4,153 @@ Image processing tool functions
 import cv2
 import numpy as np
 from PIL import Image
+import io
 import os
 import logging
+from typing import Optional, Sequence
+
+from .config import config
 
 logger = logging.getLogger(__name__)
 
+# JPEG DCT-domain downscaling factors supported by cv2.imdecode
+_REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+
+class DecodedImage:
+    """
+    Uploaded image decoded for face analysis
+    
+    `detection` is decoded at reduced scale (JPEG DCT scaling), just large enough for the
+    detector input. Finer levels, up to full resolution, are decoded only on demand (e.g. for
+    recognition crops of small faces). Coordinates reported for faces are always in
+    original-resolution pixels.
+    """
+    
+    def __init__(self, data: Optional[bytes], width: int, height: int, reduction: int, image: np.ndarray):
+        """
+        Args:
+            data: Encoded image bytes (None for images that only exist as arrays)
+            width: Original image width
+            height: Original image height
+            reduction: Decode reduction factor of `image`
+            image: BGR image decoded at `reduction`
+        """
+        self.data = data
+        self.width = width
+        self.height = height
+        self.reduction = reduction
+        self._levels = {reduction: image}
+    
+    @classmethod
+    def from_array(cls, image: np.ndarray) -> 'DecodedImage':
+        """Wrap an already decoded full-resolution image"""
+        return cls(None, image.shape[1], image.shape[0], 1, image)
+    
+    @property
+    def detection(self) -> np.ndarray:
+        """Image used for face detection"""
+        return self._levels[self.reduction]
+    
+    @property
+    def full(self) -> np.ndarray:
+        """Full-resolution image (decoded on first access)"""
+        return self.level(1)
+    
+    def level(self, reduction: int) -> np.ndarray:
+        """Image decoded at the given reduction factor (1 = full resolution)"""
+        image = self._levels.get(reduction)
+        if image is None:
+            if self.data is None:
+                return self._levels[min(self._levels)]
+            image = cv2.imdecode(np.frombuffer(self.data, np.uint8), _REDUCED_DECODE_FLAGS[reduction])
+            self._levels[reduction] = image
+        return image
+    
+    def scale_of(self, image: np.ndarray) -> float:
+        """Factor mapping pixel coordinates of a level image back to the original image"""
+        return self.width / image.shape[1]
+    
+    def level_for_face(self, face_size: float, min_face_px: int = 112) -> np.ndarray:
+        """
+        Coarsest level at which a face is at least min_face_px wide
+        
+        Args:
+            face_size: Face size in original-resolution pixels
+            min_face_px: Required face size at the returned level
+            
+        Returns:
+            Level image（full resolution when no coarser level is large enough）
+        """
+        reduction = self.reduction
+        while reduction > 1 and face_size / reduction < min_face_px:
+            reduction //= 2
+        return self.level(reduction)
+
+
+def decode_image_bytes(data: bytes, target_size: Sequence[int] = (640, 640)) -> Optional[DecodedImage]:
+    """
+    Decode uploaded image bytes at the smallest scale that still covers the detector input
+    
+    Args:
+        data: Encoded image bytes
+        target_size: Detector input size (width, height)
+        
+    Returns:
+        DecodedImage，None if the data cannot be decoded
+    """
+    width = height = None
+    try:
+        # Header only：no pixel decoding
+        with Image.open(io.BytesIO(data)) as header:
+            width, height = header.size
+            # EXIF orientations 5-8 rotate by 90 degrees（cv2.imdecode applies them）
+            if header.getexif().get(0x0112) in (5, 6, 7, 8):
+                width, height = height, width
+    except Exception:
+        pass
+    
+    reduction = 1
+    if width and height:
+        while reduction < 8 and max(width, height) / (reduction * 2) >= max(target_size):
+            reduction *= 2
+    
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), _REDUCED_DECODE_FLAGS[reduction])
+    if image is None:
+        return None
+    if not (width and height):
+        width, height = image.shape[1], image.shape[0]
+    return DecodedImage(data, width, height, reduction, image)
+
+
+def decode_upload(data: bytes) -> Optional[DecodedImage]:
+    """
+    Decode uploaded bytes straight from memory（shared ingestion path for all upload endpoints）
+    Decodes at detector scale when face_recognition.decode is enabled，otherwise at full resolution
+    
+    Args:
+        data: Encoded image bytes
+        
+    Returns:
+        DecodedImage，None if the data cannot be decoded
+    """
+    if not data:
+        return None
+    if config.get('face_recognition.decode.enabled', True):
+        return decode_image_bytes(data, config.get('face_recognition.det_size', [640, 640]))
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    decoded = DecodedImage.from_array(image)
+    decoded.data = data
+    return decoded
+
+
 def validate_image(image_path: str) -> bool:
     """
     Verify that the image file is valid
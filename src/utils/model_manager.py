@@ -4,8 +4,10 @@ Responsible for managing the download of all machine learning models、Storage a
 """
 import os
 import logging
+import shutil
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, List, Sequence
 import json
 
 logger = logging.getLogger(__name__)
@@ -127,6 +129,140 @@ class ModelManager:
         
         return str(self.insightface_dir)
     
+    def get_quantized_model_name(self, model_name: str = 'buffalo_l') -> str:
+        """Name of the INT8 model pack derived from model_name"""
+        return f"{model_name}_int8"
+    
+    def has_quantized_model(self, model_name: str = 'buffalo_l') -> bool:
+        """Whether the INT8 model pack has been built"""
+        quantized_dir = self.insightface_dir / "models" / self.get_quantized_model_name(model_name)
+        return (quantized_dir / "quantization.json").exists()
+    
+    def quantize_insightface(self, app, model_name: str = 'buffalo_l',
+                             calibration_images: Optional[List[Any]] = None,
+                             method: str = 'static',
+                             tasks: Sequence[str] = ('detection', 'recognition'),
+                             det_size: Sequence[int] = (640, 640)) -> Dict[str, Any]:
+        """
+        Build and cache INT8 versions of an InsightFace model pack
+        The quantized pack is written next to the original as <model_name>_int8，models not
+        listed in tasks are copied unchanged
+        
+        Args:
+            app: Prepared fp32 insightface FaceAnalysis（used to preprocess calibration data）
+            model_name: Source model pack name
+            calibration_images: BGR images for static quantization（e.g. stored face images）
+            method: 'static'（QDQ with calibration）or 'dynamic'
+            tasks: InsightFace tasks to quantize
+            det_size: Detection input size used for calibration
+            
+        Returns:
+            Result dictionary with the per-model quantization method
+        """
+        try:
+            from onnxruntime.quantization import quantize_dynamic, quantize_static, QuantFormat, QuantType
+        except ImportError as e:
+            return {'success': False, 'error': f'onnxruntime.quantization is not available: {e}'}
+        
+        source_dir = self.insightface_dir / "models" / model_name
+        target_name = self.get_quantized_model_name(model_name)
+        target_dir = self.insightface_dir / "models" / target_name
+        tmp_dir = target_dir.with_name(f"{target_name}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        
+        task_by_file = {Path(model.model_file).name: task for task, model in app.models.items()}
+        results = {}
+        
+        for model_file in sorted(source_dir.glob("*.onnx")):
+            target_file = tmp_dir / model_file.name
+            task = task_by_file.get(model_file.name)
+            if task not in tasks:
+                shutil.copy2(model_file, target_file)
+                results[model_file.name] = {'task': task, 'method': 'fp32'}
+                continue
+            
+            used_method = 'dynamic'
+            if method == 'static' and calibration_images:
+                try:
+                    blobs = self._calibration_blobs(app, task, calibration_images, det_size)
+                    if not blobs:
+                        raise ValueError("no calibration inputs could be prepared")
+                    quantize_static(
+                        str(model_file), str(target_file),
+                        _make_calibration_reader(app.models[task].input_name, blobs),
+                        quant_format=QuantFormat.QDQ,
+                        per_channel=True,
+                        weight_type=QuantType.QInt8,
+                        activation_type=QuantType.QUInt8
+                    )
+                    used_method = 'static'
+                except Exception as e:
+                    logger.warning(f"Static quantization of {model_file.name} failed，falling back to dynamic: {e}")
+            if used_method == 'dynamic':
+                quantize_dynamic(str(model_file), str(target_file), weight_type=QuantType.QInt8)
+            
+            results[model_file.name] = {
+                'task': task,
+                'method': used_method,
+                'size_mb': round(target_file.stat().st_size / (1024 * 1024), 2),
+                'source_size_mb': round(model_file.stat().st_size / (1024 * 1024), 2)
+            }
+            logger.info(f"Quantized {model_file.name} ({task}) with {used_method} INT8 quantization")
+        
+        manifest = {
+            'source_model': model_name,
+            'created_at': datetime.now().isoformat(),
+            'method': method,
+            'calibration_samples': len(calibration_images or []),
+            'models': results
+        }
+        with open(tmp_dir / "quantization.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        
+        shutil.rmtree(target_dir, ignore_errors=True)
+        tmp_dir.rename(target_dir)
+        logger.info(f"INT8 model pack written: {target_dir}")
+        return {'success': True, 'model_name': target_name, 'path': str(target_dir), **manifest}
+    
+    def _calibration_blobs(self, app, task: str, images: List[Any], det_size: Sequence[int]) -> List[Any]:
+        """Preprocess calibration images exactly as the fp32 model does at inference time"""
+        import cv2
+        import numpy as np
+        from insightface.utils import face_align
+        
+        model = app.models[task]
+        blobs = []
+        if task == 'detection':
+            input_size = tuple(det_size)
+            for image in images:
+                # Same letterbox resize as SCRFD.detect
+                im_ratio = float(image.shape[0]) / image.shape[1]
+                model_ratio = float(input_size[1]) / input_size[0]
+                if im_ratio > model_ratio:
+                    new_height = input_size[1]
+                    new_width = int(new_height / im_ratio)
+                else:
+                    new_width = input_size[0]
+                    new_height = int(new_width * im_ratio)
+                det_img = np.zeros((input_size[1], input_size[0], 3), dtype=np.uint8)
+                det_img[:new_height, :new_width, :] = cv2.resize(image, (new_width, new_height))
+                blobs.append(cv2.dnn.blobFromImage(
+                    det_img, 1.0 / model.input_std, input_size, (model.input_mean,) * 3, swapRB=True
+                ))
+        else:
+            # The recognition model sees aligned face crops（other tasks fall back to dynamic quantization）
+            for image in images:
+                bboxes, kpss = app.det_model.detect(image, max_num=1, metric='default')
+                if kpss is None or len(kpss) == 0:
+                    continue
+                if task == 'recognition':
+                    crop = face_align.norm_crop(image, landmark=kpss[0], image_size=model.input_size[0])
+                    blobs.append(cv2.dnn.blobFromImages(
+                        [crop], 1.0 / model.input_std, model.input_size, (model.input_mean,) * 3, swapRB=True
+                    ))
+        return blobs
+    
     def configure_deepface(self) -> Dict[str, str]:
         """
         Configuration DeepFace model path
@@ -298,6 +434,20 @@ class ModelManager:
         
         return result
 
+def _make_calibration_reader(input_name: str, blobs: List[Any]):
+    """CalibrationDataReader over pre-built input blobs"""
+    from onnxruntime.quantization import CalibrationDataReader
+    
+    class _BlobCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self._blobs = iter(blobs)
+        
+        def get_next(self):
+            blob = next(self._blobs, None)
+            return None if blob is None else {input_name: blob}
+    
+    return _BlobCalibrationReader()
+
 # Global model manager instance
 _model_manager = None
 
@@ -0,0 +1,115 @@
+"""
+Tests for keeping the analytics daily rollup in step with analytics_log
+The fake session keeps analytics_log rows and rollup counts in memory and
+interprets only the statements the rollup paths issue
+"""
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pgvector")
+
+from src.models.database import DatabaseManager
+
+DAY_1 = date(2026, 3, 2)
+DAY_2 = date(2026, 3, 3)
+
+
+class FakeResult:
+    def __init__(self, rows=(), rowcount=0):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+
+    def fetchall(self):
+        return self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeSession:
+    """analytics_log as (person_id, date, region, event_type) rows plus the rollup counts"""
+
+    def __init__(self, log_rows):
+        self.log_rows = list(log_rows)
+        self.rollup = {}
+        self.statements = []
+        for _, event_date, region, event_type in self.log_rows:
+            key = (event_date, region or '', event_type)
+            self.rollup[key] = self.rollup.get(key, 0) + 1
+
+    def execute(self, statement, params=None):
+        sql = ' '.join(str(statement).split())
+        self.statements.append(sql)
+        if sql.startswith('DELETE FROM analytics_log'):
+            deleted = [row for row in self.log_rows if row[0] == params['pid']]
+            self.log_rows = [row for row in self.log_rows if row[0] != params['pid']]
+            return FakeResult([row[1:] for row in deleted], len(deleted))
+        if sql.startswith('UPDATE analytics_daily_rollup'):
+            key = (params['date'], params['region'], params['event_type'])
+            self.rollup[key] -= params['count']
+            return FakeResult(rowcount=1)
+        if sql.startswith('DELETE FROM persons'):
+            return FakeResult(rowcount=1)
+        return FakeResult()
+
+    def group_by_log(self):
+        """What a GROUP BY over analytics_log (the migration backfill) would produce"""
+        counts = {}
+        for _, event_date, region, event_type in self.log_rows:
+            key = (event_date, region or '', event_type)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+
+def make_manager(session):
+    manager = DatabaseManager.__new__(DatabaseManager)
+
+    @contextmanager
+    def get_session():
+        yield session
+
+    manager.get_session = get_session
+    return manager
+
+
+def test_delete_person_keeps_rollup_equal_to_log():
+    session = FakeSession([
+        (1, DAY_1, 'A', 'registration'),
+        (1, DAY_1, 'A', 'check_in'),
+        (1, DAY_2, 'A', 'check_in'),
+        (2, DAY_1, 'A', 'check_in'),
+        (2, DAY_2, None, 'check_out'),
+        (None, DAY_2, 'A', 'check_in'),
+    ])
+
+    assert make_manager(session).delete_person(1)
+
+    rollup = {key: count for key, count in session.rollup.items() if count}
+    assert rollup == session.group_by_log()
+    assert rollup[(DAY_1, 'A', 'check_in')] == 1
+
+
+def test_delete_person_locks_person_before_removing_events():
+    session = FakeSession([(1, DAY_1, 'A', 'check_in')])
+
+    make_manager(session).delete_person(1)
+
+    assert session.statements[0].startswith('SELECT id FROM persons')
+    assert session.statements[0].endswith('FOR UPDATE')
+    order = [sql.split(' WHERE')[0] for sql in session.statements]
+    assert order.index('DELETE FROM analytics_log') < order.index('DELETE FROM persons')
+
+
+def test_rollup_counts_group_events_in_key_order():
+    events = [(DAY_2, 'A', 'check_in'), (DAY_1, None, 'check_in'), (DAY_2, 'A', 'check_in')]
+
+    assert DatabaseManager._rollup_counts(events) == [
+        ((DAY_1, '', 'check_in'), 1),
+        ((DAY_2, 'A', 'check_in'), 2),
+    ]
@@ -0,0 +1,139 @@
+"""
+Tests for the buffered analytics event writer: spooling failed batches to disk and
+replaying them, with a fake DatabaseManager in place of PostgreSQL
+"""
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pgvector")
+pytz = pytest.importorskip("pytz")
+
+from src.services.analytics_sink import AnalyticsEventSink
+
+NOW = pytz.timezone('Asia/Kolkata').localize(datetime(2026, 3, 2, 9, 30))
+
+
+class FakeDatabase:
+    """log_events stand-in: records written batches, fails the calls listed in fail_calls"""
+
+    def __init__(self, fail_calls=(), block=None):
+        self.fail_calls = set(fail_calls)
+        self.block = block
+        self.calls = 0
+        self.written = []
+
+    def log_events(self, events):
+        self.calls += 1
+        if self.block is not None:
+            self.block.wait()
+        if self.calls in self.fail_calls:
+            raise ConnectionError("database unavailable")
+        self.written.extend(event['name'] for event in events)
+        return len(events)
+
+
+def make_event(name):
+    return {
+        'event_type': 'check_in',
+        'person_id': None,
+        'emp_id': None,
+        'name': name,
+        'region': 'A',
+        'timestamp': NOW,
+        'date': NOW.date(),
+        'event_metadata': None
+    }
+
+
+def spooled_names(spool_dir):
+    names = []
+    for path in sorted(glob.glob(os.path.join(spool_dir, 'events-*.jsonl'))):
+        with open(path, encoding='utf-8') as f:
+            names.extend(json.loads(line)['name'] for line in f if line.strip())
+    return names
+
+
+def make_sink(db, tmp_path, **kwargs):
+    return AnalyticsEventSink(db, spool_dir=str(tmp_path / 'spool'), **kwargs)
+
+
+def test_failed_flush_is_spooled_and_replayed_by_next_flush(tmp_path):
+    db = FakeDatabase(fail_calls={1})
+    sink = make_sink(db, tmp_path)
+
+    sink._flush([make_event('a'), make_event('b')])
+    assert spooled_names(sink.spool_dir) == ['a', 'b']
+    assert not glob.glob(os.path.join(sink.spool_dir, '*.tmp'))
+
+    sink._flush([make_event('c')])
+
+    assert db.written == ['c', 'a', 'b']
+    assert spooled_names(sink.spool_dir) == []
+    assert os.listdir(sink.spool_dir) == []
+    metrics = sink.get_metrics()
+    assert (metrics['failed_flushes'], metrics['spooled'], metrics['replayed'], metrics['written']) == (1, 2, 2, 1)
+
+
+def test_partial_replay_respools_only_unwritten_events(tmp_path):
+    # Call 1 fails the flush, call 2 replays the first chunk, call 3 fails on the second chunk
+    db = FakeDatabase(fail_calls={1, 3})
+    sink = make_sink(db, tmp_path, batch_size=2)
+    sink._flush([make_event(name) for name in 'abcde'])
+
+    sink._replay_spool()
+
+    assert db.written == ['a', 'b']
+    assert spooled_names(sink.spool_dir) == ['c', 'd', 'e']
+    assert not glob.glob(os.path.join(sink.spool_dir, '*.replay-*'))
+    metrics = sink.get_metrics()
+    assert (metrics['spooled'], metrics['replayed']) == (5, 2)  # Re-spooled events are not counted twice
+
+    sink._replay_spool()
+    assert db.written == ['a', 'b', 'c', 'd', 'e']
+    assert os.listdir(sink.spool_dir) == []
+
+
+def test_corrupt_spool_line_is_counted_as_dropped(tmp_path):
+    db = FakeDatabase()
+    sink = make_sink(db, tmp_path)
+    os.makedirs(sink.spool_dir)
+    good = json.dumps(dict(make_event('a'), timestamp=NOW.isoformat(), date=NOW.date().isoformat()))
+    with open(os.path.join(sink.spool_dir, 'events-1-1.jsonl'), 'w', encoding='utf-8') as f:
+        f.write(good + '\n{"event_type": "check_in", "timest\n')
+
+    sink._replay_spool()
+
+    assert db.written == ['a']
+    assert sink.get_metrics()['dropped'] == 1
+    assert os.listdir(sink.spool_dir) == []
+
+
+def test_close_spools_leftovers_when_worker_is_stuck(tmp_path):
+    release = threading.Event()
+    db = FakeDatabase(block=release)
+    sink = make_sink(db, tmp_path, batch_size=1, flush_interval=0)
+    try:
+        sink.emit('check_in', name='a')
+        # The worker is stuck writing 'a'; the rest stays queued
+        while db.calls == 0:
+            release.wait(0.01)
+        sink.emit('check_in', name='b')
+        sink.emit('check_in', name='c')
+
+        sink.close(timeout=0.2)
+
+        assert spooled_names(sink.spool_dir) == ['b', 'c']
+        assert sink.get_metrics()['spooled'] == 2
+    finally:
+        release.set()
+        sink._queue.put(None)  # close() drained its own stop marker with the leftovers
+        sink._worker.join(5)
@@ -0,0 +1,64 @@
+"""
+Tests for the check-in / check-out state machine outcome of an upserted attendance row
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pgvector")
+
+from src.models.database import DatabaseManager
+
+NOW = datetime(2026, 3, 2, 9, 30)
+EARLIER = NOW - timedelta(hours=8)
+
+
+def attendance_row(inserted=False, check_in_time=None, check_out_time=None):
+    """Row shaped like the RETURNING clause of the check-in / check-out upsert"""
+    return {
+        'inserted': inserted,
+        'person_id': 3,
+        'name': 'Asha',
+        'emp_id': 'E003',
+        'emp_rank': 'Officer',
+        'region': 'A',
+        'id': 41,
+        'status': 'present',
+        'date': NOW.date(),
+        'check_in_time': check_in_time,
+        'check_out_time': check_out_time,
+        'check_in_latitude': 12.97,
+        'check_in_longitude': 77.59,
+        'check_in_location_accuracy': 15.0,
+        'check_out_latitude': None,
+        'check_out_longitude': None,
+        'check_out_location_accuracy': None
+    }
+
+
+@pytest.mark.parametrize('row, outcome', [
+    (attendance_row(inserted=True, check_in_time=NOW), 'check_in'),
+    (attendance_row(check_in_time=EARLIER, check_out_time=NOW), 'check_out'),
+    (attendance_row(check_in_time=NOW), 'check_in'),
+    (attendance_row(check_in_time=EARLIER, check_out_time=EARLIER + timedelta(hours=1)), 'completed'),
+    (attendance_row(check_in_time=EARLIER), 'check_out_required'),
+])
+def test_outcome(row, outcome):
+    assert DatabaseManager._check_in_or_out_result(row, NOW)['outcome'] == outcome
+
+
+def test_result_carries_person_and_attendance():
+    row = attendance_row(check_in_time=EARLIER, check_out_time=NOW)
+    result = DatabaseManager._check_in_or_out_result(row, NOW)
+
+    assert result['person'] == {'id': 3, 'name': 'Asha', 'emp_id': 'E003', 'emp_rank': 'Officer', 'region': 'A'}
+    attendance = result['attendance']
+    assert attendance['id'] == 41
+    assert attendance['check_in_time'] == EARLIER
+    assert attendance['check_out_time'] == NOW
+    assert attendance['check_in_latitude'] == 12.97
+    assert attendance['check_out_location_accuracy'] is None
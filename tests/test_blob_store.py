@@ -0,0 +1,94 @@
+"""
+Tests for the content-addressed face image store
+"""
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from src.models.blob_store import BlobStore
+
+
+def jpeg_bytes(width=400, height=300, seed=0):
+    image = np.random.default_rng(seed).integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    ok, encoded = cv2.imencode('.jpg', image)
+    assert ok
+    return encoded.tobytes()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path / 'blobs'), thumbnail_sizes=(64, 128))
+
+
+def test_put_stores_identical_bytes_once(store):
+    data = jpeg_bytes()
+
+    first = store.put(data)
+    second = store.put(data)
+
+    assert first == second == BlobStore.hash_bytes(data)
+    assert list(store.iter_digests()) == [first]
+    assert store.get(first) == data
+    assert store.size(first) == len(data)
+
+
+def test_put_writes_thumbnails(store):
+    digest = store.put(jpeg_bytes())
+
+    for size in store.thumbnail_sizes:
+        thumbnail = cv2.imread(store.path(digest, size))
+        assert max(thumbnail.shape[:2]) == size
+
+
+def test_open_path_generates_missing_thumbnail(store):
+    digest = store.put(jpeg_bytes())
+    os.remove(store.path(digest, 64))
+
+    path = store.open_path(digest, 64)
+
+    assert path == store.path(digest, 64)
+    assert max(cv2.imread(path).shape[:2]) == 64
+
+
+def test_open_path_never_returns_original_for_failed_thumbnail(store):
+    digest = store.put(b'not an image')
+
+    assert store.open_path(digest) == store.path(digest)
+    assert store.open_path(digest, 64) is None
+    assert not os.path.exists(store.path(digest, 64))
+
+
+def test_open_path_of_missing_blob_and_unsupported_size(store):
+    assert store.open_path('0' * 64) is None
+    assert store.open_path('0' * 64, 64) is None
+    with pytest.raises(ValueError):
+        store.open_path('0' * 64, 100)
+
+
+def test_delete_removes_thumbnails(store):
+    digest = store.put(jpeg_bytes())
+
+    store.delete(digest)
+
+    assert not store.exists(digest)
+    for size in store.thumbnail_sizes:
+        assert not os.path.exists(store.path(digest, size))
+    store.delete(digest)  # Already gone: no error
+
+
+def test_iter_digests_skips_thumbnails_and_temporary_files(store):
+    digests = {store.put(jpeg_bytes(seed=seed)) for seed in range(3)}
+    directory = os.path.dirname(store.path(next(iter(digests))))
+    # Leftover of an interrupted write, named like a digest
+    with open(os.path.join(directory, 'f' * 60 + '.tmp'), 'wb') as f:
+        f.write(b'partial')
+    # A file in thumbs/ named exactly like a digest must not count as an original
+    thumbs_directory = os.path.dirname(store.path('a' * 64, 64))
+    os.makedirs(thumbs_directory, exist_ok=True)
+    with open(os.path.join(thumbs_directory, 'a' * 64), 'wb') as f:
+        f.write(b'thumb')
+
+    assert set(store.iter_digests()) == digests
@@ -0,0 +1,118 @@
+"""
+Tests for the cross-frame face tracker
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.services.face_tracker import FaceTracker, iou_matrix
+
+KPS = np.array([[30, 40], [70, 40], [50, 60], [35, 80], [65, 80]], dtype=np.float32)
+
+
+def detection(dx: float = 0.0, dy: float = 0.0, det_score: float = 0.9, kps_shift: float = 0.0):
+    """A 100 x 100 face at (dx, dy) with its 5 key points"""
+    bbox = np.array([dx, dy, dx + 100, dy + 100], dtype=np.float32)
+    return bbox, KPS + np.array([dx + kps_shift, dy], dtype=np.float32), det_score
+
+
+def run(tracker, frames):
+    """Feed frames of detections, embedding every track that asks for it; returns needs_embedding per frame"""
+    flags = []
+    for detections in frames:
+        tracks = tracker.update(detections)
+        flags.append([track.needs_embedding for track in tracks])
+        for track in tracks:
+            if track.needs_embedding:
+                tracker.set_identity(track, {'person_id': 1})
+    return flags
+
+
+def test_iou_matrix():
+    boxes = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    ious = iou_matrix(boxes, boxes)
+    assert np.allclose(np.diag(ious), 1.0)
+    assert ious[0, 1] == pytest.approx(50 / 150)
+    assert ious[0, 2] == 0.0
+    assert iou_matrix(boxes[:0], boxes).shape == (0, 3)
+
+
+def test_tracked_face_keeps_its_track_and_identity():
+    tracker = FaceTracker()
+    first = tracker.update([detection()])[0]
+    assert first.needs_embedding
+    tracker.set_identity(first, {'person_id': 7})
+
+    second = tracker.update([detection(dx=3, dy=2)])[0]
+    assert second is first
+    assert not second.needs_embedding
+    assert second.identity == {'person_id': 7}
+    assert second.hits == 2
+
+
+def test_reembeds_every_interval():
+    tracker = FaceTracker(reembed_interval=3)
+    flags = run(tracker, [[detection(dx=i)] for i in range(7)])
+    assert [f[0] for f in flags] == [True, False, False, True, False, False, True]
+
+    metrics = tracker.get_metrics()
+    assert metrics['frames'] == 7
+    assert metrics['embedded_faces'] == 3
+    assert metrics['reused_faces'] == 4
+    assert metrics['reuse_ratio'] == pytest.approx(4 / 7, abs=1e-3)
+
+
+def test_low_detection_score_or_overlap_forces_embedding():
+    tracker = FaceTracker(reembed_interval=100, min_det_score=0.6, min_track_confidence=0.8)
+    run(tracker, [[detection()]])
+
+    assert tracker.update([detection(dx=2, det_score=0.4)])[0].needs_embedding
+    tracker.set_identity(tracker.tracks[0], {'person_id': 1})
+
+    # IoU of a 100px box shifted by 20px is 80 / 120, below min_track_confidence
+    track = tracker.update([detection(dx=22)])[0]
+    assert track is tracker.tracks[0]
+    assert track.needs_embedding
+
+
+def test_disjoint_or_crossing_faces_start_new_tracks():
+    tracker = FaceTracker(max_landmark_shift=0.35)
+    first = tracker.update([detection()])[0]
+
+    jumped = tracker.update([detection(dx=300)])[0]
+    assert jumped is not first
+    assert jumped.needs_embedding
+
+    # Same box, key points moved half a face width: a different person
+    crossed = tracker.update([detection(dx=300, kps_shift=50)])[0]
+    assert crossed is not jumped
+    assert crossed.needs_embedding
+
+
+def test_each_track_is_matched_once():
+    tracker = FaceTracker()
+    left, right = tracker.update([detection(), detection(dx=200)])
+    next_right, next_left = tracker.update([detection(dx=202), detection(dx=2)])
+    assert next_left is left
+    assert next_right is right
+
+
+def test_missed_tracks_are_dropped():
+    tracker = FaceTracker(max_missed=2)
+    run(tracker, [[detection()]])
+    run(tracker, [[], []])
+    assert len(tracker.tracks) == 1
+    run(tracker, [[]])
+    assert tracker.tracks == []
+
+
+def test_context_change_drops_tracks():
+    tracker = FaceTracker()
+    tracker.ensure_context(('A', None, 0.5))
+    run(tracker, [[detection()]])
+
+    tracker.ensure_context(('A', None, 0.5))
+    assert len(tracker.tracks) == 1
+    tracker.ensure_context(('B', None, 0.5))
+    assert tracker.tracks == []
+    assert tracker.update([detection()])[0].needs_embedding
@@ -0,0 +1,246 @@
+"""
+Tests for the in-memory gallery index
+The parity tests check the index against a plain re-implementation of the
+DatabaseManager.find_similar_faces query（pgvector cosine distance）
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.services.gallery_index import GalleryIndex
+
+DIM = 64
+REGIONS = ('A', 'B')
+CLIENTS = (None, 'client-1')
+
+
+def make_rows(seed: int = 7, persons: int = 30):
+    """Gallery rows: (encoding_id, person_id, embedding, quality, confidence, emp_id, name, region, client_id)"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    encoding_id = 100
+    for person_id in range(1, persons + 1):
+        region = REGIONS[person_id % len(REGIONS)]
+        client_id = CLIENTS[(person_id // len(REGIONS)) % len(CLIENTS)]
+        base = rng.normal(size=DIM)
+        for _ in range(1 + person_id % 3):
+            embedding = base + rng.normal(scale=0.6, size=DIM)
+            rows.append((encoding_id, person_id, embedding.astype(np.float32), float(rng.uniform(0.5, 1.0)),
+                         float(rng.uniform(0.6, 1.0)), f"E{person_id:03d}", f"Person {person_id}", region, client_id))
+            encoding_id += 1
+    return rows
+
+
+def reference_search(rows, embedding, region=None, emp_id=None, client_id=None, threshold=0.3, limit=5):
+    """find_similar_faces semantics: distance = 1 - cosine, distance < 1 - threshold, ORDER BY distance LIMIT"""
+    profile_ids = {}
+    for row in rows:
+        profile_ids[row[1]] = min(profile_ids.get(row[1], row[0]), row[0])
+
+    query = np.asarray(embedding, dtype=np.float64)
+    matches = []
+    for encoding_id, person_id, vector, quality, confidence, row_emp_id, name, row_region, row_client in rows:
+        if region is not None and row_region != region:
+            continue
+        if emp_id and row_emp_id != emp_id:
+            continue
+        if client_id and row_client != client_id:
+            continue
+        vector = np.asarray(vector, dtype=np.float64)
+        distance = 1.0 - float(query @ vector / (np.linalg.norm(query) * np.linalg.norm(vector)))
+        if distance < 1.0 - threshold:
+            matches.append({
+                'person_id': person_id,
+                'emp_id': row_emp_id,
+                'name': name,
+                'region': row_region,
+                'match_score': (1.0 - distance) * 100,
+                'distance': distance,
+                'face_encoding_id': encoding_id,
+                'profile_encoding_id': profile_ids[person_id],
+                'quality': quality,
+                'confidence': confidence
+            })
+    matches.sort(key=lambda m: m['distance'])
+    return matches[:limit]
+
+
+def assert_same_results(actual, expected):
+    assert [m['face_encoding_id'] for m in actual] == [m['face_encoding_id'] for m in expected]
+    for got, want in zip(actual, expected):
+        assert set(got) == set(want)
+        for key in ('person_id', 'emp_id', 'name', 'region', 'profile_encoding_id'):
+            assert got[key] == want[key]
+        assert got['match_score'] == pytest.approx(want['match_score'], abs=1e-3)
+        assert got['distance'] == pytest.approx(want['distance'], abs=1e-5)
+        assert got['quality'] == pytest.approx(want['quality'], abs=1e-6)
+        assert got['confidence'] == pytest.approx(want['confidence'], abs=1e-6)
+
+
+def clear_threshold(rows, queries, threshold):
+    """Nudge the threshold away from every similarity so float32 / float64 rounding cannot flip a match"""
+    gallery = np.stack([np.asarray(r[2], dtype=np.float64) for r in rows])
+    gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+    normalized = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    similarities = (normalized @ gallery.T).ravel()
+    while np.abs(similarities - threshold).min() < 1e-4:
+        threshold += 1e-3
+    return threshold
+
+
+@pytest.fixture
+def rows():
+    return make_rows()
+
+
+@pytest.fixture
+def index(rows):
+    gallery = GalleryIndex(dim=DIM)
+    gallery.load(rows)
+    return gallery
+
+
+@pytest.fixture
+def queries(rows):
+    """Noisy copies of stored encodings plus unrelated vectors"""
+    rng = np.random.default_rng(11)
+    noisy = [np.asarray(rows[i][2], dtype=np.float64) + rng.normal(scale=0.5, size=DIM) for i in range(0, len(rows), 5)]
+    unrelated = [rng.normal(size=DIM) for _ in range(4)]
+    return np.stack(noisy + unrelated)
+
+
+def test_load_counts_encodings_and_partitions(index, rows):
+    stats = index.get_statistics()
+    assert stats['loaded'] is True
+    assert stats['total_encodings'] == len(rows)
+    assert stats['total_persons'] == len({r[1] for r in rows})
+    assert len(stats['partitions']) == len({(r[7], r[8]) for r in rows})
+
+
+def test_search_finds_the_stored_encoding_first(index, rows):
+    target = rows[10]
+    results = index.search(target[2] * 3.0, region=target[7], threshold=0.3, limit=3)
+
+    assert results[0]['face_encoding_id'] == target[0]
+    assert results[0]['person_id'] == target[1]
+    assert results[0]['emp_id'] == target[5]
+    assert results[0]['match_score'] == pytest.approx(100.0, abs=1e-3)
+    assert results[0]['distance'] == pytest.approx(0.0, abs=1e-5)
+    assert len(results) <= 3
+    scores = [m['match_score'] for m in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_applies_threshold_and_emp_id(index, rows):
+    target = rows[10]
+    for match in index.search(target[2], region=None, threshold=0.5, limit=50):
+        assert match['match_score'] > 50.0
+
+    targeted = index.search(target[2], region=target[7], emp_id=target[5], threshold=0.0, limit=50)
+    assert targeted
+    assert {m['emp_id'] for m in targeted} == {target[5]}
+    assert index.search(target[2], region=target[7], emp_id='UNKNOWN', threshold=0.0) == []
+
+
+def test_search_matches_find_similar_faces(index, rows, queries):
+    for region in REGIONS:
+        for client_id in CLIENTS:
+            for threshold, limit in ((0.3, 5), (0.1, 1), (0.0, 20)):
+                threshold = clear_threshold(rows, queries, threshold)
+                for query in queries:
+                    actual = index.search(query, region=region, client_id=client_id, threshold=threshold, limit=limit)
+                    expected = reference_search(rows, query, region=region, client_id=client_id,
+                                                threshold=threshold, limit=limit)
+                    assert_same_results(actual, expected)
+
+    threshold = clear_threshold(rows, queries, 0.0)
+    for emp_id, region in (('E004', 'A'), ('E007', 'B')):
+        for query in queries:
+            assert_same_results(index.search(query, region=region, emp_id=emp_id, threshold=threshold, limit=5),
+                                reference_search(rows, query, region=region, emp_id=emp_id,
+                                                 threshold=threshold, limit=5))
+
+
+def test_search_batch_matches_find_similar_faces(index, rows, queries):
+    for region in REGIONS + (None,):
+        for client_id in CLIENTS:
+            for threshold, limit in ((0.3, 5), (0.1, 1), (0.0, 20)):
+                threshold = clear_threshold(rows, queries, threshold)
+                results = index.search_batch(queries, region=region, client_id=client_id,
+                                             threshold=threshold, limit=limit)
+                assert len(results) == len(queries)
+                for query, actual in zip(queries, results):
+                    expected = reference_search(rows, query, region=region, client_id=client_id,
+                                                threshold=threshold, limit=limit)
+                    assert_same_results(actual, expected)
+
+
+def test_search_batch_matches_find_similar_faces_for_emp_id(index, rows, queries):
+    threshold = clear_threshold(rows, queries, 0.0)
+    for emp_id, region in (('E004', 'A'), ('E007', 'B')):
+        results = index.search_batch(queries, region=region, emp_id=emp_id, threshold=threshold, limit=5)
+        for query, actual in zip(queries, results):
+            assert_same_results(actual, reference_search(rows, query, region=region, emp_id=emp_id,
+                                                         threshold=threshold, limit=5))
+
+
+def test_search_merges_row_chunks(index, rows, queries):
+    threshold = clear_threshold(rows, queries, 0.1)
+    index.search_chunk_rows = 7
+    results = index.search_batch(queries, region=None, threshold=threshold, limit=4)
+    for query, actual in zip(queries, results):
+        assert_same_results(actual, reference_search(rows, query, threshold=threshold, limit=4))
+
+
+def test_remove_person(index, rows):
+    person_rows = [r for r in rows if r[1] == 2]
+    index.remove_person(2)
+    assert index.search(person_rows[0][2], region=None, emp_id=person_rows[0][5], threshold=0.0) == []
+    assert index.get_statistics()['total_encodings'] == len(rows) - len(person_rows)
+    assert index.get_statistics()['total_persons'] == len({r[1] for r in rows}) - 1
+
+
+def test_remove_encoding_moves_profile_encoding(index, rows):
+    person_rows = [r for r in rows if r[1] == 2]
+    assert len(person_rows) == 3
+    first, second = person_rows[0][0], person_rows[1][0]
+
+    index.remove_encoding(first)
+    results = index.search(person_rows[1][2], region=person_rows[1][7], emp_id=person_rows[1][5], threshold=0.0)
+    assert first not in {m['face_encoding_id'] for m in results}
+    assert {m['profile_encoding_id'] for m in results} == {second}
+    assert index.get_statistics()['total_encodings'] == len(rows) - 1
+
+
+def test_replace_person_swaps_encodings_and_metadata(index, rows):
+    old_rows = [r for r in rows if r[1] == 5]
+    embedding = np.random.default_rng(3).normal(size=DIM).astype(np.float32)
+    index.replace_person(5, [(900, 5, embedding, 0.9, 0.9, 'E005', 'Renamed', 'B', None)])
+
+    results = index.search(embedding, region='B', emp_id='E005', threshold=0.0, limit=10)
+    assert [m['face_encoding_id'] for m in results] == [900]
+    assert results[0]['name'] == 'Renamed'
+    assert results[0]['profile_encoding_id'] == 900
+    assert index.get_statistics()['total_encodings'] == len(rows) - len(old_rows) + 1
+
+
+def test_snapshot_round_trip(index, rows, queries, tmp_path):
+    snapshot = str(tmp_path / 'snapshot')
+    index.save_snapshot(snapshot, version=42)
+
+    restored = GalleryIndex(dim=DIM)
+    assert restored.load_snapshot(snapshot) == 42
+    assert restored.get_statistics()['total_encodings'] == len(rows)
+
+    threshold = clear_threshold(rows, queries, 0.2)
+    for region in REGIONS + (None,):
+        restored_results = restored.search_batch(queries, region=region, threshold=threshold, limit=5)
+        for actual, expected in zip(restored_results, index.search_batch(queries, region=region,
+                                                                          threshold=threshold, limit=5)):
+            assert_same_results(actual, expected)
+
+    # Memory-mapped partitions are read-only; adding copies them first
+    embedding = rows[0][2]
+    restored.add(999, 1, embedding, rows[0][5], rows[0][6], rows[0][7], rows[0][8])
+    ids = {m['face_encoding_id'] for m in restored.search(embedding, region=rows[0][7], threshold=0.9, limit=10)}
+    assert {rows[0][0], 999} <= ids
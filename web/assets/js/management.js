@@ -603,8 +603,8 @@ class PersonManagement {
     getPersonAvatar(person) {
         // If there is a face picture，Show real avatar
         if (person.face_image_url) {
-            // Add timestamp to prevent caching issues
-            const imageUrl = person.face_image_url + (person.face_image_url.includes('?') ? '&' : '?') + 't=' + Date.now();
+            // Thumbnail derivative（revalidated by ETag）
+            const imageUrl = person.face_image_url + (person.face_image_url.includes('?') ? '&' : '?') + 'size=128';
             return `
                 <img src="${imageUrl}" 
                      class="rounded-circle object-fit-cover cursor-pointer" 
@@ -736,8 +736,8 @@ class PersonManagement {
     getPersonAvatarSmall(person) {
         // List view avatar
         if (person.face_image_url) {
-            // Add timestamp to prevent caching issues
-            const imageUrl = person.face_image_url + (person.face_image_url.includes('?') ? '&' : '?') + 't=' + Date.now();
+            // Thumbnail derivative（revalidated by ETag）
+            const imageUrl = person.face_image_url + (person.face_image_url.includes('?') ? '&' : '?') + 'size=128';
             return `
                 <img src="${imageUrl}" 
                      class="rounded-circle object-fit-cover cursor-pointer" 
@@ -137,17 +137,13 @@ class FaceRecognition {
                 formData.append('emp_id', empIdInput.value.trim());
             }
 
-            // First get the recognition results
-            const result = await ApiClient.post('/api/recognize', formData);
+            // Recognition results and visualization in one request（attendance is submitted per card）
+            formData.append('mark', 'false');
+            formData.append('visualize', 'true');
+            const result = await ApiClient.post('/api/attendance/recognize_mark', formData);
 
-            // Then get the visualization picture
-            const visualResponse = await fetch('/api/recognize_visual', {
-                method: 'POST',
-                body: formData
-            });
-
-            if (visualResponse.ok) {
-                const blob = await visualResponse.blob();
+            if (result.image_base64) {
+                const blob = await (await fetch(`data:image/jpeg;base64,${result.image_base64}`)).blob();
                 const visualUrl = URL.createObjectURL(blob);
                 this.displayResults(result, visualUrl);
             } else {
@@ -308,7 +304,7 @@ class FaceRecognition {
                 </div>
                 
                 <div class="mt-3" id="attendance-section-${match.emp_id}">
-                    <button class="btn btn-success w-100" onclick="faceRecognition.markAttendance('${match.emp_id}', '${match.name}')">
+                    <button class="btn btn-success w-100" onclick="faceRecognition.markAttendance('${match.emp_id}', '${match.name}', ${match.person_id || 'null'})">
                         <i class="bi bi-check-circle me-2"></i>Submit Attendance
                     </button>
                 </div>
@@ -316,7 +312,7 @@ class FaceRecognition {
         `;
     }
 
-    async markAttendance(empId, personName) {
+    async markAttendance(empId, personName, personId = null) {
         const attendanceSection = document.getElementById(`attendance-section-${empId}`);
         if (!attendanceSection) return;
 
@@ -361,7 +357,12 @@ class FaceRecognition {
 
             // Mark attendance
             const formData = new FormData();
-            formData.append('emp_id', empId);
+            if (personId) {
+                // Person already resolved by recognition
+                formData.append('person_id', personId);
+            } else {
+                formData.append('emp_id', empId);
+            }
             formData.append('status', 'present');
 
             // Add location data if available
@@ -418,7 +419,7 @@ class FaceRecognition {
                     <i class="bi bi-exclamation-triangle me-2"></i>
                     Failed to mark attendance: ${error.message}
                 </div>
-                <button class="btn btn-warning w-100 mt-2" onclick="faceRecognition.markAttendance('${empId}', '${personName}')">
+                <button class="btn btn-warning w-100 mt-2" onclick="faceRecognition.markAttendance('${empId}', '${personName}', ${personId || 'null'})">
                     <i class="bi bi-arrow-clockwise me-2"></i>Retry
                 </button>
             `;